@@ -15,29 +15,171 @@ from pathlib import Path
 from datetime import datetime
 import json
 import shutil
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
+import threading
+import functools
+from collections import deque, ChainMap
+from dataclasses import dataclass
+from typing import List, Optional
+import numpy as np
 
 # Add the project root to the Python path
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
-from mcp_host.tools.vector_db import vector_db
-from mcp_host.tools.simulate_supplier_response import simulate_supplier_response_tool
+from mcp_host.tools.semantic_cache import SimilarityCache
+from mcp_host.tools import simkernel
+from mcp_host.tools.profile_cache import ProfileCache, hash_file
+from console import OutputBuffer, ainput
 
-class AutoFileProcessor(FileSystemEventHandler):
-    """Automatically processes new files dropped into the uploads folder"""
+SUPPORTED_SUFFIXES = ('.pdf', '.csv', '.txt')
+
+# Seconds between size checks; a file is processed once two checks agree
+DEBOUNCE_SECONDS = 0.5
+
+# Oldest messages are dropped once a session grows past this
+MAX_TRANSCRIPT_MESSAGES = 2000
+
+# Background conversation writes flush after this many turns or seconds
+STORE_BATCH_TURNS = 4
+STORE_FLUSH_SECONDS = 5.0
+
+@functools.cache
+def load_vector_db():
+    """Import the vector database on first use; it loads the embedding model"""
+    from mcp_host.tools.vector_db import get_vector_db
+    return get_vector_db()
+
+@functools.cache
+def load_supplier_simulator():
+    """Import the supplier simulator on first use; it initializes the LLM client"""
+    from mcp_host.tools.simulate_supplier_response import simulate_supplier_response_tool
+    return simulate_supplier_response_tool
+
+class AutoFileProcessor:
+    """Automatically processes new files dropped into the uploads folder
     
-    def __init__(self, agent):
+    Implements watchdog's handler interface (dispatch) directly so watchdog
+    itself is only imported once the file watcher starts.
+    """
+    
+    def __init__(self, agent, loop: asyncio.AbstractEventLoop):
         self.agent = agent
+        self.loop = loop
+        
+        # Watchdog callbacks and debounce timers run on their own threads
+        self._lock = threading.Lock()
+        self._timers = {}
+        self._last_sizes = {}
+        self._processed_mtimes = {}
+    
+    def dispatch(self, event):
+        if event.event_type == "created":
+            self.on_created(event)
+        elif event.event_type == "modified":
+            self.on_modified(event)
     
     def on_created(self, event):
-        if not event.is_directory:
-            file_path = Path(event.src_path)
-            if file_path.suffix.lower() in ['.pdf', '.csv', '.txt']:
-                print(f"\n🔄 New file detected: {file_path.name}")
-                print("Processing automatically...")
-                asyncio.create_task(self.agent.process_new_file(file_path))
+        self._schedule(event)
+    
+    def on_modified(self, event):
+        self._schedule(event)
+    
+    def _schedule(self, event):
+        """(Re)start the debounce timer for a supported file"""
+        if event.is_directory:
+            return
+        
+        # Filter by suffix before touching the filesystem
+        file_path = Path(event.src_path)
+        if file_path.suffix.lower() not in SUPPORTED_SUFFIXES:
+            return
+        
+        with self._lock:
+            timer = self._timers.pop(file_path, None)
+            if timer:
+                timer.cancel()
+            self._start_timer(file_path)
+    
+    def _start_timer(self, file_path: Path):
+        """Start a debounce timer; caller must hold the lock"""
+        timer = threading.Timer(DEBOUNCE_SECONDS, self._check_stable, [file_path])
+        timer.daemon = True
+        self._timers[file_path] = timer
+        timer.start()
+    
+    def _check_stable(self, file_path: Path):
+        """Hand the file to the agent once its size has stopped changing"""
+        try:
+            stat = file_path.stat()
+        except OSError:
+            # File vanished before it settled
+            with self._lock:
+                self._timers.pop(file_path, None)
+                self._last_sizes.pop(file_path, None)
+            return
+        
+        with self._lock:
+            if self._last_sizes.get(file_path) != stat.st_size:
+                # Still being written, poll again
+                self._last_sizes[file_path] = stat.st_size
+                self._start_timer(file_path)
+                return
+            
+            self._timers.pop(file_path, None)
+            self._last_sizes.pop(file_path, None)
+            
+            # Skip duplicate events for a version we already processed
+            if self._processed_mtimes.get(file_path) == stat.st_mtime:
+                return
+            self._processed_mtimes[file_path] = stat.st_mtime
+        
+        print(f"\n🔄 New file detected: {file_path.name}")
+        print("Processing automatically...")
+        future = asyncio.run_coroutine_threadsafe(self.agent.process_new_file(file_path), self.loop)
+        future.add_done_callback(lambda done: self._report_failure(file_path, done))
+    
+    @staticmethod
+    def _report_failure(file_path: Path, future):
+        """Report a watcher-triggered run that failed, like the upload command does"""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if isinstance(error, FileNotFoundError):
+            print(f"❌ File not found: {file_path.name}")
+        elif error is not None:
+            print(f"❌ Error processing {file_path.name}: {str(error)}")
+
+@dataclass(slots=True)
+class SupplierSummary:
+    """Display-ready summary fields, computed once per loaded supplier"""
+    products_head: List[str]
+    products_extra: int
+    price_min: Optional[float]
+    price_max: Optional[float]
+    style: Optional[str]
+    has_discounts: bool
+    
+    @classmethod
+    def from_profile(cls, data: dict) -> "SupplierSummary":
+        products = data.get('products') or []
+        prices = data.get('prices') or []
+        style = data.get('negotiation_style')
+        
+        price_min = price_max = None
+        if prices:
+            # float64 keeps the cents exact for large prices
+            price_array = np.asarray(prices, dtype=np.float64)
+            price_min = float(price_array.min())
+            price_max = float(price_array.max())
+        
+        return cls(
+            products_head=[str(p) for p in products[:3]],
+            products_extra=max(0, len(products) - 3),
+            price_min=price_min,
+            price_max=price_max,
+            style=style.title() if style else None,
+            has_discounts=bool(data.get('volume_discounts'))
+        )
 
 class AutonomousNegotiationAgent:
     """Fully autonomous negotiation agent with auto-processing"""
@@ -45,15 +187,33 @@ class AutonomousNegotiationAgent:
     def __init__(self):
         self.current_supplier = None
         self.current_supplier_data = {}
-        self.negotiation_transcript = []
+        self.supplier_summary = None
+        self.supplier_loaded = asyncio.Event()
+        self.negotiation_transcript = deque(maxlen=MAX_TRANSCRIPT_MESSAGES)
         self.session_context = {}
         
+        # Cache of vector-DB context for repeated / near-duplicate buyer messages
+        self.context_cache = SimilarityCache()
+        
+        # Bound concurrent vector-DB calls
+        self.vector_db_semaphore = asyncio.Semaphore(4)
+        
+        # Turns waiting to be written to the vector database by the background worker
+        self.store_queue = asyncio.Queue(maxsize=1024)
+        self.store_worker = None
+        
         # Create uploads directory
         self.uploads_dir = project_root / "uploads"
         self.uploads_dir.mkdir(exist_ok=True)
         
+        # Profiles of already-ingested files, keyed by content hash
+        self.file_hash_cache = ProfileCache(self.uploads_dir / ".hash_cache")
+        
         # File watcher for auto-processing
         self.file_observer = None
+        
+        # Outstanding stdin read, reused across prompts so no line is lost
+        self.pending_input = None
     
     async def start_autonomous_agent(self):
         """Start the autonomous agent"""
@@ -62,6 +222,9 @@ class AutonomousNegotiationAgent:
         print("🎯 Upload any supplier PDF/CSV and start negotiating immediately!")
         print()
         
+        # Compile the similarity kernel now rather than on the first chat turn
+        simkernel.warmup()
+        
         # Check for existing files first
         await self.check_existing_files()
         
@@ -75,18 +238,34 @@ class AutonomousNegotiationAgent:
             print("   Or provide a file path manually")
             print()
             
-            # Manual file input option
+            # Manual file input option, racing against files dropped into uploads/
             while not self.current_supplier:
-                user_input = input("💬 Upload file path (or just chat if supplier loaded): ").strip()
+                read_task = asyncio.ensure_future(
+                    self.read_input("💬 Upload file path (or just chat if supplier loaded): ")
+                )
+                loaded_task = asyncio.ensure_future(self.supplier_loaded.wait())
+                done, pending = await asyncio.wait(
+                    {read_task, loaded_task},
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in pending:
+                    task.cancel()
                 
-                if user_input.lower() in ['quit', 'exit', 'q']:
+                if read_task not in done:
+                    # A dropped file was processed while we were waiting
                     break
                 
-                if user_input and Path(user_input).exists():
-                    await self.process_new_file(Path(user_input))
+                user_input = read_task.result().strip()
+                
+                if user_input.lower() in ['quit', 'exit', 'q']:
                     break
-                elif user_input:
-                    print("❌ File not found. Try again or drop file in uploads/ folder")
+                
+                if user_input:
+                    try:
+                        await self.process_new_file(Path(user_input))
+                        break
+                    except FileNotFoundError:
+                        print("❌ File not found. Try again or drop file in uploads/ folder")
         
         # Start negotiation chat
         if self.current_supplier:
@@ -94,79 +273,130 @@ class AutonomousNegotiationAgent:
     
     async def check_existing_files(self):
         """Check for existing files in uploads directory"""
-        existing_files = list(self.uploads_dir.glob("*"))
-        pdf_csv_files = [f for f in existing_files if f.suffix.lower() in ['.pdf', '.csv', '.txt']]
+        # Count supported files and track the newest one in a single pass
+        file_count = 0
+        latest_file = None
+        latest_mtime = 0.0
+        
+        with os.scandir(self.uploads_dir) as entries:
+            for entry in entries:
+                if not entry.name.lower().endswith(SUPPORTED_SUFFIXES):
+                    continue
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                
+                file_count += 1
+                mtime = entry.stat().st_mtime
+                if latest_file is None or mtime > latest_mtime:
+                    latest_file = Path(entry.path)
+                    latest_mtime = mtime
         
-        if pdf_csv_files:
-            print(f"📂 Found {len(pdf_csv_files)} file(s) in uploads directory")
+        if latest_file:
+            print(f"📂 Found {file_count} file(s) in uploads directory")
             
             # Process the most recent file
-            latest_file = max(pdf_csv_files, key=lambda f: f.stat().st_mtime)
             print(f"🔄 Auto-processing latest file: {latest_file.name}")
-            await self.process_new_file(latest_file)
+            try:
+                await self.process_new_file(latest_file)
+            except FileNotFoundError:
+                print(f"❌ {latest_file.name} was removed before it could be processed")
     
     def start_file_watcher(self):
         """Start watching uploads directory for new files"""
-        event_handler = AutoFileProcessor(self)
-        self.file_observer = Observer()
+        from watchdog.observers import Observer
+        from watchdog.observers.polling import PollingObserver
+        
+        event_handler = AutoFileProcessor(self, asyncio.get_running_loop())
+        
+        # Polling is slower but doesn't drop or coalesce events under burst uploads
+        if os.getenv("WATCHDOG_OBSERVER", "native").lower() == "polling":
+            self.file_observer = PollingObserver()
+        else:
+            self.file_observer = Observer()
         self.file_observer.schedule(event_handler, str(self.uploads_dir), recursive=False)
         self.file_observer.start()
         print(f"👁️  Watching {self.uploads_dir} for new files...")
     
     async def process_new_file(self, file_path: Path):
-        """Process a new supplier file automatically"""
+        """Process a new supplier file automatically
+        
+        Raises FileNotFoundError so callers can report a bad path themselves.
+        """
         try:
             print(f"🧠 Processing {file_path.name} with AI...")
             print("   Extracting supplier data, pricing, terms, etc.")
             
-            # Process with vector database
-            supplier_profile = await vector_db.process_and_store_document(str(file_path))
+            # Skip the embedding pipeline for byte-identical re-uploads;
+            # hashing is also the first read, so a missing file fails here
+            content_hash = await asyncio.to_thread(hash_file, file_path)
+            supplier_profile = self.file_hash_cache.get(content_hash)
+            
+            if supplier_profile is None:
+                # Process with vector database
+                supplier_profile = await load_vector_db().process_and_store_document(str(file_path))
+                await asyncio.to_thread(self.file_hash_cache.put, content_hash, supplier_profile)
+            else:
+                print("   Already processed this file, reusing saved profile")
             
             # Update current supplier
-            self.current_supplier = supplier_profile.get("supplier_name", file_path.stem.title())
+            supplier_name = supplier_profile.get("supplier_name", file_path.stem.title())
+            if supplier_name != self.current_supplier:
+                self.context_cache.clear()
+            self.current_supplier = supplier_name
             self.current_supplier_data = supplier_profile
+            self.supplier_summary = SupplierSummary.from_profile(supplier_profile)
+            self.supplier_loaded.set()
             
             # Update session context for compatibility
             self.session_context['supplier_data'] = supplier_profile
             
             # Clear previous conversation
-            self.negotiation_transcript = []
+            self.negotiation_transcript.clear()
             
-            print(f"✅ Ready! You are now negotiating with {self.current_supplier}")
+            out = OutputBuffer()
+            out(f"✅ Ready! You are now negotiating with {self.current_supplier}")
             
             # Show supplier summary
-            self.show_supplier_summary()
+            self.show_supplier_summary(out)
             
-            print("💡 Start typing to begin negotiation - the AI will respond as this company!")
-            print()
+            out("💡 Start typing to begin negotiation - the AI will respond as this company!")
+            out()
+            out.flush()
             
+        except FileNotFoundError:
+            raise
         except Exception as e:
             print(f"❌ Error processing {file_path.name}: {str(e)}")
     
-    def show_supplier_summary(self):
+    def show_supplier_summary(self, out: Optional[OutputBuffer] = None):
         """Show a quick summary of the loaded supplier"""
-        data = self.current_supplier_data
+        summary = self.supplier_summary
         
-        print(f"\n📊 {self.current_supplier} - Quick Summary")
-        print("─" * 40)
+        # Write into the caller's buffer when given one, otherwise flush our own
+        buffer = out or OutputBuffer()
         
-        if data.get('products'):
-            products = data['products'][:3]
-            print(f"🔧 Products: {', '.join(products)}")
-            if len(data['products']) > 3:
-                print(f"   (and {len(data['products']) - 3} more...)")
+        buffer(f"\n📊 {self.current_supplier} - Quick Summary")
+        buffer("─" * 40)
         
-        if data.get('prices'):
-            prices = data['prices']
-            print(f"💰 Price range: ${min(prices):.2f} - ${max(prices):.2f}")
-        
-        if data.get('negotiation_style'):
-            print(f"🎯 Style: {data['negotiation_style'].title()}")
+        if summary is not None:
+            if summary.products_head:
+                buffer(f"🔧 Products: {', '.join(summary.products_head)}")
+                if summary.products_extra:
+                    buffer(f"   (and {summary.products_extra} more...)")
+            
+            if summary.price_min is not None:
+                buffer(f"💰 Price range: ${summary.price_min:.2f} - ${summary.price_max:.2f}")
+            
+            if summary.style:
+                buffer(f"🎯 Style: {summary.style}")
+            
+            if summary.has_discounts:
+                buffer("📦 Volume discounts: ✅ Available")
         
-        if data.get('volume_discounts'):
-            print(f"📦 Volume discounts: {'✅ Available' if data['volume_discounts'] else '❌ Not offered'}")
+        buffer()
         
-        print()
+        if out is None:
+            buffer.flush()
     
     async def start_negotiation_chat(self):
         """Start the natural negotiation conversation"""
@@ -178,7 +408,7 @@ class AutonomousNegotiationAgent:
         while True:
             try:
                 # Get user input
-                user_input = input("👤 You: ").strip()
+                user_input = (await self.read_input("👤 You: ")).strip()
                 
                 if user_input.lower() in ['quit', 'exit', 'q']:
                     await self.end_negotiation()
@@ -190,9 +420,9 @@ class AutonomousNegotiationAgent:
                 
                 elif user_input.lower().startswith('upload '):
                     file_path = user_input[7:].strip()
-                    if Path(file_path).exists():
+                    try:
                         await self.process_new_file(Path(file_path))
-                    else:
+                    except FileNotFoundError:
                         print("❌ File not found")
                     continue
                 
@@ -206,31 +436,49 @@ class AutonomousNegotiationAgent:
             except KeyboardInterrupt:
                 await self.end_negotiation()
                 break
+            except asyncio.CancelledError:
+                # asyncio.run delivers Ctrl-C as a cancellation; save the session, then let it propagate
+                await self.end_negotiation()
+                raise
             except EOFError:
                 await self.end_negotiation()
                 break
             except Exception as e:
                 print(f"❌ Error: {str(e)}")
     
+    async def read_input(self, prompt: str) -> str:
+        """Read a line from stdin without blocking file processing"""
+        if self.pending_input is None:
+            self.pending_input = ainput(prompt)
+        
+        try:
+            # Shield so a cancelled waiter leaves the read in place for the next prompt
+            return await asyncio.shield(self.pending_input)
+        finally:
+            if self.pending_input.done():
+                self.pending_input = None
+    
     async def generate_contextual_response(self, user_message: str):
         """Generate intelligent supplier response using vector database"""
         try:
             # Get contextual information from vector database
-            context = await vector_db.get_contextual_supplier_info(
-                user_message, 
-                self.current_supplier
-            )
+            context = await self.get_cached_context(user_message)
             
-            # Enhance session context with vector search results
-            enhanced_context = self.session_context.copy()
+            # Layer this turn's vector search results over the session context
+            # without mutating the shared supplier_data dict
+            supplier_data = self.session_context.get('supplier_data', {})
             if context.get("supplier_data"):
-                enhanced_context['supplier_data'].update(context["supplier_data"])
+                supplier_data = {**supplier_data, **context["supplier_data"]}
+            turn_context = {'supplier_data': supplier_data}
             
             # Add relevant document chunks as context
             if context.get("relevant_info"):
-                enhanced_context['contextual_info'] = context["relevant_info"]
+                turn_context['contextual_info'] = context["relevant_info"]
+            
+            enhanced_context = ChainMap(turn_context, self.session_context)
             
             # Generate response using enhanced context
+            simulate_supplier_response_tool = load_supplier_simulator()
             result = await simulate_supplier_response_tool(
                 user_message,
                 enhanced_context,
@@ -245,19 +493,49 @@ class AutonomousNegotiationAgent:
             vector_confidence = context.get("confidence", 0)
             combined_confidence = (confidence + vector_confidence) / 2
             
-            print(f"🏭 {self.current_supplier}: {response}")
+            out = OutputBuffer()
+            out(f"🏭 {self.current_supplier}: {response}")
             
             # Show debug info for low confidence
             if combined_confidence < 0.5:
-                print(f"   [Strategy: {strategy} | Confidence: {combined_confidence:.1%} | Context: {len(context.get('relevant_info', []))} chunks]")
+                out(f"   [Strategy: {strategy} | Confidence: {combined_confidence:.1%} | Context: {len(context.get('relevant_info', []))} chunks]")
+            out.flush()
             
-            # Store conversation in vector database for learning
+            # Record the turn; the vector-DB write runs in the background
             await self.store_conversation_turn(user_message, response, strategy)
             
         except Exception as e:
             print(f"🏭 {self.current_supplier}: I'm having some technical difficulties. Could you repeat that?")
             print(f"   [Error: {str(e)}]")
     
+    async def get_cached_context(self, user_message: str) -> dict:
+        """Look up vector-DB context, reusing results for repeated or similar messages"""
+        cache_key = (self.current_supplier, self.context_cache.normalize(user_message))
+        
+        context = self.context_cache.get(cache_key)
+        if context is not None:
+            return context
+        
+        # Embed once and reuse the embedding for both the similarity check and the search
+        vector_db = load_vector_db()
+        query_embedding = await vector_db.aencode_query(user_message)
+        context = self.context_cache.get_similar(query_embedding)
+        if context is not None:
+            return context
+        
+        async with self.vector_db_semaphore:
+            context = await vector_db.get_contextual_supplier_info(
+                user_message, 
+                self.current_supplier,
+                query_embedding=query_embedding
+            )
+        
+        # Don't cache empty results from a failed lookup
+        if context.get("relevant_info"):
+            self.context_cache.put(cache_key, query_embedding, context)
+        
+        return context
+    
     async def store_conversation_turn(self, user_message: str, supplier_response: str, strategy: str):
         """Store conversation turn for learning"""
         try:
@@ -267,36 +545,106 @@ class AutonomousNegotiationAgent:
                 {"role": "supplier", "message": supplier_response}
             ])
             
-            # Store in vector database periodically (every 4 messages)
-            if len(self.negotiation_transcript) % 8 == 0:  # Every 4 exchanges
-                conversation_data = {
-                    "messages": self.negotiation_transcript.copy(),
-                    "supplier_id": self.current_supplier,
-                    "timestamp": datetime.now().isoformat(),
-                    "strategies": [strategy],
-                    "outcome": "ongoing"
-                }
-                
-                await vector_db.store_conversation(conversation_data)
+            # Hand the turn to the background writer; never wait on storage here
+            self.start_store_worker()
+            self.store_queue.put_nowait((self.current_supplier, user_message, supplier_response, strategy))
             
         except Exception as e:
             # Don't break the flow for storage errors
             pass
     
+    def start_store_worker(self):
+        """Start the background task that batches conversation writes"""
+        if self.store_worker is None:
+            self.store_worker = asyncio.create_task(self._store_worker())
+    
+    async def stop_store_worker(self):
+        """Flush any queued turns and stop the background writer"""
+        if self.store_worker is None:
+            return
+        
+        await self.store_queue.put(None)
+        await self.store_worker
+        self.store_worker = None
+    
+    async def _store_worker(self):
+        """Write queued turns in batches, flushing by turn count or elapsed time"""
+        loop = asyncio.get_running_loop()
+        batch = []
+        batch_supplier = None
+        deadline = 0.0
+        
+        while True:
+            timeout = max(0.0, deadline - loop.time()) if batch else None
+            try:
+                turn = await asyncio.wait_for(self.store_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                await self._store_turns(batch_supplier, batch)
+                batch = []
+                continue
+            
+            # None is the shutdown sentinel
+            if turn is None:
+                if batch:
+                    await self._store_turns(batch_supplier, batch)
+                return
+            
+            # Never mix turns from different suppliers in one stored conversation
+            if batch and turn[0] != batch_supplier:
+                await self._store_turns(batch_supplier, batch)
+                batch = []
+            
+            if not batch:
+                batch_supplier = turn[0]
+                deadline = loop.time() + STORE_FLUSH_SECONDS
+            
+            batch.append(turn)
+            if len(batch) >= STORE_BATCH_TURNS:
+                await self._store_turns(batch_supplier, batch)
+                batch = []
+    
+    async def _store_turns(self, supplier_id: str, turns: list):
+        """Write a batch of turns to the vector database"""
+        messages = []
+        strategies = []
+        for _, user_message, supplier_response, strategy in turns:
+            messages.append({"role": "buyer", "message": user_message})
+            messages.append({"role": "supplier", "message": supplier_response})
+            if strategy not in strategies:
+                strategies.append(strategy)
+        
+        conversation_data = {
+            "messages": messages,
+            "supplier_id": supplier_id,
+            "timestamp": datetime.now().isoformat(),
+            "strategies": strategies,
+            "outcome": "ongoing"
+        }
+        
+        try:
+            async with self.vector_db_semaphore:
+                await load_vector_db().store_conversation(conversation_data)
+        except Exception:
+            # Don't break the flow for storage errors
+            pass
+    
     async def end_negotiation(self):
         """End the negotiation gracefully"""
         print(f"\n🏭 {self.current_supplier}: Thank you for your time! We look forward to working together.")
         
+        # Flush queued turns before the final write
+        await self.stop_store_worker()
+        
         # Store final conversation
         if self.negotiation_transcript:
             try:
                 conversation_data = {
-                    "messages": self.negotiation_transcript,
+                    "messages": list(self.negotiation_transcript),
                     "supplier_id": self.current_supplier,
                     "timestamp": datetime.now().isoformat(),
                     "outcome": "completed"
                 }
-                await vector_db.store_conversation(conversation_data)
+                await load_vector_db().store_conversation(conversation_data)
                 print("💾 Conversation saved for future training improvements")
             except:
                 pass
@@ -14,10 +14,49 @@ from pathlib import Path
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
-from mcp_host.tools.analyze_supplier import analyze_supplier_tool
-from mcp_host.tools.simulate_supplier_response import simulate_supplier_response_tool
-from mcp_host.tools.summarize_negotiation_transcript import summarize_negotiation_transcript_tool
-from mcp_host.tools.generate_feedback import generate_feedback_tool
+from console import OutputBuffer
+
+# Tool modules pull in pandas, PyMuPDF and the LLM clients, so they are imported
+# on first use to keep startup fast for help/status/quit
+
+QUIT_COMMANDS = {'quit', 'exit', 'q'}
+
+# Commands that must be typed on their own, without an argument
+NO_ARG_COMMANDS = {'help', 'summarize', 'feedback', 'demo', 'status'}
+
+# Demo replies generated at the same time
+DEMO_CONCURRENCY = 3
+
+HELP_TEXT = """
+Available Commands:
+==================
+
+analyze <file_path>     - Analyze supplier data from CSV, PDF, or TXT file
+negotiate <message>     - Send a negotiation message to the supplier
+summarize              - Analyze the current negotiation conversation
+feedback               - Generate training feedback and recommendations
+demo                   - Run a demonstration negotiation
+status                 - Show current session status
+help                   - Show this help message
+quit/exit/q            - Exit the application
+
+Example Usage:
+=============
+1. analyze examples/supplier_data.csv
+2. negotiate "We'd like to discuss pricing for our next quarter order"
+3. negotiate "What kind of volume discount can you offer?"
+4. summarize
+5. feedback
+
+Tips:
+=====
+- Start by analyzing supplier data to load context
+- Use specific, business-like language in negotiations
+- Ask for discounts, volume pricing, delivery terms
+- Mention competitors, long-term relationships, or urgency
+- Get feedback after each negotiation session
+
+"""
 
 class NegotiationChat:
     """Simple chat interface for negotiation training"""
@@ -26,6 +65,17 @@ class NegotiationChat:
         self.session_context = {}
         self.negotiation_transcript = []
         self.supplier_data_loaded = False
+        
+        # command -> (handler, is_async); handlers receive the text after the command
+        self.commands = {
+            'help': (self._help_command, False),
+            'analyze': (self._analyze_command, True),
+            'negotiate': (self._negotiate_command, True),
+            'summarize': (self._summarize_command, True),
+            'feedback': (self._feedback_command, True),
+            'demo': (self._demo_command, True),
+            'status': (self._status_command, False),
+        }
     
     async def start_chat(self):
         """Start the interactive chat session"""
@@ -38,42 +88,23 @@ class NegotiationChat:
         while True:
             try:
                 command = input("Negotiation Trainer> ").strip()
+                head, _, argument = command.partition(' ')
+                head = head.lower()
+                argument = argument.strip()
                 
-                if command.lower() in ['quit', 'exit', 'q']:
+                if head in QUIT_COMMANDS and not argument:
                     print("Goodbye! Keep practicing your negotiation skills!")
                     break
                 
-                elif command.lower() == 'help':
-                    self.print_help()
-                
-                elif command.startswith('analyze '):
-                    file_path = command[8:].strip()
-                    if file_path:
-                        await self.analyze_supplier(file_path)
-                    else:
-                        print("Please provide a file path: analyze <file_path>")
-                
-                elif command.startswith('negotiate '):
-                    message = command[10:].strip()
-                    if message:
-                        await self.negotiate(message)
-                    else:
-                        print("Please provide a message: negotiate <your_message>")
-                
-                elif command.lower() == 'summarize':
-                    await self.summarize_conversation()
-                
-                elif command.lower() == 'feedback':
-                    await self.get_feedback()
-                
-                elif command.lower() == 'demo':
-                    await self.run_demo()
-                
-                elif command.lower() == 'status':
-                    self.show_status()
-                
-                else:
+                entry = self.commands.get(head)
+                if entry is None or (head in NO_ARG_COMMANDS and argument):
                     print("Unknown command. Type 'help' for available commands.")
+                else:
+                    handler, is_async = entry
+                    if is_async:
+                        await handler(argument)
+                    else:
+                        handler(argument)
                 
                 print()  # Add spacing between commands
                 
@@ -83,11 +114,40 @@ class NegotiationChat:
             except Exception as e:
                 print(f"❌ Unexpected error: {str(e)}")
     
+    def _help_command(self, argument: str):
+        self.print_help()
+    
+    async def _analyze_command(self, file_path: str):
+        if file_path:
+            await self.analyze_supplier(file_path)
+        else:
+            print("Please provide a file path: analyze <file_path>")
+    
+    async def _negotiate_command(self, message: str):
+        if message:
+            await self.negotiate(message)
+        else:
+            print("Please provide a message: negotiate <your_message>")
+    
+    async def _summarize_command(self, argument: str):
+        await self.summarize_conversation()
+    
+    async def _feedback_command(self, argument: str):
+        await self.get_feedback()
+    
+    async def _demo_command(self, argument: str):
+        await self.run_demo()
+    
+    def _status_command(self, argument: str):
+        self.show_status()
+    
     async def analyze_supplier(self, file_path: str):
         """Analyze supplier data from a file"""
         print(f"🔍 Analyzing supplier data from: {file_path}")
         
         try:
+            from mcp_host.tools.analyze_supplier import analyze_supplier_tool
+            
             result = await analyze_supplier_tool(file_path, self.session_context)
             
             print("✅ Analysis completed successfully!")
@@ -111,22 +171,31 @@ class NegotiationChat:
         print(f"👤 You: {message}")
         
         try:
-            result = await simulate_supplier_response_tool(
-                message, 
-                self.session_context,
-                self.negotiation_transcript
-            )
-            
-            response = result.get("response", "No response generated")
-            strategy = result.get("strategy", "unknown")
-            confidence = result.get("confidence", 0)
-            
-            print(f"🏭 Supplier: {response}")
-            print(f"   Strategy: {strategy} | Confidence: {confidence:.1%}")
+            result = await self.negotiate_and_capture(message, self.negotiation_transcript)
+            self.print_supplier_response(result)
             
         except Exception as e:
             print(f"❌ Error generating supplier response: {str(e)}")
     
+    async def negotiate_and_capture(self, message: str, transcript: list) -> dict:
+        """Generate a supplier response without printing it"""
+        from mcp_host.tools.simulate_supplier_response import simulate_supplier_response_tool
+        
+        return await simulate_supplier_response_tool(
+            message, 
+            self.session_context,
+            transcript
+        )
+    
+    def print_supplier_response(self, result: dict):
+        """Print a supplier response with its strategy and confidence"""
+        response = result.get("response", "No response generated")
+        strategy = result.get("strategy", "unknown")
+        confidence = result.get("confidence", 0)
+        
+        print(f"🏭 Supplier: {response}")
+        print(f"   Strategy: {strategy} | Confidence: {confidence:.1%}")
+    
     async def summarize_conversation(self):
         """Analyze the current conversation"""
         if not self.negotiation_transcript:
@@ -136,26 +205,27 @@ class NegotiationChat:
         print("📊 Analyzing conversation...")
         
         try:
-            result = await summarize_negotiation_transcript_tool("", self.negotiation_transcript)
+            from mcp_host.tools.summarize_negotiation_transcript import summarize_negotiation_transcript_tool
             
-            print("✅ Conversation analysis completed!")
+            result = await summarize_negotiation_transcript_tool("", self.negotiation_transcript)
             
             summary = result.get("summary", {})
             sentiment = result.get("sentiment_analysis", {})
             strategies = result.get("strategy_analysis", {})
             
-            print(f"   Total messages: {summary.get('total_messages', 0)}")
-            print(f"   Buyer messages: {summary.get('buyer_messages', 0)}")
-            print(f"   Supplier messages: {summary.get('supplier_messages', 0)}")
-            
             buyer_sentiment = sentiment.get("buyer_sentiment", {})
             supplier_sentiment = sentiment.get("supplier_sentiment", {})
-            
-            print(f"   Your sentiment: {buyer_sentiment.get('label', 'unknown')}")
-            print(f"   Supplier sentiment: {supplier_sentiment.get('label', 'unknown')}")
-            
             buyer_strategies = strategies.get("buyer_strategies", [])
-            print(f"   Your strategies: {', '.join(buyer_strategies) if buyer_strategies else 'None detected'}")
+            
+            out = OutputBuffer()
+            out("✅ Conversation analysis completed!")
+            out(f"   Total messages: {summary.get('total_messages', 0)}")
+            out(f"   Buyer messages: {summary.get('buyer_messages', 0)}")
+            out(f"   Supplier messages: {summary.get('supplier_messages', 0)}")
+            out(f"   Your sentiment: {buyer_sentiment.get('label', 'unknown')}")
+            out(f"   Supplier sentiment: {supplier_sentiment.get('label', 'unknown')}")
+            out(f"   Your strategies: {', '.join(buyer_strategies) if buyer_strategies else 'None detected'}")
+            out.flush()
             
         except Exception as e:
             print(f"❌ Error analyzing conversation: {str(e)}")
@@ -169,6 +239,9 @@ class NegotiationChat:
         print("🎓 Generating training feedback...")
         
         try:
+            from mcp_host.tools.summarize_negotiation_transcript import summarize_negotiation_transcript_tool
+            from mcp_host.tools.generate_feedback import generate_feedback_tool
+            
             # First get the analysis
             analysis_result = await summarize_negotiation_transcript_tool("", self.negotiation_transcript)
             
@@ -205,16 +278,38 @@ class NegotiationChat:
             "We've been a loyal customer for 2 years, is there any flexibility?"
         ]
         
+        if not self.supplier_data_loaded:
+            return
+        
         print("Starting demo negotiation...")
         print()
         
-        for i, message in enumerate(demo_messages, 1):
+        # Generate the replies concurrently (bounded) against the same history
+        # snapshot, then print and record them in order as each one is ready
+        semaphore = asyncio.Semaphore(DEMO_CONCURRENCY)
+        history = list(self.negotiation_transcript)
+        
+        async def respond(message: str) -> dict:
+            async with semaphore:
+                return await self.negotiate_and_capture(message, history)
+        
+        tasks = [asyncio.create_task(respond(message)) for message in demo_messages]
+        
+        for i, (message, task) in enumerate(zip(demo_messages, tasks), 1):
             print(f"[Message {i}]")
-            await self.negotiate(message)
-            print()
+            print(f"👤 You: {message}")
+            
+            try:
+                result = await task
+                self.print_supplier_response(result)
+                self.negotiation_transcript.extend([
+                    {"role": "buyer", "message": message},
+                    {"role": "supplier", "message": result.get("response", "")}
+                ])
+            except Exception as e:
+                print(f"❌ Error generating supplier response: {str(e)}")
             
-            # Small delay for realism
-            await asyncio.sleep(1)
+            print()
         
         print("Demo negotiation completed!")
         print("Now analyzing the conversation...")
@@ -238,35 +333,8 @@ class NegotiationChat:
     
     def print_help(self):
         """Print help information"""
-        print("""
-Available Commands:
-==================
-
-analyze <file_path>     - Analyze supplier data from CSV, PDF, or TXT file
-negotiate <message>     - Send a negotiation message to the supplier
-summarize              - Analyze the current negotiation conversation
-feedback               - Generate training feedback and recommendations
-demo                   - Run a demonstration negotiation
-status                 - Show current session status
-help                   - Show this help message
-quit/exit/q            - Exit the application
-
-Example Usage:
-=============
-1. analyze examples/supplier_data.csv
-2. negotiate "We'd like to discuss pricing for our next quarter order"
-3. negotiate "What kind of volume discount can you offer?"
-4. summarize
-5. feedback
-
-Tips:
-=====
-- Start by analyzing supplier data to load context
-- Use specific, business-like language in negotiations
-- Ask for discounts, volume pricing, delivery terms
-- Mention competitors, long-term relationships, or urgency
-- Get feedback after each negotiation session
-""")
+        sys.stdout.write(HELP_TEXT)
+        sys.stdout.flush()
 
 async def main():
     """Main entry point"""
@@ -0,0 +1,49 @@
+"""
+Console helpers shared by the TactoLearn chat interfaces
+"""
+
+import sys
+import asyncio
+import threading
+from typing import List, Optional, TextIO
+
+class OutputBuffer:
+    """Collect lines like print() and write them to stdout in one call"""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream
+        self._lines: List[str] = []
+
+    def __call__(self, line: str = ""):
+        self._lines.append(line)
+
+    def flush(self):
+        """Write all buffered lines at once"""
+        if not self._lines:
+            return
+
+        stream = self.stream or sys.stdout
+        stream.write("\n".join(self._lines) + "\n")
+        stream.flush()
+        self._lines.clear()
+
+def ainput(prompt: str = "") -> asyncio.Future:
+    """Read a line from stdin on a daemon thread so the event loop keeps running"""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def resolve(setter, value):
+        if not future.done():
+            setter(value)
+
+    def read_line():
+        try:
+            line = input(prompt)
+        except BaseException as e:
+            loop.call_soon_threadsafe(resolve, future.set_exception, e)
+        else:
+            loop.call_soon_threadsafe(resolve, future.set_result, line)
+
+    # Daemon thread so a pending read never blocks interpreter exit
+    threading.Thread(target=read_line, daemon=True).start()
+    return future
@@ -9,23 +9,68 @@ and testing the negotiation training tools.
 import asyncio
 import json
 import logging
+import os
 import sys
 from typing import Dict, Any, List, Optional
 from pathlib import Path
+from contextlib import AsyncExitStack
 
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 
+try:
+    import uvloop
+except ImportError:  # pragma: no cover - optional speedup
+    try:
+        # Windows port with the same API
+        import winloop as uvloop
+    except ImportError:
+        uvloop = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Shown when the host refuses a call that repeats the same request too often
+LOOP_DETECTED_MESSAGE = (
+    "The host stopped this call because it repeated the same request several times in a row. "
+    "Type 'reset' to allow it again."
+)
+
+def _is_loop_abort(text: str) -> bool:
+    """Check whether a tool result is the host's loop-detection refusal"""
+    # Cheap substring test first so ordinary results are never parsed here
+    if '"loop_detected"' not in text:
+        return False
+    try:
+        payload = json.loads(text)
+    except json.JSONDecodeError:
+        return False
+    return isinstance(payload, dict) and payload.get("error") == "loop_detected" and bool(payload.get("abort"))
+
+def _content_text(content: Any) -> str:
+    try:
+        return content.text
+    except AttributeError:
+        return str(content)
+
+def extract_text(result: Any) -> str:
+    """Join the text of a tool result; large results arrive split across several blocks"""
+    content = result.content
+    if not content:
+        return "No content returned"
+    if len(content) == 1:
+        return _content_text(content[0])
+    return "".join(map(_content_text, content))
+
 class NegotiationTrainerClient:
     """Client for the Negotiation Trainer MCP Agent"""
     
     def __init__(self):
         self.session: Optional[ClientSession] = None
         self.available_tools: List[Dict[str, Any]] = []
+        # Holds the stdio transport and session open until aclose()
+        self._exit_stack: Optional[AsyncExitStack] = None
         
     async def connect(self, host_command: List[str]):
         """Connect to the MCP host"""
@@ -35,24 +80,43 @@ class NegotiationTrainerClient:
                 args=host_command[1:] if len(host_command) > 1 else []
             )
             
-            # Use the context manager properly
-            async with stdio_client(server_params) as (read_stream, write_stream):
-                self.session = ClientSession(read_stream, write_stream)
-                
-                # Initialize the session
-                await self.session.initialize()
-                
-                # List available tools
-                tools_result = await self.session.list_tools()
-                self.available_tools = tools_result.tools
-                
-                logger.info(f"Connected to MCP host. Available tools: {len(self.available_tools)}")
-                return True
+            # Keep the host process and session alive for the whole client
+            # lifetime instead of re-spawning them per call
+            self._exit_stack = AsyncExitStack()
+            read_stream, write_stream = await self._exit_stack.enter_async_context(
+                stdio_client(server_params)
+            )
+            self.session = await self._exit_stack.enter_async_context(
+                ClientSession(read_stream, write_stream)
+            )
+            
+            # Initialize the session
+            await self.session.initialize()
+            
+            # List available tools once; the schemas are static
+            tools_result = await self.session.list_tools()
+            self.available_tools = tools_result.tools
+            
+            logger.info(f"Connected to MCP host. Available tools: {len(self.available_tools)}")
+            return True
             
         except Exception as e:
             logger.error(f"Failed to connect to MCP host: {str(e)}")
+            await self.aclose()
             return False
     
+    async def aclose(self):
+        """Close the session and stop the host process"""
+        if self._exit_stack is None:
+            return
+        
+        exit_stack, self._exit_stack = self._exit_stack, None
+        self.session = None
+        try:
+            await exit_stack.aclose()
+        except Exception as e:
+            logger.error(f"Error closing MCP connection: {str(e)}")
+    
     async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Call a tool on the MCP host"""
         if not self.session:
@@ -60,24 +124,49 @@ class NegotiationTrainerClient:
         
         try:
             result = await self.session.call_tool(tool_name, arguments)
-            
-            # Extract text content from result
-            if result.content and len(result.content) > 0:
-                content = result.content[0]
-                if hasattr(content, 'text'):
-                    return {"success": True, "result": content.text}
-                else:
-                    return {"success": True, "result": str(content)}
-            else:
-                return {"success": True, "result": "No content returned"}
+            text = extract_text(result)
+            if _is_loop_abort(text):
+                return {"success": False, "error": LOOP_DETECTED_MESSAGE, "loop_detected": True}
+            return {"success": True, "result": text}
                 
         except Exception as e:
             logger.error(f"Error calling tool {tool_name}: {str(e)}")
             return {"success": False, "error": str(e)}
     
     async def analyze_supplier(self, file_path: str) -> Dict[str, Any]:
-        """Analyze supplier data from a file"""
-        return await self.call_tool("analyze_supplier", {"file_path": file_path})
+        """Analyze supplier data from a file, waiting for the background job"""
+        result = await self.call_tool("analyze_supplier", {"file_path": file_path})
+        if not result["success"]:
+            return result
+        
+        try:
+            job = json.loads(result["result"])
+        except json.JSONDecodeError:
+            return {"success": False, "error": result["result"]}
+        return await self.wait_for_job(job["job_id"])
+    
+    async def wait_for_job(self, job_id: str, interval: float = 0.5) -> Dict[str, Any]:
+        """Poll a host job until it finishes"""
+        while True:
+            result = await self.call_tool("poll_job", {"job_id": job_id})
+            if not result["success"]:
+                return result
+            
+            try:
+                status = json.loads(result["result"])
+            except json.JSONDecodeError:
+                return {"success": False, "error": result["result"]}
+            
+            if status["status"] == "done":
+                return {"success": True, "result": json.dumps(status["result"])}
+            if status["status"] == "error":
+                return {"success": False, "error": status["error"]}
+            
+            await asyncio.sleep(interval)
+    
+    async def reset_loop_detector(self) -> Dict[str, Any]:
+        """Clear the host's repeated-call guard after a loop_detected refusal"""
+        return await self.call_tool("reset_loop_detector", {})
     
     async def simulate_supplier_response(self, user_message: str) -> Dict[str, Any]:
         """Simulate a supplier response to user message"""
@@ -90,9 +179,40 @@ class NegotiationTrainerClient:
             args["transcript_path"] = transcript_path
         return await self.call_tool("summarize_negotiation_transcript", args)
     
-    async def generate_feedback(self, report_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate feedback from analysis report"""
-        return await self.call_tool("generate_feedback", {"report_data": report_data})
+    async def generate_feedback(self, report_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Generate feedback from an analysis report, or the host's last summary"""
+        args = {}
+        if report_data:
+            args["report_data"] = report_data
+        return await self.call_tool("generate_feedback", args)
+    
+    async def call_batch(
+        self,
+        calls: List[Dict[str, Any]],
+        max_concurrent: int = 4,
+        stop_on_error: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Run several tool calls in one round-trip; returns one result dict per call"""
+        result = await self.call_tool("batch_execute", {
+            "calls": calls,
+            "maxConcurrent": max_concurrent,
+            "stopOnError": stop_on_error
+        })
+        if not result["success"]:
+            return [{"success": False, "error": result["error"]} for _ in calls]
+        
+        try:
+            return json.loads(result["result"])
+        except json.JSONDecodeError:
+            # The host reports failures as plain text
+            return [{"success": False, "error": result["result"]} for _ in calls]
+    
+    async def summarize_with_feedback(self) -> List[Dict[str, Any]]:
+        """Summarize the transcript and generate feedback from it in one round-trip"""
+        return await self.call_batch([
+            {"name": "summarize_negotiation_transcript", "arguments": {}},
+            {"name": "generate_feedback", "arguments": {"report_data": {"$result": 0}}}
+        ])
     
     def list_tools(self):
         """List available tools"""
@@ -103,6 +223,114 @@ class NegotiationTrainerClient:
             print(f"  Description: {tool.description}")
             print()
 
+HELP_TEXT = """
+Available Commands:
+==================
+
+analyze <file_path>     - Analyze supplier data from CSV or PDF file
+negotiate <message>     - Send a negotiation message to the supplier
+summarize              - Analyze the current negotiation transcript
+feedback               - Generate training feedback and recommendations
+tools                  - List all available tools
+reset                  - Allow a call again after the host stopped it as repeated
+demo                   - Run a demonstration negotiation
+help                   - Show this help message
+quit/exit/q            - Exit the application
+
+Example Usage:
+=============
+1. analyze supplier_data.csv
+2. negotiate "We'd like to discuss pricing for our next quarter order"
+3. negotiate "What kind of volume discount can you offer?"
+4. summarize
+5. feedback
+
+"""
+
+# Prefix for error lines shown to the user
+ERROR_PREFIX = "❌ Error: "
+
+# Demo messages sent to the host at the same time
+DEMO_CONCURRENCY = 5
+
+# Commands that end the session
+QUIT_COMMANDS = {'quit', 'exit', 'q'}
+
+# Commands that must be typed on their own, without an argument
+NO_ARG_COMMANDS = {'help', 'tools', 'summarize', 'feedback', 'demo', 'reset'}
+
+async def help_command(client: NegotiationTrainerClient, argument: str):
+    print_help()
+
+async def tools_command(client: NegotiationTrainerClient, argument: str):
+    client.list_tools()
+
+async def analyze_command(client: NegotiationTrainerClient, file_path: str):
+    if not file_path:
+        print("Please provide a file path: analyze <file_path>")
+        return
+    
+    print(f"Analyzing supplier data from: {file_path}")
+    result = await client.analyze_supplier(file_path)
+    if result["success"]:
+        print("✅ Analysis completed successfully!")
+        print(pretty_json(result["result"]))
+    else:
+        print(ERROR_PREFIX + result["error"])
+
+async def negotiate_command(client: NegotiationTrainerClient, message: str):
+    if not message:
+        print("Please provide a message: negotiate <your_message>")
+        return
+    
+    print(f"You: {message}")
+    result = await client.simulate_supplier_response(message)
+    if result["success"]:
+        print(f"Supplier: {result['result']}")
+    else:
+        print(ERROR_PREFIX + result["error"])
+
+async def summarize_command(client: NegotiationTrainerClient, argument: str):
+    print("Analyzing negotiation transcript...")
+    result = await client.summarize_transcript()
+    if result["success"]:
+        print("✅ Transcript analysis completed!")
+        print(pretty_json(result["result"]))
+    else:
+        print(ERROR_PREFIX + result["error"])
+
+async def feedback_command(client: NegotiationTrainerClient, argument: str):
+    print("Generating training feedback...")
+    analysis_result, feedback_result = await client.summarize_with_feedback()
+    if not analysis_result["success"]:
+        print(f"❌ Error: Could not analyze transcript: {analysis_result['error']}")
+    elif feedback_result["success"]:
+        print("✅ Feedback generated!")
+        print(feedback_result["result"])
+    else:
+        print(f"❌ Error generating feedback: {feedback_result['error']}")
+
+async def demo_command(client: NegotiationTrainerClient, argument: str):
+    await run_demo(client)
+
+async def reset_command(client: NegotiationTrainerClient, argument: str):
+    result = await client.reset_loop_detector()
+    if result["success"]:
+        print("✅ Repeated-call guard reset, you can run the command again")
+    else:
+        print(ERROR_PREFIX + result["error"])
+
+COMMANDS = {
+    'help': help_command,
+    'tools': tools_command,
+    'analyze': analyze_command,
+    'negotiate': negotiate_command,
+    'summarize': summarize_command,
+    'feedback': feedback_command,
+    'demo': demo_command,
+    'reset': reset_command,
+}
+
 async def interactive_mode(client: NegotiationTrainerClient):
     """Run interactive negotiation training session"""
     
@@ -115,74 +343,19 @@ async def interactive_mode(client: NegotiationTrainerClient):
     while True:
         try:
             command = input("Negotiation Trainer> ").strip()
+            head, _, argument = command.partition(' ')
+            head = head.lower()
+            argument = argument.strip()
             
-            if command.lower() in ['quit', 'exit', 'q']:
+            if head in QUIT_COMMANDS and not argument:
                 print("Goodbye! Keep practicing your negotiation skills!")
                 break
             
-            elif command.lower() == 'help':
-                print_help()
-            
-            elif command.lower() == 'tools':
-                client.list_tools()
-            
-            elif command.startswith('analyze '):
-                file_path = command[8:].strip()
-                if file_path:
-                    print(f"Analyzing supplier data from: {file_path}")
-                    result = await client.analyze_supplier(file_path)
-                    if result["success"]:
-                        print("✅ Analysis completed successfully!")
-                        print(result["result"])
-                    else:
-                        print(f"❌ Error: {result['error']}")
-                else:
-                    print("Please provide a file path: analyze <file_path>")
-            
-            elif command.startswith('negotiate '):
-                message = command[10:].strip()
-                if message:
-                    print(f"You: {message}")
-                    result = await client.simulate_supplier_response(message)
-                    if result["success"]:
-                        print(f"Supplier: {result['result']}")
-                    else:
-                        print(f"❌ Error: {result['error']}")
-                else:
-                    print("Please provide a message: negotiate <your_message>")
-            
-            elif command.lower() == 'summarize':
-                print("Analyzing negotiation transcript...")
-                result = await client.summarize_transcript()
-                if result["success"]:
-                    print("✅ Transcript analysis completed!")
-                    print(result["result"])
-                else:
-                    print(f"❌ Error: {result['error']}")
-            
-            elif command.lower() == 'feedback':
-                print("Generating training feedback...")
-                # First get the analysis
-                analysis_result = await client.summarize_transcript()
-                if analysis_result["success"]:
-                    try:
-                        report_data = json.loads(analysis_result["result"])
-                        feedback_result = await client.generate_feedback(report_data)
-                        if feedback_result["success"]:
-                            print("✅ Feedback generated!")
-                            print(feedback_result["result"])
-                        else:
-                            print(f"❌ Error generating feedback: {feedback_result['error']}")
-                    except json.JSONDecodeError:
-                        print("❌ Error: Could not parse analysis results")
-                else:
-                    print(f"❌ Error: Could not analyze transcript: {analysis_result['error']}")
-            
-            elif command.lower() == 'demo':
-                await run_demo(client)
-            
-            else:
+            handler = COMMANDS.get(head)
+            if handler is None or (head in NO_ARG_COMMANDS and argument):
                 print("Unknown command. Type 'help' for available commands.")
+            else:
+                await handler(client, argument)
             
             print()  # Add spacing between commands
             
@@ -192,29 +365,17 @@ async def interactive_mode(client: NegotiationTrainerClient):
         except Exception as e:
             print(f"❌ Unexpected error: {str(e)}")
 
+def pretty_json(text: str) -> str:
+    """Indent a compact JSON payload for display, leaving plain text as is"""
+    try:
+        return json.dumps(json.loads(text), indent=2)
+    except (json.JSONDecodeError, TypeError):
+        return text
+
 def print_help():
     """Print help information"""
-    print("""
-Available Commands:
-==================
-
-analyze <file_path>     - Analyze supplier data from CSV or PDF file
-negotiate <message>     - Send a negotiation message to the supplier
-summarize              - Analyze the current negotiation transcript
-feedback               - Generate training feedback and recommendations
-tools                  - List all available tools
-demo                   - Run a demonstration negotiation
-help                   - Show this help message
-quit/exit/q            - Exit the application
-
-Example Usage:
-=============
-1. analyze supplier_data.csv
-2. negotiate "We'd like to discuss pricing for our next quarter order"
-3. negotiate "What kind of volume discount can you offer?"
-4. summarize
-5. feedback
-""")
+    sys.stdout.write(HELP_TEXT)
+    sys.stdout.flush()
 
 async def run_demo(client: NegotiationTrainerClient):
     """Run a demonstration negotiation"""
@@ -233,41 +394,49 @@ async def run_demo(client: NegotiationTrainerClient):
     print("Starting demo negotiation...")
     print()
     
-    for i, message in enumerate(demo_messages, 1):
-        print(f"[Message {i}] You: {message}")
+    # Pause between messages only when presenting
+    realism_delay = os.environ.get("DEMO_REALISM")
+    
+    # Send every message up front; the host runs the turns in arrival
+    # order under its transcript lock, so only the round-trips overlap
+    semaphore = asyncio.Semaphore(DEMO_CONCURRENCY)
+    
+    async def send(message: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await client.simulate_supplier_response(message)
+    
+    results = await asyncio.gather(*[send(message) for message in demo_messages])
+    
+    for i, (message, result) in enumerate(zip(demo_messages, results), 1):
+        out = [f"[Message {i}] You: {message}\n"]
         
-        result = await client.simulate_supplier_response(message)
         if result["success"]:
-            print(f"[Response {i}] Supplier: {result['result']}")
+            out.append(f"[Response {i}] Supplier: {result['result']}\n")
         else:
-            print(f"❌ Error: {result['error']}")
+            out.append(ERROR_PREFIX + result["error"] + "\n")
+        out.append("\n")
         
-        print()
+        sys.stdout.write("".join(out))
+        sys.stdout.flush()
         
-        # Small delay for realism
-        await asyncio.sleep(1)
+        if realism_delay:
+            await asyncio.sleep(1)
     
     print("Demo negotiation completed!")
     print("Now analyzing the transcript...")
     
-    # Analyze the demo
-    analysis_result = await client.summarize_transcript()
+    # Analyze the demo and generate feedback in a single round-trip
+    analysis_result, feedback_result = await client.summarize_with_feedback()
     if analysis_result["success"]:
         print("✅ Analysis completed!")
-        print(analysis_result["result"])
+        print(json.dumps(analysis_result["result"], indent=2))
         
-        # Generate feedback
         print("\nGenerating feedback...")
-        try:
-            report_data = json.loads(analysis_result["result"])
-            feedback_result = await client.generate_feedback(report_data)
-            if feedback_result["success"]:
-                print("✅ Feedback generated!")
-                print(feedback_result["result"])
-            else:
-                print(f"❌ Error generating feedback: {feedback_result['error']}")
-        except json.JSONDecodeError:
-            print("❌ Error: Could not parse analysis results")
+        if feedback_result["success"]:
+            print("✅ Feedback generated!")
+            print(feedback_result["result"])
+        else:
+            print(f"❌ Error generating feedback: {feedback_result['error']}")
     else:
         print(f"❌ Error analyzing transcript: {analysis_result['error']}")
 
@@ -300,7 +469,13 @@ async def main():
     print("✅ Connected to MCP host successfully!")
     
     # Run interactive mode
-    await interactive_mode(client)
+    try:
+        await interactive_mode(client)
+    finally:
+        await client.aclose()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
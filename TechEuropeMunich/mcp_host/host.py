@@ -7,9 +7,15 @@ and maintains session context for supplier data.
 """
 
 import asyncio
+import functools
+import importlib
 import json
 import logging
-from typing import Any, Dict, List, Optional
+import os
+import sys
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
 from contextlib import asynccontextmanager
 
 from mcp.server import Server
@@ -19,146 +25,258 @@ from mcp.types import (
     CallToolRequest,
     CallToolResult,
     ListToolsRequest,
-    ListToolsResult,
     Tool,
     TextContent,
     ImageContent,
 )
 
-# Import our custom tools
-from tools.analyze_supplier import analyze_supplier_tool
-from tools.simulate_supplier_response import simulate_supplier_response_tool
-from tools.summarize_negotiation_transcript import summarize_negotiation_transcript_tool
-from tools.generate_feedback import generate_feedback_tool
+# Our custom tools are imported on first use (see load_tool)
+from tools import json_codec
+
+try:
+    import uvloop
+except ImportError:  # pragma: no cover - optional speedup
+    try:
+        # Windows port with the same API
+        import winloop as uvloop
+    except ImportError:
+        uvloop = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Messages kept in memory; older ones are appended to the archive file
+TRANSCRIPT_MAX = int(os.getenv("MCP_TRANSCRIPT_MAX", "500"))
+TRANSCRIPT_ARCHIVE = os.getenv("MCP_TRANSCRIPT_ARCHIVE", "transcript_archive.jsonl")
+
+# The host refuses a call that would make this many identical calls in a row
+LOOP_REPEAT_LIMIT = 4
+
+# Tools that are expected to be called repeatedly with the same arguments
+LOOP_EXEMPT_TOOLS = {"poll_job", "reset_loop_detector"}
+
+# Maximum number of tool calls running at once
+MAX_IN_FLIGHT = int(os.getenv("MCP_MAX_IN_FLIGHT", "8"))
+
+# Cheap bookkeeping tools that never wait for a MAX_IN_FLIGHT slot
+UNTHROTTLED_TOOLS = {"poll_job", "reset_loop_detector"}
+
+# Background analysis jobs running at once, limited separately from tool calls
+MAX_JOBS = int(os.getenv("MCP_MAX_JOBS", "2"))
+# Seconds a finished job's result is kept for a client that never polls it
+JOB_RESULT_TTL = float(os.getenv("MCP_JOB_RESULT_TTL", "600"))
+
+# Large results are split into text blocks of at most this many characters
+RESULT_CHUNK_SIZE = 64 * 1024
+
+# Tool implementations by name; they pull in pandas, the LLM client and the
+# vector store, so each is only imported once a session actually uses it
+TOOL_IMPORTS = {
+    "analyze_supplier": ("tools.analyze_supplier", "analyze_supplier_tool"),
+    "simulate_supplier_response": ("tools.simulate_supplier_response", "simulate_supplier_response_tool"),
+    "summarize_negotiation_transcript": ("tools.summarize_negotiation_transcript", "summarize_negotiation_transcript_tool"),
+    "generate_feedback": ("tools.generate_feedback", "generate_feedback_tool"),
+}
+
+@functools.cache
+def load_tool(name: str):
+    """Import a tool implementation on first use"""
+    module_name, attr = TOOL_IMPORTS[name]
+    return getattr(importlib.import_module(module_name), attr)
+
 class NegotiationTrainerHost:
     """MCP Host for the Negotiation Trainer Agent"""
     
     def __init__(self):
         self.server = Server("negotiation-trainer")
         self.session_context: Dict[str, Any] = {}
-        self.negotiation_transcript: List[Dict[str, str]] = []
+        self.negotiation_transcript: Deque[Dict[str, str]] = deque(maxlen=TRANSCRIPT_MAX)
+        
+        # Tool dispatch; calls run concurrently up to MAX_IN_FLIGHT
+        self._handlers = {
+            "analyze_supplier": self._analyze_supplier,
+            "simulate_supplier_response": self._simulate_supplier_response,
+            "summarize_negotiation_transcript": self._summarize_negotiation_transcript,
+            "generate_feedback": self._generate_feedback,
+            "poll_job": self._poll_job,
+            "reset_loop_detector": self._reset_loop_detector,
+        }
+        self._in_flight = asyncio.Semaphore(MAX_IN_FLIGHT)
+        self._job_slots = asyncio.Semaphore(MAX_JOBS)
+        self._transcript_lock = asyncio.Lock()
+        
+        # Background analysis jobs by id, dropped once collected or after JOB_RESULT_TTL
+        self._jobs: Dict[str, asyncio.Task] = {}
+        
+        # (tool name, argument fingerprint) of recent calls for loop detection
+        self._recent_calls: Deque[tuple] = deque(maxlen=8)
         
         # Register tools
         self._register_tools()
         
-    def _register_tools(self):
-        """Register all negotiation training tools"""
-        
-        @self.server.list_tools()
-        async def list_tools() -> ListToolsResult:
-            """List available negotiation training tools"""
-            return ListToolsResult(
-                tools=[
-                    Tool(
-                        name="analyze_supplier",
-                        description="Analyze supplier data from CSV or PDF files to extract pricing, delivery times, quality metrics, and past purchase volumes",
-                        inputSchema={
-                            "type": "object",
-                            "properties": {
-                                "file_path": {
-                                    "type": "string",
-                                    "description": "Path to the supplier data file (CSV or PDF)"
-                                }
-                            },
-                            "required": ["file_path"]
+    @staticmethod
+    def _build_tools() -> List[Tool]:
+        """Tool definitions; built once since the schemas never change"""
+        return [
+            Tool(
+                name="analyze_supplier",
+                description="Analyze supplier data from CSV or PDF files to extract pricing, delivery times, quality metrics, and past purchase volumes. Runs in the background and returns a job id for poll_job",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "file_path": {
+                            "type": "string",
+                            "description": "Path to the supplier data file (CSV or PDF)"
                         }
-                    ),
-                    Tool(
-                        name="simulate_supplier_response",
-                        description="Generate a realistic supplier response during negotiation based on analyzed supplier data",
-                        inputSchema={
-                            "type": "object",
-                            "properties": {
-                                "user_message": {
-                                    "type": "string",
-                                    "description": "The buyer's negotiation message"
-                                }
-                            },
-                            "required": ["user_message"]
+                    },
+                    "required": ["file_path"]
+                }
+            ),
+            Tool(
+                name="poll_job",
+                description="Check on a background job started by analyze_supplier and collect its result when done",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "job_id": {
+                            "type": "string",
+                            "description": "The job id returned by analyze_supplier"
                         }
-                    ),
-                    Tool(
-                        name="summarize_negotiation_transcript",
-                        description="Analyze a negotiation transcript to extract key metrics, sentiment, and strategy patterns",
-                        inputSchema={
-                            "type": "object",
-                            "properties": {
-                                "transcript_path": {
-                                    "type": "string",
-                                    "description": "Path to the negotiation transcript file"
-                                }
-                            },
-                            "required": ["transcript_path"]
+                    },
+                    "required": ["job_id"]
+                }
+            ),
+            Tool(
+                name="reset_loop_detector",
+                description="Clear the repeated-call guard after the host refused a call with loop_detected",
+                inputSchema={
+                    "type": "object",
+                    "properties": {}
+                }
+            ),
+            Tool(
+                name="simulate_supplier_response",
+                description="Generate a realistic supplier response during negotiation based on analyzed supplier data",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "user_message": {
+                            "type": "string",
+                            "description": "The buyer's negotiation message"
                         }
-                    ),
-                    Tool(
-                        name="generate_feedback",
-                        description="Generate training feedback and improvement suggestions based on negotiation analysis",
-                        inputSchema={
+                    },
+                    "required": ["user_message"]
+                }
+            ),
+            Tool(
+                name="summarize_negotiation_transcript",
+                description="Analyze a negotiation transcript to extract key metrics, sentiment, and strategy patterns",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "transcript_path": {
+                            "type": "string",
+                            "description": "Path to the negotiation transcript file"
+                        },
+                        "include_patterns": {
+                            "type": "boolean",
+                            "description": "Include the per-message role and length list in the conversation flow"
+                        }
+                    },
+                    "required": ["transcript_path"]
+                }
+            ),
+            Tool(
+                name="generate_feedback",
+                description="Generate training feedback and improvement suggestions based on negotiation analysis",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "report_data": {
                             "type": "object",
-                            "properties": {
-                                "report_data": {
-                                    "type": "object",
-                                    "description": "The negotiation analysis report data"
-                                }
-                            },
-                            "required": ["report_data"]
+                            "description": "The negotiation analysis report data (defaults to the last transcript summary)"
                         }
-                    )
-                ]
+                    }
+                }
+            ),
+            Tool(
+                name="batch_execute",
+                description="Run several tool calls in a single request, concurrently where they are independent",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "calls": {
+                            "type": "array",
+                            "description": "Tool calls to run; an argument of {\"$result\": i} is replaced by the result of call i",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "name": {"type": "string"},
+                                    "arguments": {"type": "object"}
+                                },
+                                "required": ["name"]
+                            }
+                        },
+                        "maxConcurrent": {
+                            "type": "integer",
+                            "description": "Maximum number of calls running at once (default 4)"
+                        },
+                        "stopOnError": {
+                            "type": "boolean",
+                            "description": "Skip calls that have not started once one fails"
+                        }
+                    },
+                    "required": ["calls"]
+                }
             )
+        ]
+    
+    def _append_message(self, role: str, message: str, evicted: List[Dict[str, str]]):
+        """Add a transcript message, collecting the oldest one in evicted once the buffer is full"""
+        if len(self.negotiation_transcript) == TRANSCRIPT_MAX:
+            evicted.append(self.negotiation_transcript[0])
+        self.negotiation_transcript.append({"role": role, "message": message})
+    
+    @staticmethod
+    def _archive_messages(entries: List[Dict[str, str]]):
+        """Append evicted messages to the archive file"""
+        try:
+            with open(TRANSCRIPT_ARCHIVE, "a", encoding="utf-8") as f:
+                f.write("".join(json_codec.dumps(entry) + "\n" for entry in entries))
+        except Exception as e:
+            logger.error(f"Error archiving transcript messages: {str(e)}")
+    
+    def _register_tools(self):
+        """Register all negotiation training tools"""
+        self._tools = self._build_tools()
+        
+        @self.server.list_tools()
+        async def list_tools() -> List[Tool]:
+            """List available negotiation training tools"""
+            return self._tools
         
         @self.server.call_tool()
         async def call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResult:
             """Handle tool calls"""
             try:
-                if name == "analyze_supplier":
-                    result = await analyze_supplier_tool(arguments["file_path"], self.session_context)
-                    return CallToolResult(
-                        content=[TextContent(type="text", text=json.dumps(result, indent=2))]
-                    )
-                
-                elif name == "simulate_supplier_response":
-                    result = await simulate_supplier_response_tool(
-                        arguments["user_message"], 
-                        self.session_context,
-                        self.negotiation_transcript
+                if self._is_looping(name, arguments):
+                    logger.warning(f"Refusing repeated call to {name}")
+                    result = {"error": "loop_detected", "abort": True}
+                elif name == "batch_execute":
+                    result = await self._run_batch(
+                        arguments["calls"],
+                        arguments.get("maxConcurrent", 4),
+                        arguments.get("stopOnError", False)
                     )
-                    # Add to transcript
-                    self.negotiation_transcript.append({
-                        "role": "buyer",
-                        "message": arguments["user_message"]
-                    })
-                    self.negotiation_transcript.append({
-                        "role": "supplier",
-                        "message": result["response"]
-                    })
-                    return CallToolResult(
-                        content=[TextContent(type="text", text=result["response"])]
-                    )
-                
-                elif name == "summarize_negotiation_transcript":
-                    result = await summarize_negotiation_transcript_tool(
-                        arguments["transcript_path"],
-                        self.negotiation_transcript
-                    )
-                    return CallToolResult(
-                        content=[TextContent(type="text", text=json.dumps(result, indent=2))]
-                    )
-                
-                elif name == "generate_feedback":
-                    result = await generate_feedback_tool(arguments["report_data"])
-                    return CallToolResult(
-                        content=[TextContent(type="text", text=result)]
-                    )
-                
                 else:
-                    raise ValueError(f"Unknown tool: {name}")
+                    result = await self._run_tool(name, arguments)
+                return CallToolResult(
+                    content=[
+                        TextContent(type="text", text=chunk)
+                        for chunk in self._chunk_text(self._format_result(result))
+                    ]
+                )
                     
             except Exception as e:
                 logger.error(f"Error calling tool {name}: {str(e)}")
@@ -166,21 +284,195 @@ class NegotiationTrainerHost:
                     content=[TextContent(type="text", text=f"Error: {str(e)}")]
                 )
     
+    async def _run_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
+        """Run a single tool and return its raw result"""
+        handler = self._handlers.get(name)
+        if handler is None:
+            raise ValueError(f"Unknown tool: {name}")
+        
+        if name in UNTHROTTLED_TOOLS:
+            return await handler(arguments)
+        async with self._in_flight:
+            return await handler(arguments)
+    
+    async def _analyze_supplier(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        # Large PDFs can take a while, so analysis runs as a job the client polls
+        async def run_job():
+            async with self._job_slots:
+                return await load_tool("analyze_supplier")(arguments["file_path"], self.session_context)
+        
+        job_id = uuid.uuid4().hex
+        task = asyncio.create_task(run_job())
+        self._jobs[job_id] = task
+        task.add_done_callback(lambda _: self._expire_job(job_id))
+        return {"job_id": job_id, "status": "pending"}
+    
+    def _expire_job(self, job_id: str):
+        """Drop a finished job after JOB_RESULT_TTL unless its result is collected first"""
+        asyncio.get_running_loop().call_later(JOB_RESULT_TTL, self._jobs.pop, job_id, None)
+    
+    async def _poll_job(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        job_id = arguments["job_id"]
+        task = self._jobs.get(job_id)
+        if task is None:
+            raise ValueError(f"Unknown job: {job_id}")
+        
+        if not task.done():
+            return {"job_id": job_id, "status": "running"}
+        
+        del self._jobs[job_id]
+        if task.cancelled():
+            return {"job_id": job_id, "status": "error", "error": "Job was cancelled"}
+        if task.exception() is not None:
+            return {"job_id": job_id, "status": "error", "error": str(task.exception())}
+        return {"job_id": job_id, "status": "done", "result": task.result()}
+    
+    async def _simulate_supplier_response(self, arguments: Dict[str, Any]) -> str:
+        # Turns depend on the transcript so far, so they run one at a time
+        async with self._transcript_lock:
+            result = await load_tool("simulate_supplier_response")(
+                arguments["user_message"], 
+                self.session_context,
+                self.negotiation_transcript
+            )
+            # Add to transcript
+            evicted: List[Dict[str, str]] = []
+            self._append_message("buyer", arguments["user_message"], evicted)
+            self._append_message("supplier", result["response"], evicted)
+            if evicted:
+                # Still under the lock, so archive writes stay in turn order
+                await asyncio.to_thread(self._archive_messages, evicted)
+        return result["response"]
+    
+    async def _reset_loop_detector(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        self._recent_calls.clear()
+        return {"status": "reset"}
+    
+    def _is_looping(self, name: str, arguments: Dict[str, Any]) -> bool:
+        """Record a call and report whether it completes LOOP_REPEAT_LIMIT identical calls in a row"""
+        if name in LOOP_EXEMPT_TOOLS:
+            return False
+        
+        fingerprint = (name, hash(json.dumps(arguments, sort_keys=True, default=str)))
+        self._recent_calls.append(fingerprint)
+        if len(self._recent_calls) < LOOP_REPEAT_LIMIT:
+            return False
+        
+        recent = list(self._recent_calls)[-LOOP_REPEAT_LIMIT:]
+        return all(call == fingerprint for call in recent)
+    
+    async def _summarize_negotiation_transcript(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        result = await load_tool("summarize_negotiation_transcript")(
+            arguments.get("transcript_path"),
+            # A snapshot, since the analysis runs in a worker thread while turns continue
+            list(self.negotiation_transcript),
+            include_patterns=bool(arguments.get("include_patterns", False))
+        )
+        # Kept so generate_feedback can run without the report being sent back
+        self.session_context["last_report"] = result
+        return result
+    
+    async def _generate_feedback(self, arguments: Dict[str, Any]) -> str:
+        report_data = arguments.get("report_data") or self.session_context.get("last_report")
+        if not report_data:
+            raise ValueError("No report data; summarize the transcript first")
+        return await load_tool("generate_feedback")(report_data)
+    
+    async def _run_batch(
+        self,
+        calls: List[Dict[str, Any]],
+        max_concurrent: int,
+        stop_on_error: bool
+    ) -> List[Dict[str, Any]]:
+        """
+        Run several tool calls in one request.
+        
+        Independent calls run concurrently. An argument of the form
+        {"$result": i} is replaced by the result of call i, so dependent
+        calls (e.g. summarize -> feedback) can share a round-trip.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrent))
+        failed = asyncio.Event()
+        tasks: List[asyncio.Task] = []
+        
+        async def resolve(value: Any, index: int) -> Any:
+            if isinstance(value, dict) and set(value) == {"$result"}:
+                ref = value["$result"]
+                if not isinstance(ref, int) or not 0 <= ref < index:
+                    raise ValueError(f"Call {index} references invalid result {ref}")
+                outcome = await tasks[ref]
+                if not outcome["success"]:
+                    raise ValueError(f"Call {index} depends on failed call {ref}")
+                return outcome["result"]
+            return value
+        
+        async def run_call(index: int, call: Dict[str, Any]) -> Dict[str, Any]:
+            name = call.get("name", "")
+            try:
+                arguments = {
+                    key: await resolve(value, index)
+                    for key, value in call.get("arguments", {}).items()
+                }
+                if stop_on_error and failed.is_set():
+                    return {"name": name, "success": False, "error": "Skipped after earlier error"}
+                async with semaphore:
+                    result = await self._run_tool(name, arguments)
+                return {"name": name, "success": True, "result": result}
+            except Exception as e:
+                logger.error(f"Error in batched call {name}: {str(e)}")
+                failed.set()
+                return {"name": name, "success": False, "error": str(e)}
+        
+        for index, call in enumerate(calls):
+            tasks.append(asyncio.create_task(run_call(index, call)))
+        
+        return list(await asyncio.gather(*tasks))
+    
+    @staticmethod
+    def _chunk_text(text: str) -> List[str]:
+        """Split text into RESULT_CHUNK_SIZE pieces the client concatenates"""
+        if len(text) <= RESULT_CHUNK_SIZE:
+            return [text]
+        return [text[i:i + RESULT_CHUNK_SIZE] for i in range(0, len(text), RESULT_CHUNK_SIZE)]
+    
+    @staticmethod
+    def _format_result(result: Any) -> str:
+        """Render a tool result as text content (compact JSON for structured results)"""
+        if isinstance(result, str):
+            return result
+        return json_codec.dumps(result)
+    
+    async def _warm_llm(self):
+        """Build the LLM service and pre-open its connections while the server starts"""
+        try:
+            module = await asyncio.to_thread(importlib.import_module, "tools.llm_service")
+            service = await asyncio.to_thread(module.get_llm_service)
+            await service.warmup()
+        except Exception as e:
+            logger.warning(f"LLM warmup failed: {str(e)}")
+    
     async def run(self):
         """Run the MCP server"""
-        async with stdio_server() as (read_stream, write_stream):
-            await self.server.run(
-                read_stream,
-                write_stream,
-                InitializationOptions(
-                    server_name="negotiation-trainer",
-                    server_version="1.0.0",
-                    capabilities=self.server.get_capabilities(
-                        notification_options=None,
-                        experimental_capabilities=None,
+        warmup = asyncio.create_task(self._warm_llm())
+        try:
+            async with stdio_server() as (read_stream, write_stream):
+                await self.server.run(
+                    read_stream,
+                    write_stream,
+                    InitializationOptions(
+                        server_name="negotiation-trainer",
+                        server_version="1.0.0",
+                        capabilities=self.server.get_capabilities(
+                            notification_options=None,
+                            experimental_capabilities=None,
+                        ),
                     ),
-                ),
-            )
+                )
+        finally:
+            warmup.cancel()
+            llm_module = sys.modules.get("tools.llm_service")
+            if llm_module is not None and llm_module.get_llm_service.cache_info().currsize:
+                await llm_module.get_llm_service().aclose()
 
 async def main():
     """Main entry point"""
@@ -188,7 +480,10 @@ async def main():
     await host.run()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
 
 
 
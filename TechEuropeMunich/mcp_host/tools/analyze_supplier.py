@@ -6,16 +6,93 @@ extracting key information for negotiation training.
 """
 
 import os
+import copy
 import json
+import asyncio
 import logging
 from typing import Dict, Any, List, Optional
+import numpy as np
 import pandas as pd
 import fitz  # PyMuPDF
 import re
 from datetime import datetime
+from collections import OrderedDict
+
+try:
+    import pyarrow  # noqa: F401 - enables pandas' Arrow CSV engine
+except ImportError:  # pragma: no cover - optional speedup
+    pyarrow = None
 
 logger = logging.getLogger(__name__)
 
+# Analyses of unchanged files are reused; TACTO_ANALYSIS_CACHE=0 disables this
+ANALYSIS_CACHE_ENABLED = os.getenv("TACTO_ANALYSIS_CACHE", "1") != "0"
+ANALYSIS_CACHE_SIZE = 64
+
+# (absolute path, mtime_ns, size) -> supplier data
+_ANALYSIS_CACHE: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+
+# Characters of PDF text to extract; only a 2000-character preview is kept
+# and the text extractors stop after a handful of matches per field
+PDF_TEXT_BUDGET = 64 * 1024
+
+# Plain text only; without TEXT_PRESERVE_LIGATURES ligatures such as "ﬁ" are
+# expanded, so the regex extractors see ordinary letters
+_PDF_TEXT_FLAGS = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP
+
+# Bytes of a plain-text file to read, for the same reason
+TEXT_FILE_BUDGET = 256 * 1024
+
+# Column-name keywords for each role in a supplier CSV, matched against
+# whole words of the column name
+_COLUMN_KEYWORDS = {
+    "name": frozenset({'supplier', 'vendor', 'company', 'name'}),
+    "id": frozenset({'id', 'code', 'number'}),
+    "product": frozenset({'product', 'item', 'sku', 'part', 'description'}),
+    "price": frozenset({'price', 'cost', 'rate', 'amount', 'value'}),
+    "delivery": frozenset({'delivery', 'lead', 'time', 'days', 'duration'}),
+    "quality": frozenset({'quality', 'rating', 'score', 'defect', 'reject'}),
+    "volume": frozenset({'volume', 'quantity', 'amount', 'units', 'qty'}),
+}
+
+# Words of a column name: splits on punctuation, underscores and camelCase
+_COLUMN_TOKEN_RE = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+
+# Every text extraction pattern fused into one alternation so the text is
+# scanned once. Name patterns are lookaheads so the rest of their line is
+# still scanned for prices and metrics. Quantifiers are kept unambiguous
+# (no digit run split between two quantifiers, day counts only start at
+# the beginning of a number) so long digit runs can't cause backtracking.
+_TEXT_RE = re.compile(
+    r"(?=Supplier:\s*(?P<supplier>[^\n\r]+))"
+    r"|(?=Vendor:\s*(?P<vendor>[^\n\r]+))"
+    r"|(?=Company:\s*(?P<company>[^\n\r]+))"
+    r"|(?=Contract with\s*(?P<contract>[^\n\r]+))"
+    r"|(?P<price>[\$€£¥]\s*[\d,]+(?:\.\d*)?)"
+    r"|(?<!\d)(?P<days_delivery>\d+)\s*days?\s*delivery"
+    r"|delivery\s*time:\s*(?P<delivery_time>\d+)\s*days?"
+    r"|lead\s*time:\s*(?P<lead_time>\d+)\s*days?"
+    r"|quality\s*score:\s*(?P<quality_score>\d+(?:\.\d+)?)"
+    r"|rating:\s*(?P<rating>\d+(?:\.\d+)?)"
+    r"|score:\s*(?P<score>\d+(?:\.\d+)?)",
+    re.IGNORECASE
+)
+
+# Name groups in order of preference
+_NAME_GROUPS = ("supplier", "vendor", "company", "contract")
+_DELIVERY_GROUPS = frozenset({"days_delivery", "delivery_time", "lead_time"})
+
+# Maximum matches kept per pattern
+_TEXT_LIMITS = {
+    "price": 10,
+    "days_delivery": 5,
+    "delivery_time": 5,
+    "lead_time": 5,
+    "quality_score": 5,
+    "rating": 5,
+    "score": 5,
+}
+
 async def analyze_supplier_tool(file_path: str, session_context: Dict[str, Any]) -> Dict[str, Any]:
     """
     Analyze supplier data from CSV or PDF files.
@@ -28,43 +105,73 @@ async def analyze_supplier_tool(file_path: str, session_context: Dict[str, Any])
         Dictionary containing extracted supplier information
     """
     try:
-        if not os.path.exists(file_path):
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
             raise FileNotFoundError(f"File not found: {file_path}")
         
         file_extension = os.path.splitext(file_path)[1].lower()
         
-        if file_extension == '.csv':
-            supplier_data = await _analyze_csv_file(file_path)
-        elif file_extension == '.pdf':
-            supplier_data = await _analyze_pdf_file(file_path)
-        elif file_extension == '.txt':
-            supplier_data = await _analyze_text_file(file_path)
-        else:
+        analyzer = _ANALYZERS.get(file_extension)
+        if analyzer is None:
             raise ValueError(f"Unsupported file format: {file_extension}")
         
+        # An unchanged file gives the same result, so reuse earlier analyses
+        cache_key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+        supplier_data = _cached_analysis(cache_key)
+        if supplier_data is None:
+            # Parsing is blocking I/O and CPU work, so keep it off the event loop
+            supplier_data = await asyncio.to_thread(analyzer, file_path)
+            _cache_analysis(cache_key, supplier_data)
+        
         # Store in session context
         session_context['supplier_data'] = supplier_data
         session_context['last_analyzed_file'] = file_path
         session_context['analysis_timestamp'] = datetime.now().isoformat()
         
-        logger.info(f"Successfully analyzed supplier data from {file_path}")
+        logger.info("Successfully analyzed supplier data from %s", file_path)
         return supplier_data
         
     except Exception as e:
-        logger.error(f"Error analyzing supplier file {file_path}: {str(e)}")
+        logger.error("Error analyzing supplier file %s: %s", file_path, e)
         raise
 
-async def _analyze_csv_file(file_path: str) -> Dict[str, Any]:
+def _cached_analysis(cache_key: tuple) -> Optional[Dict[str, Any]]:
+    """Return a copy of a cached analysis, or None"""
+    supplier_data = _ANALYSIS_CACHE.get(cache_key)
+    if supplier_data is None:
+        return None
+    
+    _ANALYSIS_CACHE.move_to_end(cache_key)
+    logger.info("Using cached analysis for %s", cache_key[0])
+    return copy.deepcopy(supplier_data)
+
+def _cache_analysis(cache_key: tuple, supplier_data: Dict[str, Any]):
+    """Cache a copy of an analysis, evicting the least recently used entry when full"""
+    if not ANALYSIS_CACHE_ENABLED:
+        return
+    
+    _ANALYSIS_CACHE[cache_key] = copy.deepcopy(supplier_data)
+    while len(_ANALYSIS_CACHE) > ANALYSIS_CACHE_SIZE:
+        _ANALYSIS_CACHE.popitem(last=False)
+
+def _analyze_csv_file(file_path: str) -> Dict[str, Any]:
     """Analyze CSV file for supplier data"""
     try:
-        df = pd.read_csv(file_path)
+        # Read a small preview first to classify the columns, then load only
+        # the columns the extractors use
+        preview = pd.read_csv(file_path, nrows=10)
+        columns = _classify_columns(preview.columns)
+        relevant_columns = {col for role_columns in columns.values() for col in role_columns}
+        usecols = [col for col in preview.columns if col in relevant_columns] or None
+        df = _read_csv(file_path, usecols)
         
         # Extract supplier information
         supplier_data = {
             "file_type": "csv",
             "file_path": file_path,
             "total_rows": len(df),
-            "columns": df.columns.tolist(),
+            "columns": preview.columns.tolist(),
             "supplier_name": None,
             "supplier_id": None,
             "products": [],
@@ -73,42 +180,56 @@ async def _analyze_csv_file(file_path: str) -> Dict[str, Any]:
             "quality_metrics": [],
             "past_volumes": [],
             "contract_terms": {},
-            "raw_data": df.to_dict('records')[:10]  # First 10 rows for context
+            "raw_data": preview.to_dict('records')  # First 10 rows for context
         }
         
         # Try to identify supplier name and ID
-        supplier_data.update(_extract_supplier_identifiers(df))
+        supplier_data.update(_extract_supplier_identifiers(df, columns))
         
         # Extract product and pricing information
-        supplier_data.update(_extract_product_data(df))
+        supplier_data.update(_extract_product_data(df, columns))
         
         # Extract delivery and quality metrics
-        supplier_data.update(_extract_metrics(df))
+        supplier_data.update(_extract_metrics(df, columns))
         
         return supplier_data
         
     except Exception as e:
-        logger.error(f"Error reading CSV file {file_path}: {str(e)}")
+        logger.error("Error reading CSV file %s: %s", file_path, e)
         raise
 
-async def _analyze_pdf_file(file_path: str) -> Dict[str, Any]:
+def _read_csv(file_path: str, usecols: Optional[List[str]] = None) -> pd.DataFrame:
+    """Read a CSV, using the multithreaded Arrow parser when pyarrow is installed"""
+    if pyarrow is not None:
+        try:
+            return pd.read_csv(file_path, usecols=usecols, engine="pyarrow", dtype_backend="pyarrow")
+        except ValueError as e:
+            # The Arrow parser is stricter about malformed rows
+            logger.warning("Arrow CSV parser failed for %s, retrying with the C parser: %s", file_path, e)
+    return pd.read_csv(file_path, usecols=usecols)
+
+def _analyze_pdf_file(file_path: str) -> Dict[str, Any]:
     """Analyze PDF file for supplier data"""
     try:
-        doc = fitz.open(file_path)
-        text_content = ""
-        
-        # Extract text from all pages
-        for page_num in range(doc.page_count):
-            page = doc.load_page(page_num)
-            text_content += page.get_text()
-        
-        doc.close()
+        # Extract page text until the budget is reached, joined once at the end
+        pages: List[str] = []
+        total_length = 0
+        with fitz.open(file_path, filetype="pdf") as doc:
+            page_count = doc.page_count
+            for page in doc:
+                page_text = page.get_text("text", flags=_PDF_TEXT_FLAGS)
+                pages.append(page_text)
+                total_length += len(page_text)
+                if total_length > PDF_TEXT_BUDGET:
+                    break
+        text_content = "".join(pages)
         
         # Extract supplier information from text
         supplier_data = {
             "file_type": "pdf",
             "file_path": file_path,
-            "total_pages": doc.page_count,
+            "total_pages": page_count,
+            "pages_scanned": len(pages),
             "text_length": len(text_content),
             "supplier_name": None,
             "supplier_id": None,
@@ -127,19 +248,24 @@ async def _analyze_pdf_file(file_path: str) -> Dict[str, Any]:
         return supplier_data
         
     except Exception as e:
-        logger.error(f"Error reading PDF file {file_path}: {str(e)}")
+        logger.error("Error reading PDF file %s: %s", file_path, e)
         raise
 
-async def _analyze_text_file(file_path: str) -> Dict[str, Any]:
+def _analyze_text_file(file_path: str) -> Dict[str, Any]:
     """Analyze text file for supplier data"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            text_content = f.read()
+        # Only a preview and a handful of regex matches are kept, so read a
+        # bounded prefix rather than the whole file
+        with open(file_path, 'rb') as f:
+            file_size = os.fstat(f.fileno()).st_size
+            raw = f.read(TEXT_FILE_BUDGET)
+        text_content = raw.decode('utf-8', errors='replace')
         
         # Extract supplier information from text
         supplier_data = {
             "file_type": "text",
             "file_path": file_path,
+            "file_size": file_size,
             "text_length": len(text_content),
             "supplier_name": None,
             "supplier_id": None,
@@ -158,101 +284,81 @@ async def _analyze_text_file(file_path: str) -> Dict[str, Any]:
         return supplier_data
         
     except Exception as e:
-        logger.error(f"Error reading text file {file_path}: {str(e)}")
+        logger.error("Error reading text file %s: %s", file_path, e)
         raise
 
-def _extract_supplier_identifiers(df: pd.DataFrame) -> Dict[str, Any]:
-    """Extract supplier name and ID from DataFrame"""
-    identifiers = {"supplier_name": None, "supplier_id": None}
+# Analyzer for each supported file extension
+_ANALYZERS = {
+    '.csv': _analyze_csv_file,
+    '.pdf': _analyze_pdf_file,
+    '.txt': _analyze_text_file,
+}
+
+def _classify_columns(column_names) -> Dict[str, List[str]]:
+    """Map each column role to the columns whose name has one of its keywords as a word"""
+    columns: Dict[str, List[str]] = {role: [] for role in _COLUMN_KEYWORDS}
     
-    # Look for common supplier identifier columns
-    name_columns = [col for col in df.columns if any(keyword in col.lower() 
-                   for keyword in ['supplier', 'vendor', 'company', 'name'])]
-    id_columns = [col for col in df.columns if any(keyword in col.lower() 
-                  for keyword in ['id', 'code', 'number', 'supplier_id'])]
+    for col in column_names:
+        tokens = {token.lower() for token in _COLUMN_TOKEN_RE.findall(str(col))}
+        # Also match simple plurals ("Prices", "Items")
+        tokens |= {token[:-1] for token in tokens if token.endswith('s')}
+        for role, keywords in _COLUMN_KEYWORDS.items():
+            if tokens & keywords:
+                columns[role].append(col)
     
-    if name_columns:
-        # Get the first non-null value from name columns
-        for col in name_columns:
-            non_null_values = df[col].dropna()
-            if not non_null_values.empty:
-                identifiers["supplier_name"] = str(non_null_values.iloc[0])
-                break
+    return columns
+
+def _first_value(df: pd.DataFrame, cols: List[str]) -> Optional[str]:
+    """First non-null value across the given columns, without copying them"""
+    for col in cols:
+        index = df[col].first_valid_index()
+        if index is not None:
+            return str(df[col].loc[index])
+    return None
+
+def _extract_supplier_identifiers(df: pd.DataFrame, columns: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Extract supplier name and ID from DataFrame"""
+    identifiers = {"supplier_name": None, "supplier_id": None}
     
-    if id_columns:
-        # Get the first non-null value from ID columns
-        for col in id_columns:
-            non_null_values = df[col].dropna()
-            if not non_null_values.empty:
-                identifiers["supplier_id"] = str(non_null_values.iloc[0])
-                break
+    identifiers["supplier_name"] = _first_value(df, columns["name"])
+    identifiers["supplier_id"] = _first_value(df, columns["id"])
     
     return identifiers
 
-def _extract_product_data(df: pd.DataFrame) -> Dict[str, Any]:
-    """Extract product and pricing information from DataFrame"""
-    product_data = {"products": [], "prices": []}
+def _numeric_head(df: pd.DataFrame, cols: List[str], limit: int = 10) -> List[float]:
+    """First `limit` numeric values of each column, concatenated"""
+    if not cols:
+        return []
     
-    # Look for product-related columns
-    product_columns = [col for col in df.columns if any(keyword in col.lower() 
-                      for keyword in ['product', 'item', 'sku', 'part', 'description'])]
-    price_columns = [col for col in df.columns if any(keyword in col.lower() 
-                     for keyword in ['price', 'cost', 'rate', 'amount', 'value'])]
-    
-    # Extract products
-    if product_columns:
-        for col in product_columns:
-            products = df[col].dropna().unique().tolist()
-            product_data["products"].extend([str(p) for p in products[:10]])  # Limit to 10
-    
-    # Extract prices
-    if price_columns:
-        for col in price_columns:
-            prices = df[col].dropna()
-            numeric_prices = pd.to_numeric(prices, errors='coerce').dropna()
-            if not numeric_prices.empty:
-                product_data["prices"].extend(numeric_prices.tolist()[:10])  # Limit to 10
+    # Convert the role's columns as one float block, then mask per column
+    block = df[cols].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    values: List[float] = []
+    for j in range(block.shape[1]):
+        column = block[:, j]
+        values.extend(column[~np.isnan(column)][:limit].tolist())
+    return values
+
+def _extract_product_data(df: pd.DataFrame, columns: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Extract product and pricing information from DataFrame"""
+    products: List[str] = []
+    for col in columns["product"]:
+        # Drop nulls from the uniques rather than the whole column, and slice
+        # before converting so only 10 become Python objects
+        uniques = df[col].unique()
+        products.extend(str(p) for p in uniques[pd.notna(uniques)][:10])  # Limit to 10
     
-    return product_data
+    return {
+        "products": products,
+        "prices": _numeric_head(df, columns["price"])
+    }
 
-def _extract_metrics(df: pd.DataFrame) -> Dict[str, Any]:
+def _extract_metrics(df: pd.DataFrame, columns: Dict[str, List[str]]) -> Dict[str, Any]:
     """Extract delivery times and quality metrics from DataFrame"""
-    metrics = {"delivery_times": [], "quality_metrics": [], "past_volumes": []}
-    
-    # Look for delivery-related columns
-    delivery_columns = [col for col in df.columns if any(keyword in col.lower() 
-                        for keyword in ['delivery', 'lead', 'time', 'days', 'duration'])]
-    
-    # Look for quality-related columns
-    quality_columns = [col for col in df.columns if any(keyword in col.lower() 
-                       for keyword in ['quality', 'rating', 'score', 'defect', 'reject'])]
-    
-    # Look for volume-related columns
-    volume_columns = [col for col in df.columns if any(keyword in col.lower() 
-                      for keyword in ['volume', 'quantity', 'amount', 'units', 'qty'])]
-    
-    # Extract delivery times
-    if delivery_columns:
-        for col in delivery_columns:
-            times = pd.to_numeric(df[col], errors='coerce').dropna()
-            if not times.empty:
-                metrics["delivery_times"].extend(times.tolist()[:10])
-    
-    # Extract quality metrics
-    if quality_columns:
-        for col in quality_columns:
-            quality_values = pd.to_numeric(df[col], errors='coerce').dropna()
-            if not quality_values.empty:
-                metrics["quality_metrics"].extend(quality_values.tolist()[:10])
-    
-    # Extract volumes
-    if volume_columns:
-        for col in volume_columns:
-            volumes = pd.to_numeric(df[col], errors='coerce').dropna()
-            if not volumes.empty:
-                metrics["past_volumes"].extend(volumes.tolist()[:10])
-    
-    return metrics
+    return {
+        "delivery_times": _numeric_head(df, columns["delivery"]),
+        "quality_metrics": _numeric_head(df, columns["quality"]),
+        "past_volumes": _numeric_head(df, columns["volume"])
+    }
 
 def _extract_from_text(text: str) -> Dict[str, Any]:
     """Extract supplier information from text using regex patterns"""
@@ -267,45 +373,40 @@ def _extract_from_text(text: str) -> Dict[str, Any]:
         "contract_terms": {}
     }
     
-    # Extract supplier name (look for common patterns)
-    name_patterns = [
-        r'Supplier:\s*([^\n\r]+)',
-        r'Vendor:\s*([^\n\r]+)',
-        r'Company:\s*([^\n\r]+)',
-        r'Contract with\s*([^\n\r]+)',
-    ]
+    names: Dict[str, str] = {}
+    counts: Dict[str, int] = {}
+    full_kinds = 0
     
-    for pattern in name_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            extracted["supplier_name"] = match.group(1).strip()
+    # Single pass over the text; dispatch on which alternative matched
+    for match in _TEXT_RE.finditer(text):
+        kind = match.lastgroup
+        value = match.group(kind)
+        
+        if kind in _NAME_GROUPS:
+            names.setdefault(kind, value.strip())
+        else:
+            count = counts.get(kind, 0)
+            if count >= _TEXT_LIMITS[kind]:
+                continue
+            counts[kind] = count + 1
+            if count + 1 == _TEXT_LIMITS[kind]:
+                full_kinds += 1
+            
+            if kind == "price":
+                extracted["prices"].append(value)
+            elif kind in _DELIVERY_GROUPS:
+                extracted["delivery_times"].append(int(value))
+            else:
+                extracted["quality_metrics"].append(float(value))
+        
+        # Nothing later in the text can change the result
+        if full_kinds == len(_TEXT_LIMITS) and _NAME_GROUPS[0] in names:
             break
     
-    # Extract prices (look for currency patterns)
-    price_pattern = r'[\$€£¥]\s*[\d,]+\.?\d*'
-    prices = re.findall(price_pattern, text)
-    extracted["prices"] = prices[:10]
-    
-    # Extract delivery times
-    delivery_patterns = [
-        r'(\d+)\s*days?\s*delivery',
-        r'delivery\s*time:\s*(\d+)\s*days?',
-        r'lead\s*time:\s*(\d+)\s*days?',
-    ]
-    
-    for pattern in delivery_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        extracted["delivery_times"].extend([int(m) for m in matches[:5]])
-    
-    # Extract quality scores
-    quality_patterns = [
-        r'quality\s*score:\s*(\d+(?:\.\d+)?)',
-        r'rating:\s*(\d+(?:\.\d+)?)',
-        r'score:\s*(\d+(?:\.\d+)?)',
-    ]
-    
-    for pattern in quality_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        extracted["quality_metrics"].extend([float(m) for m in matches[:5]])
+    # Prefer explicit "Supplier:" over "Vendor:" and so on
+    for kind in _NAME_GROUPS:
+        if kind in names:
+            extracted["supplier_name"] = names[kind]
+            break
     
     return extracted
@@ -0,0 +1,26 @@
+"""
+JSON Codec for TactoLearn
+
+Thin wrapper that uses orjson when it is installed and falls back to the
+standard library json module otherwise.
+"""
+
+import json
+from typing import Any, Callable, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+def dumps(obj: Any, default: Optional[Callable[[Any], Any]] = None) -> str:
+    """Serialize to a compact JSON string, passing unsupported objects through default"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=default)
+
+def loads(data: Any) -> Any:
+    """Parse JSON from str or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -6,17 +6,130 @@ and analyzing negotiation conversations.
 """
 
 import os
+import functools
+import time
+import random
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable, Iterable, AsyncIterator, Literal, Type
 from dotenv import load_dotenv
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+import httpx
 import openai
-from anthropic import Anthropic
+import anthropic
+from anthropic import AsyncAnthropic
+
+from . import json_codec
+from .semantic_cache import SimilarityCache
+
+try:
+    import h2
+except ImportError:  # pragma: no cover - optional speedup
+    h2 = None
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - optional shared cache
+    aioredis = None
 
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = "You are a helpful assistant specializing in business negotiations."
+
+# Providers served through the OpenAI SDK
+OPENAI_COMPATIBLE_PROVIDERS = {"openai", "ollama"}
+
+# Namespace for responses shared between workers through Redis
+REDIS_KEY_PREFIX = "tactolearn:llm:"
+
+# Batch API states that mean results aren't ready yet
+BATCH_PENDING_STATES = {"validating", "in_progress", "finalizing", "canceling"}
+
+# Transient provider errors retried with jittered exponential backoff
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    anthropic.RateLimitError,
+    anthropic.APIConnectionError,
+    anthropic.InternalServerError,
+)
+LLM_MAX_ATTEMPTS = 5
+LLM_BACKOFF_BASE = 1.0
+LLM_BACKOFF_MAX = 60.0
+
+# For short supplier replies the first attempts are cut off just above typical
+# latency and re-issued, which trims the slow tail; later attempts fall back to
+# the full API_TIMEOUT. Long generations (feedback, profiles) skip the cutoff.
+FAST_TIMEOUT_ATTEMPTS = 2
+
+# Connection pool shared by the provider SDKs; HTTP/2 multiplexing when h2 is installed
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=120)
+WARMUP_CONNECTIONS = 4
+
+# Per-strategy guidance for the supplier prompt
+STRATEGY_INSTRUCTIONS = {
+    "initial_response": "Respond naturally and show genuine interest in the buyer's needs.",
+    "building_relationship": "Be warm and collaborative, focus on understanding their requirements.",
+    "defensive": "Be cautious but not overly formal. Show some resistance while staying professional.",
+    "competitive": "Emphasize your strengths confidently but don't be arrogant.",
+    "opportunistic": "Recognize their urgency and be more direct about what you can offer.",
+    "collaborative": "Work together to find solutions. Be flexible and show willingness to negotiate."
+}
+DEFAULT_STRATEGY_INSTRUCTION = "Respond naturally and professionally to the buyer's message."
+
+# Only the most recent turns are sent for analysis; older ones are summarized as a count
+MAX_CONTEXT_MESSAGES = int(os.getenv("MAX_CONTEXT_MESSAGES", "20"))
+
+Sentiment = Literal["positive", "negative", "neutral"]
+
+class _OwnerCancelled(Exception):
+    """Set on a shared in-flight call whose owning caller was cancelled, so waiters retry"""
+
+class SentimentResult(BaseModel):
+    """Structured output schema for conversation sentiment analysis"""
+    
+    # Strict structured output requires a closed schema
+    model_config = ConfigDict(extra="forbid")
+    
+    buyer_sentiment: Sentiment
+    supplier_sentiment: Sentiment
+    overall_tone: Literal["professional", "aggressive", "collaborative", "defensive"]
+    key_emotions: List[str] = Field(description="Emotions detected in the conversation")
+    confidence: float = Field(description="Confidence score from 0 to 1")
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate"""
+    
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def consume(self, amount: float):
+        """Wait until the bucket holds the amount, then take it"""
+        if self.capacity <= 0:
+            return
+        
+        amount = min(amount, self.capacity)
+        # Waiters queue on the lock, so they're served in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
 class LLMService:
     """Service for interacting with various LLM providers"""
     
@@ -24,20 +137,94 @@ class LLMService:
         self.provider = os.getenv("LLM_PROVIDER", "openai").lower()
         self.timeout = int(os.getenv("API_TIMEOUT", "30"))
         self.max_tokens = int(os.getenv("MAX_TOKENS", "1000"))
+        self.fast_timeout = float(os.getenv("FAST_TIMEOUT", "8")) or None
+        
+        # Completed responses keyed by prompt hash: key -> (response, insertion time).
+        # Identical prompts that are still in flight share one pending future.
+        self.cache_size = int(os.getenv("LLM_CACHE_SIZE", "2048"))
+        self.cache_ttl = float(os.getenv("LLM_CACHE_TTL", "3600"))
+        self._response_cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        
+        # With REDIS_URL set, completed responses are also shared with other workers
+        redis_url = os.getenv("REDIS_URL")
+        if redis_url and aioredis is None:
+            logger.warning("REDIS_URL is set but the redis package is not installed")
+        self._redis = aioredis.from_url(redis_url) if redis_url and aioredis is not None else None
+        
+        # Bound concurrent provider calls and stay under the tokens-per-minute limit (0 disables)
+        self.max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "10"))
+        self._provider_slots = asyncio.Semaphore(self.max_concurrency)
+        self._token_bucket = TokenBucket(float(os.getenv("LLM_TOKENS_PER_MINUTE", "200000")))
+        
+        # Opt-in reuse of supplier replies for paraphrased buyer messages, scoped
+        # per (supplier, strategy) so a reply never leaks across suppliers
+        self.semantic_cache_enabled = os.getenv("LLM_SEMANTIC_CACHE", "false").lower() == "true"
+        self.embedding_model = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+        self._semantic_caches: Dict[Tuple[Any, str], SimilarityCache] = {}
+        
+        self._http = httpx.AsyncClient(
+            limits=HTTP_LIMITS,
+            timeout=self.timeout,
+            http2=h2 is not None
+        )
         
         # Initialize clients based on provider
         if self.provider == "openai":
-            self.openai_client = openai.OpenAI(
-                api_key=os.getenv("OPENAI_API_KEY")
+            self.openai_client = openai.AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                timeout=self.timeout,
+                max_retries=0,
+                http_client=self._http
             )
             self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
         elif self.provider == "anthropic":
-            self.anthropic_client = Anthropic(
-                api_key=os.getenv("ANTHROPIC_API_KEY")
+            self.anthropic_client = AsyncAnthropic(
+                api_key=os.getenv("ANTHROPIC_API_KEY"),
+                timeout=self.timeout,
+                max_retries=0,
+                http_client=self._http
             )
             self.model = os.getenv("ANTHROPIC_MODEL", "claude-3-haiku-20240307")
+        elif self.provider == "ollama":
+            # Self-hosted small models through Ollama's OpenAI-compatible API
+            self.openai_client = openai.AsyncOpenAI(
+                base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1"),
+                api_key="ollama",
+                timeout=self.timeout,
+                max_retries=0,
+                http_client=self._http
+            )
+            self.model = os.getenv("OLLAMA_MODEL", "llama3.2:3b")
         else:
             raise ValueError(f"Unsupported LLM provider: {self.provider}")
+        
+        # Per-task models, so light classification work can run on a smaller tier
+        self.supplier_model = os.getenv("SUPPLIER_MODEL", self.model)
+        self.sentiment_model = os.getenv("SENTIMENT_MODEL", self.model)
+        self.feedback_model = os.getenv("FEEDBACK_MODEL", self.model)
+    
+    async def warmup(self, connections: int = WARMUP_CONNECTIONS):
+        """Open pooled connections to the provider ahead of the first call"""
+        client = self.anthropic_client if self.provider == "anthropic" else self.openai_client
+        url = str(client.base_url)
+        
+        # Any response will do, the point is the TCP + TLS handshake
+        results = await asyncio.gather(
+            *(self._http.head(url) for _ in range(connections)),
+            return_exceptions=True
+        )
+        failures = [r for r in results if isinstance(r, Exception)]
+        if failures:
+            logger.warning("Connection warmup to %s failed: %s", url, failures[0])
+        else:
+            logger.info("Warmed %d connections to %s", connections, url)
+    
+    async def aclose(self):
+        """Close the pooled HTTP and Redis connections"""
+        await self._http.aclose()
+        if self._redis is not None:
+            await self._redis.aclose()
     
     async def generate_supplier_response(
         self,
@@ -55,17 +242,90 @@ class LLMService:
             # Create the prompt
             prompt = self._create_supplier_prompt(user_message, context, strategy)
             
+            # Reuse the reply to a near-duplicate buyer message when enabled
+            semantic_cache, embedding = None, None
+            if self.semantic_cache_enabled:
+                scope = (supplier_data.get("supplier_name"), strategy)
+                semantic_cache = self._semantic_caches.setdefault(scope, SimilarityCache())
+                embedding = await self._embed(f"{strategy}|{user_message}")
+                if embedding is not None:
+                    cached = semantic_cache.get_similar(embedding)
+                    if cached is not None:
+                        logger.info("Reusing cached supplier response for a similar message")
+                        return cached
+            
             # Generate response
-            response = await self._call_llm(prompt)
+            response = await self._call_llm(prompt, self.supplier_model, fast_timeout=True)
             
-            logger.info(f"Generated LLM response using {self.provider}")
+            if embedding is not None:
+                semantic_cache.put(SimilarityCache.normalize(user_message), embedding, response)
+            
+            logger.info("Generated LLM response using %s", self.provider)
             return response
             
         except Exception as e:
-            logger.error(f"Error generating LLM response: {str(e)}")
+            logger.error("Error generating LLM response: %s", e)
             # Return error message instead of fallback
             return f"LLM call didn't work: {str(e)}"
     
+    async def generate_supplier_response_stream(
+        self,
+        user_message: str,
+        supplier_data: Dict[str, Any],
+        conversation_history: List[Dict[str, str]],
+        strategy: str
+    ) -> AsyncIterator[str]:
+        """Stream a supplier response as text deltas while the LLM generates it"""
+        
+        try:
+            context = self._build_supplier_context(supplier_data, conversation_history, strategy)
+            prompt = self._create_supplier_prompt(user_message, context, strategy)
+            
+            async for delta in self._stream_llm(prompt, self.supplier_model):
+                yield delta
+            
+            logger.info("Streamed LLM response using %s", self.provider)
+            
+        except Exception as e:
+            logger.error("Error streaming LLM response: %s", e)
+            yield f"LLM call didn't work: {str(e)}"
+    
+    async def map(
+        self,
+        fn: Callable[[Any], Awaitable[Any]],
+        inputs: Iterable[Any],
+        max_concurrency: Optional[int] = None
+    ) -> List[Any]:
+        """Run an async function over inputs concurrently, returning results in input order"""
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+        
+        async def run(item: Any) -> Any:
+            async with semaphore:
+                return await fn(item)
+        
+        return await asyncio.gather(*(run(item) for item in inputs))
+    
+    async def map_generate_supplier_responses(
+        self,
+        items: Iterable[Dict[str, Any]],
+        max_concurrency: Optional[int] = None
+    ) -> List[str]:
+        """
+        Generate supplier responses for many sessions concurrently.
+        
+        Args:
+            items: Keyword arguments for generate_supplier_response, one dict per call
+            max_concurrency: Maximum calls in flight (defaults to LLM_MAX_CONCURRENCY)
+            
+        Returns:
+            Responses in the same order as items
+        """
+        return await self.map(
+            lambda item: self.generate_supplier_response(**item),
+            items,
+            max_concurrency
+        )
+    
     async def analyze_conversation_sentiment(
         self,
         messages: List[Dict[str, str]]
@@ -75,29 +335,33 @@ class LLMService:
         try:
             conversation_text = self._format_conversation_for_analysis(messages)
             
+            # The output format is enforced by the SentimentResult schema
             prompt = f"""
             Analyze the sentiment and tone of this negotiation conversation between a buyer and supplier.
             
             Conversation:
             {conversation_text}
-            
-            Please provide a JSON response with:
-            - buyer_sentiment: "positive", "negative", or "neutral"
-            - supplier_sentiment: "positive", "negative", or "neutral"
-            - overall_tone: "professional", "aggressive", "collaborative", or "defensive"
-            - key_emotions: array of emotions detected
-            - confidence: confidence score (0-1)
-            
-            Respond only with valid JSON.
             """
             
-            response = await self._call_llm(prompt)
+            # Reuse the analysis of a near-duplicate transcript when enabled
+            semantic_cache, embedding = None, None
+            if self.semantic_cache_enabled:
+                semantic_cache = self._semantic_caches.setdefault(("sentiment", self.sentiment_model), SimilarityCache())
+                embedding = await self._embed(conversation_text)
+                if embedding is not None:
+                    cached = semantic_cache.get_similar(embedding)
+                    if cached is not None:
+                        logger.info("Reusing cached sentiment analysis for a similar conversation")
+                        return SentimentResult.model_validate_json(cached).model_dump()
             
-            # Try to parse JSON response
-            import json
             try:
-                return json.loads(response)
-            except json.JSONDecodeError:
+                # Raises ValidationError for a reply that doesn't match the schema
+                response = await self._call_llm(prompt, self.sentiment_model, SentimentResult)
+                result = SentimentResult.model_validate_json(response).model_dump()
+                if embedding is not None:
+                    semantic_cache.put(SimilarityCache.normalize(conversation_text), embedding, response)
+                return result
+            except ValidationError:
                 # Return error instead of fallback
                 return {
                     "buyer_sentiment": {"score": 0, "label": "error", "confidence": 0},
@@ -109,7 +373,7 @@ class LLMService:
                 }
                 
         except Exception as e:
-            logger.error(f"Error analyzing sentiment with LLM: {str(e)}")
+            logger.error("Error analyzing sentiment with LLM: %s", e)
             return {
                 "buyer_sentiment": {"score": 0, "label": "error", "confidence": 0},
                 "supplier_sentiment": {"score": 0, "label": "error", "confidence": 0},
@@ -136,7 +400,7 @@ class LLMService:
             {conversation_text}
             
             Analysis Data:
-            {analysis_data}
+            {json_codec.dumps(analysis_data, default=str)}
             
             Please provide comprehensive feedback including:
             1. Executive Summary of the negotiation
@@ -148,11 +412,11 @@ class LLMService:
             Format your response as a professional training report with clear sections and actionable advice.
             """
             
-            response = await self._call_llm(prompt)
+            response = await self._call_llm(prompt, self.feedback_model)
             return response
             
         except Exception as e:
-            logger.error(f"Error generating feedback with LLM: {str(e)}")
+            logger.error("Error generating feedback with LLM: %s", e)
             return "Error generating feedback. Please try again."
     
     def _build_supplier_context(
@@ -190,7 +454,9 @@ class LLMService:
         
         # Conversation context
         if conversation_history:
-            recent_messages = conversation_history[-4:]  # Last 4 messages
+            # Last 4 messages; index from the end so deques work without a copy
+            recent_count = min(4, len(conversation_history))
+            recent_messages = [conversation_history[i] for i in range(-recent_count, 0)]
             context_parts.append("Recent conversation:")
             for msg in recent_messages:
                 role = msg.get("role", "unknown")
@@ -207,28 +473,14 @@ class LLMService:
     ) -> str:
         """Create prompt for supplier response generation"""
         
-        strategy_instructions = {
-            "initial_response": "Respond naturally and show genuine interest in the buyer's needs.",
-            "building_relationship": "Be warm and collaborative, focus on understanding their requirements.",
-            "defensive": "Be cautious but not overly formal. Show some resistance while staying professional.",
-            "competitive": "Emphasize your strengths confidently but don't be arrogant.",
-            "opportunistic": "Recognize their urgency and be more direct about what you can offer.",
-            "collaborative": "Work together to find solutions. Be flexible and show willingness to negotiate."
-        }
-        
-        instruction = strategy_instructions.get(strategy, "Respond naturally and professionally to the buyer's message.")
+        instruction = STRATEGY_INSTRUCTIONS.get(strategy, DEFAULT_STRATEGY_INSTRUCTION)
         
+        # Static text first, then the supplier profile, then whatever changes per
+        # turn, so consecutive turns share a long prompt prefix that
+        # prefix-caching servers can reuse
         prompt = f"""
         You are a real supplier representative in a business negotiation. Be human, not robotic.
         
-        Context about your company:
-        {context}
-        
-        Current negotiation strategy: {strategy}
-        Instruction: {instruction}
-        
-        Buyer's message: "{user_message}"
-        
         Respond as a REAL supplier would:
         - Be conversational and natural, not overly formal
         - Don't say "thank you" in every response
@@ -246,62 +498,421 @@ class LLMService:
         - "That's a significant order. I'll need to check with my manager on pricing"
         
         Keep your response conversational and realistic (2-3 sentences max).
+        
+        Context about your company:
+        {context}
+        
+        Current negotiation strategy: {strategy}
+        Instruction: {instruction}
+        
+        Buyer's message: "{user_message}"
         """
         
         return prompt
     
-    async def _call_llm(self, prompt: str) -> str:
+    async def _call_llm(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        schema: Optional[Type[BaseModel]] = None,
+        fast_timeout: bool = False
+    ) -> str:
+        """
+        Call the LLM provider, reusing cached or in-flight responses for identical prompts.
+        
+        With a schema the provider is forced to answer with matching JSON, returned as text.
+        A reply that still fails validation raises ValidationError and is never cached.
+        fast_timeout re-issues attempts slower than FAST_TIMEOUT; only for short replies.
+        """
+        
+        model = model or self.model
+        key = self._cache_key(prompt if schema is None else f"{schema.__name__}|{prompt}", model)
+        
+        while True:
+            cached = self._cached_response(key)
+            if cached is not None:
+                return cached
+            
+            # The check and the insert below run without an await in between, so
+            # concurrent callers on the event loop can't both miss and both call out
+            pending = self._pending.get(key)
+            if pending is None:
+                break
+            try:
+                return await asyncio.shield(pending)
+            except _OwnerCancelled:
+                # Only the owner was cancelled; look again and take over the call if nobody has
+                continue
+        
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            response = await self._shared_response(key)
+            if response is not None and not self._matches_schema(response, schema):
+                response = None
+            if response is None:
+                response = await self._call_provider(prompt, model, schema, fast_timeout)
+                if schema is not None:
+                    schema.model_validate_json(response)
+                await self._share_response(key, response)
+        except asyncio.CancelledError:
+            # Waiters weren't cancelled, so they retry instead of inheriting the cancellation
+            future.set_exception(_OwnerCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        else:
+            self._cache_response(key, response)
+            future.set_result(response)
+            return response
+        finally:
+            del self._pending[key]
+    
+    @staticmethod
+    def _matches_schema(response: str, schema: Optional[Type[BaseModel]]) -> bool:
+        """Check a shared cached reply still validates against the schema it was requested with"""
+        if schema is None:
+            return True
+        try:
+            schema.model_validate_json(response)
+        except ValidationError:
+            return False
+        return True
+    
+    async def _stream_llm(self, prompt: str, model: Optional[str] = None) -> AsyncIterator[str]:
+        """Stream a completion as text deltas, serving and filling the response cache"""
+        
+        model = model or self.model
+        key = self._cache_key(prompt, model)
+        
+        cached = self._cached_response(key)
+        if cached is not None:
+            yield cached
+            return
+        
+        # An identical call already in flight is cheaper to wait for than a second stream
+        pending = self._pending.get(key)
+        if pending is not None:
+            try:
+                response = await asyncio.shield(pending)
+            except _OwnerCancelled:
+                # Its owner was cancelled; stream the reply here instead
+                pass
+            else:
+                yield response
+                return
+        
+        shared = await self._shared_response(key)
+        if shared is not None:
+            self._cache_response(key, shared)
+            yield shared
+            return
+        
+        await self._token_bucket.consume(len(prompt) // 4 + self.max_tokens)
+        parts = []
+        async with self._provider_slots:
+            async for delta in self._send_stream(prompt, model):
+                parts.append(delta)
+                yield delta
+        
+        response = "".join(parts).strip()
+        self._cache_response(key, response)
+        await self._share_response(key, response)
+    
+    async def _shared_response(self, key: str) -> Optional[str]:
+        """Return a response another worker cached in Redis, or None"""
+        if self._redis is None:
+            return None
+        
+        try:
+            value = await self._redis.get(REDIS_KEY_PREFIX + key)
+        except Exception as e:
+            logger.warning("Redis lookup failed: %s", e)
+            return None
+        return value.decode("utf-8") if value is not None else None
+    
+    async def _share_response(self, key: str, response: str):
+        """Publish a response to Redis with the cache TTL"""
+        if self._redis is None or self.cache_size <= 0:
+            return
+        
+        try:
+            await self._redis.setex(REDIS_KEY_PREFIX + key, int(self.cache_ttl), response)
+        except Exception as e:
+            logger.warning("Redis store failed: %s", e)
+    
+    def _cache_key(self, prompt: str, model: str) -> str:
+        """Response cache key for a prompt on the current provider and a model"""
+        return hashlib.sha256(f"{self.provider}|{model}|{prompt}".encode("utf-8")).hexdigest()
+    
+    def _cached_response(self, key: str) -> Optional[str]:
+        """Return a cached response that hasn't expired, or None"""
+        entry = self._response_cache.get(key)
+        if entry is None:
+            return None
+        
+        if time.monotonic() - entry[1] > self.cache_ttl:
+            del self._response_cache[key]
+            return None
+        
+        self._response_cache.move_to_end(key)
+        return entry[0]
+    
+    def _cache_response(self, key: str, response: str):
+        """Cache a response, evicting the least recently used entries when full"""
+        if self.cache_size <= 0:
+            return
+        
+        self._response_cache[key] = (response, time.monotonic())
+        self._response_cache.move_to_end(key)
+        while len(self._response_cache) > self.cache_size:
+            self._response_cache.popitem(last=False)
+    
+    async def _call_provider(
+        self,
+        prompt: str,
+        model: str,
+        schema: Optional[Type[BaseModel]] = None,
+        fast_timeout: bool = False
+    ) -> str:
+        """Call the provider within the concurrency and token budgets, retrying transient errors"""
+        
+        # Rough token estimate; providers count max_tokens against the limit too
+        estimated_tokens = len(prompt) // 4 + self.max_tokens
+        
+        for attempt in range(LLM_MAX_ATTEMPTS):
+            await self._token_bucket.consume(estimated_tokens)
+            timeout = self.fast_timeout if fast_timeout and attempt < FAST_TIMEOUT_ATTEMPTS else None
+            try:
+                # wait_for cancels the slow request, which hands its connection back to the pool
+                async with self._provider_slots:
+                    return await asyncio.wait_for(self._send(prompt, model, schema), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("%s call exceeded %gs, re-issuing", self.provider, timeout)
+            except RETRYABLE_ERRORS as e:
+                if attempt == LLM_MAX_ATTEMPTS - 1:
+                    raise
+                delay = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+                logger.warning("Retrying %s call in %.1fs after %s", self.provider, delay, type(e).__name__)
+                await asyncio.sleep(delay)
+    
+    async def _send(self, prompt: str, model: str, schema: Optional[Type[BaseModel]] = None) -> str:
         """Call the appropriate LLM provider"""
         
-        if self.provider == "openai":
-            return await self._call_openai(prompt)
+        if self.provider in OPENAI_COMPATIBLE_PROVIDERS:
+            return await self._call_openai(prompt, model, schema)
+        elif self.provider == "anthropic":
+            return await self._call_anthropic(prompt, model, schema)
+        else:
+            raise ValueError(f"Unsupported provider: {self.provider}")
+    
+    async def _send_stream(self, prompt: str, model: str) -> AsyncIterator[str]:
+        """Stream text deltas from the appropriate LLM provider"""
+        
+        if self.provider in OPENAI_COMPATIBLE_PROVIDERS:
+            stream = await self.openai_client.chat.completions.create(
+                **self._openai_request(prompt, model),
+                stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
         elif self.provider == "anthropic":
-            return await self._call_anthropic(prompt)
+            async with self.anthropic_client.messages.stream(**self._anthropic_request(prompt, model)) as stream:
+                async for text in stream.text_stream:
+                    yield text
         else:
             raise ValueError(f"Unsupported provider: {self.provider}")
     
-    async def _call_openai(self, prompt: str) -> str:
+    async def _call_openai(self, prompt: str, model: str, schema: Optional[Type[BaseModel]] = None) -> str:
         """Call OpenAI API"""
         try:
-            response = self.openai_client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant specializing in business negotiations."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=self.max_tokens,
-                temperature=0.7
-            )
+            request = self._openai_request(prompt, model)
+            if schema is not None:
+                request["response_format"] = {
+                    "type": "json_schema",
+                    "json_schema": {
+                        "name": schema.__name__,
+                        "schema": schema.model_json_schema(),
+                        "strict": True
+                    }
+                }
+            response = await self.openai_client.chat.completions.create(**request)
             return response.choices[0].message.content.strip()
         except Exception as e:
-            logger.error(f"OpenAI API error: {str(e)}")
+            logger.error("OpenAI API error: %s", e)
             raise
     
-    async def _call_anthropic(self, prompt: str) -> str:
+    async def _call_anthropic(self, prompt: str, model: str, schema: Optional[Type[BaseModel]] = None) -> str:
         """Call Anthropic API"""
         try:
-            response = self.anthropic_client.messages.create(
-                model=self.model,
-                max_tokens=self.max_tokens,
-                temperature=0.7,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            request = self._anthropic_request(prompt, model)
+            if schema is not None:
+                # Forcing a single tool call is Anthropic's way to get schema-shaped output
+                request["tools"] = [{
+                    "name": schema.__name__,
+                    "description": schema.__doc__,
+                    "input_schema": schema.model_json_schema()
+                }]
+                request["tool_choice"] = {"type": "tool", "name": schema.__name__}
+            response = await self.anthropic_client.messages.create(**request)
+            if schema is not None:
+                return json_codec.dumps(response.content[0].input)
             return response.content[0].text.strip()
         except Exception as e:
-            logger.error(f"Anthropic API error: {str(e)}")
+            logger.error("Anthropic API error: %s", e)
             raise
     
+    def _openai_request(self, prompt: str, model: str) -> Dict[str, Any]:
+        """Chat completion parameters for a prompt"""
+        return {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": self.max_tokens,
+            "temperature": 0.7
+        }
+    
+    def _anthropic_request(self, prompt: str, model: str) -> Dict[str, Any]:
+        """Messages API parameters for a prompt"""
+        return {
+            "model": model,
+            "max_tokens": self.max_tokens,
+            "temperature": 0.7,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ]
+        }
+    
+    async def submit_batch_job(self, prompts: List[str], model: Optional[str] = None) -> str:
+        """
+        Submit prompts to the provider's batch API for non-urgent work such as
+        training feedback. Batches are billed at about half price and finish
+        within 24 hours.
+        
+        Returns:
+            The batch id to pass to get_batch_results
+        """
+        model = model or self.feedback_model
+        if self.provider == "openai":
+            lines = [
+                json_codec.dumps({
+                    "custom_id": str(i),
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": self._openai_request(prompt, model)
+                })
+                for i, prompt in enumerate(prompts)
+            ]
+            batch_file = await self.openai_client.files.create(
+                file=("batch.jsonl", "\n".join(lines).encode("utf-8")),
+                purpose="batch"
+            )
+            batch = await self.openai_client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+        elif self.provider == "anthropic":
+            batch = await self.anthropic_client.messages.batches.create(
+                requests=[
+                    {"custom_id": str(i), "params": self._anthropic_request(prompt, model)}
+                    for i, prompt in enumerate(prompts)
+                ]
+            )
+        else:
+            raise ValueError(f"Unsupported provider: {self.provider}")
+        
+        logger.info("Submitted batch %s with %d prompts", batch.id, len(prompts))
+        return batch.id
+    
+    async def get_batch_results(self, batch_id: str) -> Optional[List[Optional[str]]]:
+        """
+        Fetch the results of a batch submitted with submit_batch_job.
+        
+        Returns:
+            Responses in prompt order (None for prompts that failed), or None
+            while the batch is still running
+        """
+        results: Dict[int, str] = {}
+        
+        if self.provider == "openai":
+            batch = await self.openai_client.batches.retrieve(batch_id)
+            if batch.status in BATCH_PENDING_STATES:
+                return None
+            if batch.status != "completed":
+                raise RuntimeError(f"Batch {batch_id} {batch.status}")
+            
+            total = batch.request_counts.total
+            if batch.output_file_id:
+                content = await self.openai_client.files.content(batch.output_file_id)
+                for line in content.text.splitlines():
+                    entry = json_codec.loads(line)
+                    response = entry.get("response") or {}
+                    if response.get("status_code") == 200:
+                        message = response["body"]["choices"][0]["message"]["content"]
+                        results[int(entry["custom_id"])] = message.strip()
+        elif self.provider == "anthropic":
+            batch = await self.anthropic_client.messages.batches.retrieve(batch_id)
+            if batch.processing_status != "ended":
+                return None
+            
+            counts = batch.request_counts
+            total = counts.succeeded + counts.errored + counts.canceled + counts.expired
+            async for entry in await self.anthropic_client.messages.batches.results(batch_id):
+                if entry.result.type == "succeeded":
+                    results[int(entry.custom_id)] = entry.result.message.content[0].text.strip()
+        else:
+            raise ValueError(f"Unsupported provider: {self.provider}")
+        
+        return [results.get(i) for i in range(total)]
+    
+    async def _embed(self, text: str) -> Optional[List[float]]:
+        """Embed text for the semantic cache, or None when unavailable"""
+        # Anthropic has no embeddings endpoint
+        if self.provider != "openai":
+            return None
+        
+        try:
+            response = await self.openai_client.embeddings.create(
+                model=self.embedding_model,
+                input=text
+            )
+            return response.data[0].embedding
+        except Exception as e:
+            logger.warning("Embedding failed, skipping semantic cache: %s", e)
+            return None
+    
     def _format_conversation_for_analysis(self, messages: List[Dict[str, str]]) -> str:
-        """Format conversation for LLM analysis"""
+        """Format the most recent MAX_CONTEXT_MESSAGES turns for LLM analysis"""
         formatted = []
-        for msg in messages:
+        
+        # Index from the end so deques work without a copy
+        recent_count = min(MAX_CONTEXT_MESSAGES, len(messages))
+        omitted = len(messages) - recent_count
+        if omitted:
+            formatted.append(f"[{omitted} earlier messages omitted]")
+        
+        for msg in (messages[i] for i in range(-recent_count, 0)):
             role = msg.get("role", "unknown")
             content = msg.get("message", "")
             formatted.append(f"{role.title()}: {content}")
         return "\n".join(formatted)
     
 
-# Global LLM service instance
-llm_service = LLMService()
+@functools.lru_cache(maxsize=1)
+def get_llm_service() -> LLMService:
+    """Return the process-wide LLM service, creating it on first use"""
+    return LLMService()
+
+def __getattr__(name: str) -> Any:
+    # Keeps `from .llm_service import llm_service` working without building the service at import
+    if name == "llm_service":
+        return get_llm_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
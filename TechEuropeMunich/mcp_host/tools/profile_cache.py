@@ -0,0 +1,88 @@
+"""
+Supplier Profile Cache for TactoLearn
+
+This module provides a small persistent cache of extracted supplier profiles
+keyed by file content hash, so re-uploading an identical file skips the
+extraction and embedding pipeline entirely.
+
+The cache is stored with msgpack when it is installed and as JSON otherwise.
+Pickle is deliberately avoided since the cache lives in the uploads folder.
+"""
+
+import os
+import json
+import mmap
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional speedup
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+def hash_file(file_path: Path) -> str:
+    """Hash file contents via a memory-mapped read"""
+    hasher = hashlib.blake2b(digest_size=16)
+
+    with open(file_path, "rb") as f:
+        # mmap can't map empty files
+        if os.fstat(f.fileno()).st_size == 0:
+            return hasher.hexdigest()
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            hasher.update(mapped)
+
+    return hasher.hexdigest()
+
+class ProfileCache:
+    """Content-hash -> supplier profile cache persisted to disk"""
+
+    def __init__(self, cache_path: Path):
+        # The format's suffix is appended to the given base path
+        suffix = ".msgpack" if msgpack is not None else ".json"
+        cache_path = Path(cache_path)
+        self.cache_path = cache_path.with_name(cache_path.name + suffix)
+        self._profiles: Dict[str, Dict[str, Any]] = self._load()
+        # put() is called from worker threads; one rewrite at a time
+        self._lock = threading.Lock()
+
+    def get(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Return the cached profile for a content hash, or None"""
+        return self._profiles.get(content_hash)
+
+    def put(self, content_hash: str, profile: Dict[str, Any]):
+        """Cache a profile and persist the cache to disk"""
+        with self._lock:
+            self._profiles[content_hash] = profile
+            self._save()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Load the cache from disk, starting empty if missing or corrupt"""
+        try:
+            data = self.cache_path.read_bytes()
+            if msgpack is not None:
+                return msgpack.unpackb(data, raw=False)
+            return json.loads(data)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable profile cache {self.cache_path}: {str(e)}")
+            return {}
+
+    def _save(self):
+        """Atomically rewrite the cache file"""
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        try:
+            if msgpack is not None:
+                data = msgpack.packb(self._profiles, use_bin_type=True)
+            else:
+                data = json.dumps(self._profiles).encode("utf-8")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.error(f"Error saving profile cache {self.cache_path}: {str(e)}")
@@ -0,0 +1,118 @@
+"""
+Semantic Cache for TactoLearn
+
+This module provides a small TTL + LRU cache that can also match near-duplicate
+queries by cosine similarity of their embeddings. Buyers repeat themselves a lot
+("volume discount", "what about delivery?"), so this lets callers skip repeated
+vector-store round-trips.
+"""
+
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+import numpy as np
+
+from .simkernel import similarity_scores
+
+logger = logging.getLogger(__name__)
+
+def quantize_int8(vector: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Symmetric int8 scalar quantization; returns (codes, scale)"""
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    peak = float(np.max(np.abs(vector))) if vector.size else 0.0
+    scale = peak / 127 if peak > 0 else 1.0
+    codes = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+    return codes, scale
+
+def dequantize_int8(codes: np.ndarray, scale: float) -> np.ndarray:
+    """Reconstruct an approximate float32 vector from int8 codes"""
+    return np.multiply(codes, scale, dtype=np.float32)
+
+class SimilarityCache:
+    """TTL + LRU cache with an embedding-similarity fallback lookup"""
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        threshold: Optional[float] = None
+    ):
+        self.max_entries = max_entries or int(os.getenv("SEMANTIC_CACHE_SIZE", "512"))
+        self.ttl = ttl or float(os.getenv("SEMANTIC_CACHE_TTL", "600"))
+        self.threshold = threshold or float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+
+        # key -> (int8 codes of the unit-normalized embedding, scale, value, insertion time)
+        self._entries: "OrderedDict[Hashable, Tuple[np.ndarray, float, Any, float]]" = OrderedDict()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalize a query for exact-match lookups"""
+        return " ".join(text.lower().split())
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for an exact key, or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        if time.monotonic() - entry[3] > self.ttl:
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def get_similar(self, embedding: np.ndarray) -> Optional[Any]:
+        """Return the value of the most similar cached query above the threshold, or None"""
+        self._evict_expired()
+        if not self._entries:
+            return None
+
+        query_codes, query_scale = quantize_int8(self._unit(embedding))
+        keys = list(self._entries.keys())
+        codes = np.stack([self._entries[key][0] for key in keys])
+        scales = np.fromiter((self._entries[key][1] for key in keys), dtype=np.float32, count=len(keys))
+
+        # Embeddings are unit-normalized before quantization, so the rescaled
+        # int32-accumulated dot product approximates the cosine
+        similarities = similarity_scores(codes, scales, query_codes, query_scale)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+
+        self._entries.move_to_end(keys[best])
+        logger.debug(f"Semantic cache hit (similarity {similarities[best]:.3f})")
+        return self._entries[keys[best]][2]
+
+    def put(self, key: Hashable, embedding: np.ndarray, value: Any):
+        """Insert a value, evicting the least recently used entry when full"""
+        codes, scale = quantize_int8(self._unit(embedding))
+        self._entries[key] = (codes, scale, value, time.monotonic())
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached entry"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict_expired(self):
+        """Drop entries older than the TTL"""
+        cutoff = time.monotonic() - self.ttl
+        expired = [key for key, entry in self._entries.items() if entry[3] < cutoff]
+        for key in expired:
+            del self._entries[key]
+
+    @staticmethod
+    def _unit(embedding: np.ndarray) -> np.ndarray:
+        """Return the embedding scaled to unit length"""
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
@@ -0,0 +1,82 @@
+"""
+Similarity Kernels for TactoLearn
+
+This module provides the scoring kernel behind the semantic cache. When numba
+is installed the int8 dot products, accumulation and rescaling are fused into
+one parallel JIT-compiled pass; otherwise a NumPy implementation is used.
+"""
+
+import logging
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # pragma: no cover - optional speedup
+    njit = None
+
+logger = logging.getLogger(__name__)
+
+# Embedding width of all-MiniLM-L6-v2, used for warmup
+EMBEDDING_DIM = 384
+
+def _scores_numpy(
+    codes: np.ndarray,
+    scales: np.ndarray,
+    query_codes: np.ndarray,
+    query_scale: float
+) -> np.ndarray:
+    """Rescaled int8 dot products with int32 accumulation"""
+    dots = np.einsum("ij,j->i", codes, query_codes, dtype=np.int32)
+    return (dots * scales * np.float32(query_scale)).astype(np.float32)
+
+if njit is not None:
+    # Compiled lazily on first call (or warmup()), never at import
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _scores_jit(codes, scales, query_codes, query_scale):
+        n, d = codes.shape
+        scores = np.empty(n, np.float32)
+        for i in prange(n):
+            acc = 0
+            for j in range(d):
+                acc += np.int32(codes[i, j]) * np.int32(query_codes[j])
+            scores[i] = acc * scales[i] * query_scale
+        return scores
+
+def similarity_scores(
+    codes: np.ndarray,
+    scales: np.ndarray,
+    query_codes: np.ndarray,
+    query_scale: float
+) -> np.ndarray:
+    """
+    Score every int8-quantized row against a quantized query.
+
+    Args:
+        codes: (N, D) int8 codes of unit-normalized vectors
+        scales: (N,) float32 per-row quantization scales
+        query_codes: (D,) int8 codes of the unit-normalized query
+        query_scale: Quantization scale of the query
+
+    Returns:
+        (N,) float32 approximate cosine similarities
+    """
+    if njit is not None:
+        # Normalized inputs keep dispatch on a single compiled specialization
+        return _scores_jit(
+            np.ascontiguousarray(codes, dtype=np.int8),
+            np.ascontiguousarray(scales, dtype=np.float32),
+            np.ascontiguousarray(query_codes, dtype=np.int8),
+            np.float32(query_scale)
+        )
+    return _scores_numpy(codes, scales, query_codes, query_scale)
+
+def warmup():
+    """Compile the JIT kernel ahead of the first real query"""
+    if njit is None:
+        return
+
+    codes = np.zeros((1, EMBEDDING_DIM), dtype=np.int8)
+    scales = np.ones(1, dtype=np.float32)
+    similarity_scores(codes, scales, codes[0], 1.0)
+    logger.info("Similarity kernel compiled")
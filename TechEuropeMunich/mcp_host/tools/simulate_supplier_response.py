@@ -7,13 +7,61 @@ during negotiation using LLM integration.
 
 import logging
 import random
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Set, Tuple, AsyncIterator
 from datetime import datetime
 
-from .llm_service import llm_service
+from .llm_service import get_llm_service
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - optional speedup
+    ahocorasick = None
 
 logger = logging.getLogger(__name__)
 
+# (field, value, keywords) in priority order: intent, urgency and tone take the
+# first bucket with a hit, leverage points collect every bucket with a hit
+_MESSAGE_BUCKETS = [
+    ("intent", "price_reduction", ('discount', 'reduce', 'lower', 'cheaper', 'price')),
+    ("intent", "volume_increase", ('volume', 'quantity', 'bulk', 'more', 'increase')),
+    ("intent", "quality_discussion", ('quality', 'standard', 'specification', 'defect')),
+    ("intent", "delivery_discussion", ('delivery', 'shipping', 'timeline', 'schedule')),
+    ("urgency", "high", ('urgent', 'asap', 'immediately', 'quickly')),
+    ("urgency", "medium", ('soon', 'priority', 'important')),
+    ("tone", "polite", ('please', 'thank', 'appreciate', 'would like')),
+    ("tone", "demanding", ('must', 'require', 'need', 'demand')),
+    ("tone", "negative", ('unacceptable', 'disappointed', 'concerned')),
+    ("leverage_points", "competition", ('competitor', 'alternative', 'other supplier')),
+    ("leverage_points", "relationship", ('long term', 'partnership', 'relationship')),
+    ("leverage_points", "market_conditions", ('market', 'industry', 'trend')),
+]
+
+_INTENT_FOCUS = {
+    "price_reduction": "price_focus",
+    "volume_increase": "volume_focus",
+    "quality_discussion": "quality_focus",
+    "delivery_discussion": "delivery_focus",
+}
+
+_KEYWORD_BUCKETS = {
+    word: (field, value)
+    for field, value, words in _MESSAGE_BUCKETS
+    for word in words
+}
+
+# With pyahocorasick every keyword is found in one automaton pass over the message
+if ahocorasick is not None:
+    _KEYWORD_AUTOMATON = ahocorasick.Automaton()
+    for _word, _bucket in _KEYWORD_BUCKETS.items():
+        _KEYWORD_AUTOMATON.add_word(_word, _bucket)
+    _KEYWORD_AUTOMATON.make_automaton()
+
+def _keyword_hits(text: str) -> Optional[Set[Tuple[str, str]]]:
+    """Return the (field, value) buckets whose keywords occur in the text, or None without pyahocorasick"""
+    if ahocorasick is None:
+        return None
+    return {bucket for _, bucket in _KEYWORD_AUTOMATON.iter(text)}
+
 async def simulate_supplier_response_tool(
     user_message: str, 
     session_context: Dict[str, Any],
@@ -47,17 +95,59 @@ async def simulate_supplier_response_tool(
             negotiation_transcript
         )
         
-        logger.info(f"Generated supplier response for message: {user_message[:50]}...")
+        logger.info("Generated supplier response for message: %.50s...", user_message)
         return response_data
         
     except Exception as e:
-        logger.error(f"Error generating supplier response: {str(e)}")
+        logger.error("Error generating supplier response: %s", e)
         return {
             "response": f"I apologize, but I'm having trouble processing your request right now. {str(e)}",
             "confidence": 0.0,
             "strategy": "error"
         }
 
+async def simulate_supplier_response_stream(
+    user_message: str,
+    session_context: Dict[str, Any],
+    negotiation_transcript: List[Dict[str, str]]
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream a supplier response during negotiation.
+    
+    Args:
+        user_message: The buyer's negotiation message
+        session_context: Session context containing supplier data
+        negotiation_transcript: Previous conversation history
+        
+    Yields:
+        A "start" event with the strategy and confidence, then "delta" events
+        carrying the response text as it is generated
+    """
+    supplier_data = session_context.get('supplier_data', {})
+    
+    if not supplier_data:
+        yield {"type": "start", "confidence": 0.0, "strategy": "no_data"}
+        yield {"type": "delta", "text": "I don't have any supplier data loaded. Please analyze a supplier file first."}
+        return
+    
+    message_analysis = _analyze_user_message(user_message)
+    strategy = _determine_supplier_strategy(supplier_data, negotiation_transcript, message_analysis)
+    
+    yield {
+        "type": "start",
+        "confidence": _calculate_confidence(supplier_data, message_analysis),
+        "strategy": strategy,
+        "message_analysis": message_analysis
+    }
+    
+    async for text in get_llm_service().generate_supplier_response_stream(
+        user_message,
+        supplier_data,
+        negotiation_transcript,
+        strategy
+    ):
+        yield {"type": "delta", "text": text}
+
 async def _generate_supplier_response(
     user_message: str,
     supplier_data: Dict[str, Any],
@@ -73,14 +163,14 @@ async def _generate_supplier_response(
     
     # Generate response using LLM
     try:
-        response = await llm_service.generate_supplier_response(
+        response = await get_llm_service().generate_supplier_response(
             user_message,
             supplier_data,
             transcript,
             strategy
         )
     except Exception as e:
-        logger.error(f"LLM generation failed: {str(e)}")
+        logger.error("LLM generation failed: %s", e)
         return {
             "response": f"LLM call didn't work: {str(e)}",
             "confidence": 0.0,
@@ -110,44 +200,27 @@ def _analyze_user_message(message: str) -> Dict[str, Any]:
         "leverage_points": []
     }
     
-    # Determine intent
-    if any(word in message_lower for word in ['discount', 'reduce', 'lower', 'cheaper', 'price']):
-        analysis["intent"] = "price_reduction"
-        analysis["price_focus"] = True
-    
-    elif any(word in message_lower for word in ['volume', 'quantity', 'bulk', 'more', 'increase']):
-        analysis["intent"] = "volume_increase"
-        analysis["volume_focus"] = True
-    
-    elif any(word in message_lower for word in ['quality', 'standard', 'specification', 'defect']):
-        analysis["intent"] = "quality_discussion"
-        analysis["quality_focus"] = True
-    
-    elif any(word in message_lower for word in ['delivery', 'shipping', 'timeline', 'schedule']):
-        analysis["intent"] = "delivery_discussion"
-        analysis["delivery_focus"] = True
-    
-    # Determine urgency
-    if any(word in message_lower for word in ['urgent', 'asap', 'immediately', 'quickly']):
-        analysis["urgency"] = "high"
-    elif any(word in message_lower for word in ['soon', 'priority', 'important']):
-        analysis["urgency"] = "medium"
-    
-    # Determine tone
-    if any(word in message_lower for word in ['please', 'thank', 'appreciate', 'would like']):
-        analysis["tone"] = "polite"
-    elif any(word in message_lower for word in ['must', 'require', 'need', 'demand']):
-        analysis["tone"] = "demanding"
-    elif any(word in message_lower for word in ['unacceptable', 'disappointed', 'concerned']):
-        analysis["tone"] = "negative"
-    
-    # Identify leverage points
-    if any(word in message_lower for word in ['competitor', 'alternative', 'other supplier']):
-        analysis["leverage_points"].append("competition")
-    if any(word in message_lower for word in ['long term', 'partnership', 'relationship']):
-        analysis["leverage_points"].append("relationship")
-    if any(word in message_lower for word in ['market', 'industry', 'trend']):
-        analysis["leverage_points"].append("market_conditions")
+    hits = _keyword_hits(message_lower)
+    
+    decided = set()
+    for field, value, words in _MESSAGE_BUCKETS:
+        if field in decided:
+            continue
+        
+        if hits is not None:
+            found = (field, value) in hits
+        else:
+            found = any(word in message_lower for word in words)
+        if not found:
+            continue
+        
+        if field == "leverage_points":
+            analysis["leverage_points"].append(value)
+        else:
+            decided.add(field)
+            analysis[field] = value
+            if field == "intent":
+                analysis[_INTENT_FOCUS[value]] = True
     
     return analysis
 
@@ -159,40 +232,12 @@ def _determine_supplier_strategy(
     """Determine the supplier's negotiation strategy"""
     
     # Count previous exchanges
-    supplier_messages = [msg for msg in transcript if msg.get("role") == "supplier"]
-    buyer_messages = [msg for msg in transcript if msg.get("role") == "buyer"]
-    
-    # Base strategy on supplier data characteristics
-    strategy_factors = []
-    
-    # Price sensitivity
-    if supplier_data.get("prices"):
-        avg_price = sum(supplier_data["prices"]) / len(supplier_data["prices"])
-        if avg_price > 1000:  # High-value products
-            strategy_factors.append("premium")
-        else:
-            strategy_factors.append("competitive")
-    
-    # Quality metrics influence
-    if supplier_data.get("quality_metrics"):
-        avg_quality = sum(supplier_data["quality_metrics"]) / len(supplier_data["quality_metrics"])
-        if avg_quality > 8.0:
-            strategy_factors.append("quality_focused")
-        else:
-            strategy_factors.append("cost_focused")
-    
-    # Delivery performance
-    if supplier_data.get("delivery_times"):
-        avg_delivery = sum(supplier_data["delivery_times"]) / len(supplier_data["delivery_times"])
-        if avg_delivery < 7:
-            strategy_factors.append("fast_delivery")
-        else:
-            strategy_factors.append("standard_delivery")
+    supplier_turns = sum(1 for msg in transcript if msg.get("role") == "supplier")
     
-    # Determine strategy based on factors and conversation history
-    if len(supplier_messages) == 0:
+    # Determine strategy based on conversation history
+    if supplier_turns == 0:
         return "initial_response"
-    elif len(supplier_messages) < 2:
+    elif supplier_turns < 2:
         return "building_relationship"
     elif message_analysis["tone"] == "demanding":
         return "defensive"
@@ -200,7 +245,7 @@ def _determine_supplier_strategy(
         return "competitive"
     elif message_analysis["urgency"] == "high":
         return "opportunistic"
-    elif message_analysis["price_focus"] and len(supplier_messages) >= 2:
+    elif message_analysis["price_focus"] and supplier_turns >= 2:
         return "collaborative"  # More willing to negotiate on price
     else:
         return "collaborative"
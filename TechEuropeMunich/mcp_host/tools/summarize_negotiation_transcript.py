@@ -6,20 +6,124 @@ and extract key metrics, sentiment, and strategy patterns using LLM integration.
 """
 
 import os
+import copy
 import json
+import asyncio
+import hashlib
 import logging
 import re
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Set, Tuple
 from datetime import datetime
-from collections import Counter
+from collections import Counter, OrderedDict
+from operator import itemgetter
+from dataclasses import dataclass
 
-from .llm_service import llm_service
+from . import json_codec
+from .llm_service import get_llm_service
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - optional speedup
+    ahocorasick = None
 
 logger = logging.getLogger(__name__)
 
+# Largest transcript file that will be read, 50 MB by default
+MAX_TRANSCRIPT_BYTES = int(os.getenv("MAX_TRANSCRIPT_BYTES", str(50 * 1024 * 1024)))
+
+# Completed analyses by transcript content hash; hits keep their original timestamp
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "128"))
+_analysis_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+# Keyword tables, in output order; a category triggers when any keyword occurs
+_BUYER_STRATEGY_KEYWORDS = {
+    "competition_leverage": ('competitor', 'alternative', 'other supplier'),
+    "volume_leverage": ('volume', 'bulk', 'large order'),
+    "relationship_building": ('long term', 'partnership', 'relationship'),
+    "market_pressure": ('market', 'industry', 'trend'),
+    "urgency_pressure": ('urgent', 'asap', 'immediately'),
+    "price_focus": ('budget', 'cost', 'price', 'discount'),
+}
+
+_SUPPLIER_STRATEGY_KEYWORDS = {
+    "value_proposition": ('quality', 'standard', 'value'),
+    "cost_justification": ('cost', 'price', 'market'),
+    "relationship_focus": ('relationship', 'partnership', 'long term'),
+    "resistance": ('difficult', 'challenge', 'concern'),
+    "alternative_offering": ('alternative', 'option', 'solution'),
+}
+
+_BUYER_STRENGTH_KEYWORDS = {
+    "Maintained professional and polite tone": ('please', 'thank', 'appreciate'),
+    "Used volume as leverage effectively": ('volume', 'bulk', 'large order'),
+    "Emphasized relationship building": ('long term', 'partnership', 'relationship'),
+}
+
+_LEVERAGE_KEYWORDS = ('volume', 'competitor', 'market', 'long term')
+
+_PHASE_NAMES = ("opening", "exploration", "negotiation", "closing")
+
+# Speaker labels recognized in plain text transcripts, e.g. "Vendor: ..."
+_ROLE_LABELS = {
+    'buyer': "buyer",
+    'user': "buyer",
+    'customer': "buyer",
+    'supplier': "supplier",
+    'seller': "supplier",
+    'vendor': "supplier",
+}
+
+def _contains_any(text: str, words: Tuple[str, ...]) -> bool:
+    """Substring check; str.__contains__ beats a regex alternation on this text"""
+    return any(word in text for word in words)
+
+def _build_automaton(tables: Dict[str, Dict[Optional[str], Tuple[str, ...]]]):
+    """Map every keyword to the (kind, category) tags it triggers in one automaton"""
+    tags_by_word: Dict[str, Set[Tuple[str, Optional[str]]]] = {}
+    for kind, table in tables.items():
+        for name, words in table.items():
+            for word in words:
+                tags_by_word.setdefault(word, set()).add((kind, name))
+    
+    automaton = ahocorasick.Automaton()
+    for word, tags in tags_by_word.items():
+        automaton.add_word(word, frozenset(tags))
+    automaton.make_automaton()
+    return automaton
+
+# With pyahocorasick each role's text is classified in one automaton pass
+if ahocorasick is not None:
+    _BUYER_AUTOMATON = _build_automaton({
+        "strategy": _BUYER_STRATEGY_KEYWORDS,
+        "strength": _BUYER_STRENGTH_KEYWORDS,
+        "leverage": {None: _LEVERAGE_KEYWORDS},
+    })
+    _SUPPLIER_AUTOMATON = _build_automaton({"strategy": _SUPPLIER_STRATEGY_KEYWORDS})
+else:
+    _BUYER_AUTOMATON = _SUPPLIER_AUTOMATON = None
+
+def _keyword_tags(automaton, text: str) -> Optional[Set[Tuple[str, Optional[str]]]]:
+    """Return the tags whose keywords occur in the text, or None without pyahocorasick"""
+    if automaton is None:
+        return None
+    # Dedupe the per-hit tag sets in C before merging them
+    return set().union(*set(map(itemgetter(1), automaton.iter(text))))
+
+def _matching_categories(
+    tags: Optional[Set[Tuple[str, Optional[str]]]],
+    kind: str,
+    table: Dict[str, Tuple[str, ...]],
+    text: str
+) -> List[str]:
+    """Return the categories triggered in the text, in table order"""
+    if tags is not None:
+        return [name for name in table if (kind, name) in tags]
+    return [name for name, words in table.items() if _contains_any(text, words)]
+
 async def summarize_negotiation_transcript_tool(
     transcript_path: str,
-    negotiation_transcript: List[Dict[str, str]]
+    negotiation_transcript: List[Dict[str, str]],
+    include_patterns: bool = False
 ) -> Dict[str, Any]:
     """
     Analyze a negotiation transcript to extract key metrics and patterns.
@@ -27,6 +131,7 @@ async def summarize_negotiation_transcript_tool(
     Args:
         transcript_path: Path to the negotiation transcript file (optional)
         negotiation_transcript: In-memory transcript data
+        include_patterns: Include the per-message role/length list in the conversation flow
         
     Returns:
         Dictionary containing analysis results
@@ -43,8 +148,19 @@ async def summarize_negotiation_transcript_tool(
         if not transcript_data:
             raise ValueError("Empty transcript data")
         
+        # The same transcript is often re-analyzed from the UI
+        cache_key = _transcript_key(transcript_data, include_patterns)
+        cached = _cached_analysis(cache_key)
+        if cached is not None:
+            logger.info(f"Reusing cached analysis of negotiation transcript with {len(transcript_data)} messages")
+            return cached
+        
         # Perform comprehensive analysis
-        analysis_result = await _analyze_transcript(transcript_data)
+        analysis_result = await _analyze_transcript(transcript_data, include_patterns)
+        
+        # Failed sentiment calls are retried on the next request
+        if "error" not in analysis_result["sentiment_analysis"]:
+            _cache_analysis(cache_key, analysis_result)
         
         logger.info(f"Successfully analyzed negotiation transcript with {len(transcript_data)} messages")
         return analysis_result
@@ -53,23 +169,57 @@ async def summarize_negotiation_transcript_tool(
         logger.error(f"Error analyzing transcript: {str(e)}")
         raise
 
+def _transcript_key(transcript_data: List[Dict[str, str]], include_patterns: bool) -> str:
+    """Content hash of a transcript and the analysis options"""
+    encoded = json_codec.dumps([include_patterns, transcript_data], default=str).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+def _cached_analysis(key: str) -> Optional[Dict[str, Any]]:
+    """Return a copy of a cached analysis, or None"""
+    entry = _analysis_cache.get(key)
+    if entry is None:
+        return None
+    
+    _analysis_cache.move_to_end(key)
+    return copy.deepcopy(entry)
+
+def _cache_analysis(key: str, analysis: Dict[str, Any]):
+    """Cache a copy of an analysis, evicting the least recently used entries when full"""
+    if ANALYSIS_CACHE_SIZE <= 0:
+        return
+    
+    _analysis_cache[key] = copy.deepcopy(analysis)
+    _analysis_cache.move_to_end(key)
+    while len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+        _analysis_cache.popitem(last=False)
+
 async def _read_transcript_file(transcript_path: str) -> List[Dict[str, str]]:
     """Read transcript from file"""
     try:
-        with open(transcript_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        # Raw bytes let orjson parse without a separate decode step, and the
+        # text is only decoded when the file turns out not to be JSON
+        data = await asyncio.to_thread(_read_file_bytes, transcript_path)
         
         # Try to parse as JSON first
         try:
-            return json.loads(content)
+            return json_codec.loads(data)
         except json.JSONDecodeError:
             # Parse as plain text
-            return _parse_text_transcript(content)
+            return _parse_text_transcript(data.decode('utf-8'))
             
     except Exception as e:
         logger.error(f"Error reading transcript file {transcript_path}: {str(e)}")
         raise
 
+def _read_file_bytes(transcript_path: str) -> bytes:
+    """Blocking file read, run off the event loop"""
+    with open(transcript_path, 'rb') as f:
+        # Reject oversized files before reading them into memory
+        size = os.fstat(f.fileno()).st_size
+        if size > MAX_TRANSCRIPT_BYTES:
+            raise ValueError(f"Transcript file is too large ({size} bytes, limit {MAX_TRANSCRIPT_BYTES})")
+        return f.read()
+
 def _parse_text_transcript(content: str) -> List[Dict[str, str]]:
     """Parse plain text transcript into structured format"""
     lines = content.strip().split('\n')
@@ -83,23 +233,17 @@ def _parse_text_transcript(content: str) -> List[Dict[str, str]]:
         if not line:
             continue
             
-        # Check for role indicators
-        if line.lower().startswith(('buyer:', 'user:', 'customer:')):
+        # Check for role indicators; only the label before the colon is lowercased
+        label, colon, rest = line.partition(':')
+        role = _ROLE_LABELS.get(label.lower()) if colon else None
+        if role:
             if current_role and current_message:
                 transcript.append({
                     "role": current_role,
                     "message": ' '.join(current_message)
                 })
-            current_role = "buyer"
-            current_message = [line.split(':', 1)[1].strip()]
-        elif line.lower().startswith(('supplier:', 'seller:', 'vendor:')):
-            if current_role and current_message:
-                transcript.append({
-                    "role": current_role,
-                    "message": ' '.join(current_message)
-                })
-            current_role = "supplier"
-            current_message = [line.split(':', 1)[1].strip()]
+            current_role = role
+            current_message = [rest.strip()]
         else:
             if current_message:
                 current_message.append(line)
@@ -117,7 +261,70 @@ def _parse_text_transcript(content: str) -> List[Dict[str, str]]:
     
     return transcript
 
-async def _analyze_transcript(transcript_data: List[Dict[str, str]]) -> Dict[str, Any]:
+@dataclass(slots=True)
+class TranscriptContext:
+    """Role-partitioned view of a transcript, with each message's fields read once"""
+    transcript: List[Dict[str, str]]
+    roles: Tuple[str, ...]
+    word_counts: Tuple[int, ...]
+    buyer_messages: List[str]
+    supplier_messages: List[str]
+    buyer_text_lower: str
+    supplier_text_lower: str
+    buyer_word_count: int
+    supplier_word_count: int
+    role_changes: int
+    buyer_tags: Optional[Set[Tuple[str, Optional[str]]]]
+    supplier_tags: Optional[Set[Tuple[str, Optional[str]]]]
+    
+    @classmethod
+    def from_transcript(cls, transcript_data: List[Dict[str, str]]) -> "TranscriptContext":
+        # Parallel tuples: the dict lookups happen here and nowhere else
+        roles = tuple(msg.get("role", "unknown") for msg in transcript_data)
+        messages = tuple(msg.get("message", "") for msg in transcript_data)
+        word_counts = tuple(len(message.split()) for message in messages)
+        
+        buyer_messages = [message for role, message in zip(roles, messages) if role == "buyer"]
+        supplier_messages = [message for role, message in zip(roles, messages) if role == "supplier"]
+        buyer_text_lower = " ".join(buyer_messages).lower()
+        supplier_text_lower = " ".join(supplier_messages).lower()
+        buyer_word_count, supplier_word_count, role_changes = _reduce_roles(roles, word_counts)
+        
+        return cls(
+            transcript=transcript_data,
+            roles=roles,
+            word_counts=word_counts,
+            buyer_messages=buyer_messages,
+            supplier_messages=supplier_messages,
+            buyer_text_lower=buyer_text_lower,
+            supplier_text_lower=supplier_text_lower,
+            buyer_word_count=buyer_word_count,
+            supplier_word_count=supplier_word_count,
+            role_changes=role_changes,
+            buyer_tags=_keyword_tags(_BUYER_AUTOMATON, buyer_text_lower),
+            supplier_tags=_keyword_tags(_SUPPLIER_AUTOMATON, supplier_text_lower)
+        )
+
+def _reduce_roles(roles: Tuple[str, ...], word_counts: Tuple[int, ...]) -> Tuple[int, int, int]:
+    """Buyer words, supplier words and speaker changes in one fused pass"""
+    buyer_words = supplier_words = role_changes = 0
+    previous_role = roles[0] if roles else None
+    
+    for role, count in zip(roles, word_counts):
+        if role == "buyer":
+            buyer_words += count
+        elif role == "supplier":
+            supplier_words += count
+        if role != previous_role:
+            role_changes += 1
+        previous_role = role
+    
+    return buyer_words, supplier_words, role_changes
+
+async def _analyze_transcript(
+    transcript_data: List[Dict[str, str]],
+    include_patterns: bool = False
+) -> Dict[str, Any]:
     """Perform comprehensive transcript analysis"""
     
     analysis = {
@@ -131,61 +338,69 @@ async def _analyze_transcript(transcript_data: List[Dict[str, str]]) -> Dict[str
         "timestamp": datetime.now().isoformat()
     }
     
-    # Basic summary
-    analysis["summary"] = _generate_basic_summary(transcript_data)
+    # Start the LLM sentiment call first so its latency overlaps the local analysis
+    sentiment_task = asyncio.create_task(_analyze_sentiment(transcript_data))
     
-    # Sentiment analysis using LLM
     try:
-        analysis["sentiment_analysis"] = await llm_service.analyze_conversation_sentiment(transcript_data)
+        analysis.update(await asyncio.to_thread(_analyze_locally, transcript_data, include_patterns))
+    except BaseException:
+        sentiment_task.cancel()
+        raise
+    
+    analysis["sentiment_analysis"] = await sentiment_task
+    
+    return analysis
+
+async def _analyze_sentiment(transcript_data: List[Dict[str, str]]) -> Dict[str, Any]:
+    """Sentiment analysis using LLM"""
+    try:
+        return await get_llm_service().analyze_conversation_sentiment(transcript_data)
     except Exception as e:
         logger.error(f"LLM sentiment analysis failed: {str(e)}")
-        analysis["sentiment_analysis"] = {
+        return {
             "buyer_sentiment": {"score": 0, "label": "error", "confidence": 0},
             "supplier_sentiment": {"score": 0, "label": "error", "confidence": 0},
             "overall_sentiment": {"score": 0, "label": "error", "confidence": 0},
             "error": f"LLM call didn't work: {str(e)}"
         }
+
+def _analyze_locally(transcript_data: List[Dict[str, str]], include_patterns: bool = False) -> Dict[str, Any]:
+    """CPU-only analysis sections, run off the event loop"""
     
-    # Strategy analysis
-    analysis["strategy_analysis"] = _analyze_strategies(transcript_data)
-    
-    # Conversation flow
-    analysis["conversation_flow"] = _analyze_conversation_flow(transcript_data)
-    
-    # Key metrics
-    analysis["key_metrics"] = _calculate_key_metrics(transcript_data)
-    
-    # Identify improvement areas and strengths
-    analysis["improvement_areas"] = _identify_improvement_areas(transcript_data)
-    analysis["strengths"] = _identify_strengths(transcript_data)
+    # Walk the transcript once; every local section reads from this context
+    ctx = TranscriptContext.from_transcript(transcript_data)
     
-    return analysis
+    return {
+        "summary": _generate_basic_summary(ctx),
+        "strategy_analysis": _analyze_strategies(ctx),
+        "conversation_flow": _analyze_conversation_flow(ctx, include_patterns),
+        "key_metrics": _calculate_key_metrics(ctx),
+        "improvement_areas": _identify_improvement_areas(ctx),
+        "strengths": _identify_strengths(ctx)
+    }
 
-def _generate_basic_summary(transcript_data: List[Dict[str, str]]) -> Dict[str, Any]:
+def _generate_basic_summary(ctx: TranscriptContext) -> Dict[str, Any]:
     """Generate basic summary of the negotiation"""
-    buyer_messages = [msg for msg in transcript_data if msg.get("role") == "buyer"]
-    supplier_messages = [msg for msg in transcript_data if msg.get("role") == "supplier"]
-    
-    total_messages = len(transcript_data)
-    buyer_word_count = sum(len(msg.get("message", "").split()) for msg in buyer_messages)
-    supplier_word_count = sum(len(msg.get("message", "").split()) for msg in supplier_messages)
+    total_messages = len(ctx.transcript)
+    buyer_count = len(ctx.buyer_messages)
+    supplier_count = len(ctx.supplier_messages)
     
     return {
         "total_messages": total_messages,
-        "buyer_messages": len(buyer_messages),
-        "supplier_messages": len(supplier_messages),
-        "buyer_word_count": buyer_word_count,
-        "supplier_word_count": supplier_word_count,
-        "average_message_length": (buyer_word_count + supplier_word_count) / total_messages if total_messages > 0 else 0,
-        "conversation_balance": len(buyer_messages) / len(supplier_messages) if supplier_messages else 0
+        "buyer_messages": buyer_count,
+        "supplier_messages": supplier_count,
+        "buyer_word_count": ctx.buyer_word_count,
+        "supplier_word_count": ctx.supplier_word_count,
+        "average_message_length": (ctx.buyer_word_count + ctx.supplier_word_count) / total_messages if total_messages > 0 else 0,
+        "conversation_balance": buyer_count / supplier_count if supplier_count else 0
     }
 
 
-def _analyze_strategies(transcript_data: List[Dict[str, str]]) -> Dict[str, Any]:
+def _analyze_strategies(ctx: TranscriptContext) -> Dict[str, Any]:
     """Analyze negotiation strategies used"""
     
-    buyer_strategies = _identify_buyer_strategies(transcript_data)
-    supplier_strategies = _identify_supplier_strategies(transcript_data)
+    buyer_strategies = _identify_buyer_strategies(ctx)
+    supplier_strategies = _identify_supplier_strategies(ctx)
     
     return {
         "buyer_strategies": buyer_strategies,
@@ -193,58 +408,13 @@ def _analyze_strategies(transcript_data: List[Dict[str, str]]) -> Dict[str, Any]
         "strategy_effectiveness": _assess_strategy_effectiveness(buyer_strategies, supplier_strategies)
     }
 
-def _identify_buyer_strategies(transcript_data: List[Dict[str, str]]) -> List[str]:
+def _identify_buyer_strategies(ctx: TranscriptContext) -> List[str]:
     """Identify strategies used by the buyer"""
-    strategies = []
-    buyer_messages = [msg.get("message", "").lower() for msg in transcript_data if msg.get("role") == "buyer"]
-    
-    all_buyer_text = " ".join(buyer_messages)
-    
-    # Check for common negotiation strategies
-    if any(word in all_buyer_text for word in ['competitor', 'alternative', 'other supplier']):
-        strategies.append("competition_leverage")
-    
-    if any(word in all_buyer_text for word in ['volume', 'bulk', 'large order']):
-        strategies.append("volume_leverage")
-    
-    if any(word in all_buyer_text for word in ['long term', 'partnership', 'relationship']):
-        strategies.append("relationship_building")
-    
-    if any(word in all_buyer_text for word in ['market', 'industry', 'trend']):
-        strategies.append("market_pressure")
-    
-    if any(word in all_buyer_text for word in ['urgent', 'asap', 'immediately']):
-        strategies.append("urgency_pressure")
-    
-    if any(word in all_buyer_text for word in ['budget', 'cost', 'price', 'discount']):
-        strategies.append("price_focus")
-    
-    return strategies
+    return _matching_categories(ctx.buyer_tags, "strategy", _BUYER_STRATEGY_KEYWORDS, ctx.buyer_text_lower)
 
-def _identify_supplier_strategies(transcript_data: List[Dict[str, str]]) -> List[str]:
+def _identify_supplier_strategies(ctx: TranscriptContext) -> List[str]:
     """Identify strategies used by the supplier"""
-    strategies = []
-    supplier_messages = [msg.get("message", "").lower() for msg in transcript_data if msg.get("role") == "supplier"]
-    
-    all_supplier_text = " ".join(supplier_messages)
-    
-    # Check for common supplier strategies
-    if any(word in all_supplier_text for word in ['quality', 'standard', 'value']):
-        strategies.append("value_proposition")
-    
-    if any(word in all_supplier_text for word in ['cost', 'price', 'market']):
-        strategies.append("cost_justification")
-    
-    if any(word in all_supplier_text for word in ['relationship', 'partnership', 'long term']):
-        strategies.append("relationship_focus")
-    
-    if any(word in all_supplier_text for word in ['difficult', 'challenge', 'concern']):
-        strategies.append("resistance")
-    
-    if any(word in all_supplier_text for word in ['alternative', 'option', 'solution']):
-        strategies.append("alternative_offering")
-    
-    return strategies
+    return _matching_categories(ctx.supplier_tags, "strategy", _SUPPLIER_STRATEGY_KEYWORDS, ctx.supplier_text_lower)
 
 def _assess_strategy_effectiveness(buyer_strategies: List[str], supplier_strategies: List[str]) -> Dict[str, Any]:
     """Assess the effectiveness of strategies used"""
@@ -255,38 +425,36 @@ def _assess_strategy_effectiveness(buyer_strategies: List[str], supplier_strateg
         "balanced_negotiation": abs(len(buyer_strategies) - len(supplier_strategies)) <= 2
     }
 
-def _analyze_conversation_flow(transcript_data: List[Dict[str, str]]) -> Dict[str, Any]:
+def _analyze_conversation_flow(ctx: TranscriptContext, include_patterns: bool = False) -> Dict[str, Any]:
     """Analyze the flow and structure of the conversation"""
     
-    # Analyze message patterns
-    message_patterns = []
-    for i, msg in enumerate(transcript_data):
-        role = msg.get("role", "unknown")
-        message_length = len(msg.get("message", "").split())
-        message_patterns.append({
-            "position": i,
-            "role": role,
-            "length": message_length
-        })
-    
     # Calculate conversation metrics
-    total_length = sum(pattern["length"] for pattern in message_patterns)
-    avg_length = total_length / len(message_patterns) if message_patterns else 0
+    total_length = sum(ctx.word_counts)
+    avg_length = total_length / len(ctx.word_counts) if ctx.word_counts else 0
     
     # Identify conversation phases
-    phases = _identify_conversation_phases(transcript_data)
+    phases = _identify_conversation_phases(len(ctx.transcript))
     
-    return {
-        "message_patterns": message_patterns,
+    flow = {}
+    
+    # One small dict per message, so only built on request
+    if include_patterns:
+        flow["message_patterns"] = [
+            {"position": i, "role": role, "length": length}
+            for i, (role, length) in enumerate(zip(ctx.roles, ctx.word_counts))
+        ]
+    
+    flow.update({
         "average_message_length": avg_length,
         "conversation_phases": phases,
-        "conversation_length": len(transcript_data)
-    }
+        "conversation_length": len(ctx.transcript)
+    })
+    
+    return flow
 
-def _identify_conversation_phases(transcript_data: List[Dict[str, str]]) -> List[Dict[str, Any]]:
-    """Identify different phases of the negotiation"""
+def _identify_conversation_phases(total_messages: int) -> List[Dict[str, Any]]:
+    """Identify different phases of the negotiation as [start, end) message ranges"""
     phases = []
-    total_messages = len(transcript_data)
     
     if total_messages == 0:
         return phases
@@ -294,80 +462,62 @@ def _identify_conversation_phases(transcript_data: List[Dict[str, str]]) -> List
     # Simple phase identification based on position
     phase_size = max(1, total_messages // 4)  # Divide into roughly 4 phases
     
-    phases = [
-        {"name": "opening", "messages": transcript_data[:phase_size]},
-        {"name": "exploration", "messages": transcript_data[phase_size:phase_size*2]},
-        {"name": "negotiation", "messages": transcript_data[phase_size*2:phase_size*3]},
-        {"name": "closing", "messages": transcript_data[phase_size*3:]}
-    ]
+    # Ranges index into the transcript instead of copying its messages
+    boundaries = [min(i * phase_size, total_messages) for i in range(len(_PHASE_NAMES))] + [total_messages]
+    for name, start, end in zip(_PHASE_NAMES, boundaries, boundaries[1:]):
+        phases.append({"name": name, "start": start, "end": end, "message_count": end - start})
     
     return phases
 
-def _calculate_key_metrics(transcript_data: List[Dict[str, str]]) -> Dict[str, Any]:
+def _calculate_key_metrics(ctx: TranscriptContext) -> Dict[str, Any]:
     """Calculate key negotiation metrics"""
+    total_messages = len(ctx.transcript)
     
-    buyer_messages = [msg for msg in transcript_data if msg.get("role") == "buyer"]
-    supplier_messages = [msg for msg in transcript_data if msg.get("role") == "supplier"]
-    
-    # Calculate response times (simplified)
-    response_times = []
-    for i in range(1, len(transcript_data)):
-        if transcript_data[i]["role"] != transcript_data[i-1]["role"]:
-            response_times.append(1)  # Simplified: assume 1 unit time
-    
-    avg_response_time = sum(response_times) / len(response_times) if response_times else 0
+    # Response times are simplified to one unit per change of speaker
+    avg_response_time = 1.0 if ctx.role_changes else 0
     
     return {
-        "total_duration": len(transcript_data),
+        "total_duration": total_messages,
         "average_response_time": avg_response_time,
-        "buyer_participation": len(buyer_messages) / len(transcript_data) if transcript_data else 0,
-        "supplier_participation": len(supplier_messages) / len(transcript_data) if transcript_data else 0,
-        "conversation_turn_count": len(transcript_data)
+        "buyer_participation": len(ctx.buyer_messages) / total_messages if total_messages else 0,
+        "supplier_participation": len(ctx.supplier_messages) / total_messages if total_messages else 0,
+        "conversation_turn_count": total_messages
     }
 
-def _identify_improvement_areas(transcript_data: List[Dict[str, str]]) -> List[str]:
+def _identify_improvement_areas(ctx: TranscriptContext) -> List[str]:
     """Identify areas for improvement"""
     improvements = []
     
-    buyer_messages = [msg for msg in transcript_data if msg.get("role") == "buyer"]
-    supplier_messages = [msg for msg in transcript_data if msg.get("role") == "supplier"]
+    buyer_count = len(ctx.buyer_messages)
+    buyer_text = ctx.buyer_text_lower
     
     # Check for common improvement areas
-    if len(buyer_messages) < 2:
+    if buyer_count < 2:
         improvements.append("Buyer should engage more actively in the conversation")
     
-    if len(supplier_messages) > len(buyer_messages) * 2:
+    if len(ctx.supplier_messages) > buyer_count * 2:
         improvements.append("Buyer should take more initiative in the negotiation")
     
     # Check for price focus
-    buyer_text = " ".join([msg.get("message", "").lower() for msg in buyer_messages])
     if 'price' in buyer_text and 'discount' not in buyer_text:
         improvements.append("Consider asking for specific discounts or price reductions")
     
     # Check for leverage usage
-    if not any(word in buyer_text for word in ['volume', 'competitor', 'market', 'long term']):
+    if ctx.buyer_tags is not None:
+        uses_leverage = ("leverage", None) in ctx.buyer_tags
+    else:
+        uses_leverage = _contains_any(buyer_text, _LEVERAGE_KEYWORDS)
+    if not uses_leverage:
         improvements.append("Consider using leverage points like volume, competition, or long-term relationship")
     
     return improvements
 
-def _identify_strengths(transcript_data: List[Dict[str, str]]) -> List[str]:
+def _identify_strengths(ctx: TranscriptContext) -> List[str]:
     """Identify negotiation strengths"""
-    strengths = []
-    
-    buyer_messages = [msg for msg in transcript_data if msg.get("role") == "buyer"]
-    buyer_text = " ".join([msg.get("message", "").lower() for msg in buyer_messages])
-    
     # Check for strengths
-    if any(word in buyer_text for word in ['please', 'thank', 'appreciate']):
-        strengths.append("Maintained professional and polite tone")
-    
-    if any(word in buyer_text for word in ['volume', 'bulk', 'large order']):
-        strengths.append("Used volume as leverage effectively")
-    
-    if any(word in buyer_text for word in ['long term', 'partnership', 'relationship']):
-        strengths.append("Emphasized relationship building")
+    strengths = _matching_categories(ctx.buyer_tags, "strength", _BUYER_STRENGTH_KEYWORDS, ctx.buyer_text_lower)
     
-    if len(buyer_messages) >= 3:
+    if len(ctx.buyer_messages) >= 3:
         strengths.append("Maintained consistent engagement throughout the negotiation")
     
     return strengths
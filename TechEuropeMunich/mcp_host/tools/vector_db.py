@@ -6,23 +6,131 @@ automatic supplier data extraction and contextual retrieval.
 """
 
 import os
+import re
 import logging
 import asyncio
-from typing import Dict, Any, List, Optional, Tuple
+import functools
+from typing import Dict, Any, List, Optional, Set, Tuple, Callable
+from collections import OrderedDict
 from pathlib import Path
 import json
 import hashlib
 
 import chromadb
+import torch
 from sentence_transformers import SentenceTransformer
 import numpy as np
 import fitz  # PyMuPDF
 import pandas as pd
 from dotenv import load_dotenv
 
+from . import json_codec
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+# Chunks per transformer forward pass when embedding documents
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+
+# Intra-op threads for CPU inference; unset keeps torch's default
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+
+# Inference backend for the embedding model: torch, onnx or openvino
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+# ONNX file inside the model repo, e.g. onnx/model_qint8_avx512_vnni.onnx for INT8
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "")
+
+# HNSW settings for newly created collections. MiniLM embeddings are unit
+# length, so cosine distance is 1 - similarity; higher M / ef trade a little
+# build time for recall at query time
+HNSW_SETTINGS = {
+    "hnsw:space": "cosine",
+    "hnsw:M": 24,
+    "hnsw:construction_ef": 200,
+    "hnsw:search_ef": 100,
+}
+
+# Chunks retrieved per contextual lookup
+CONTEXT_RESULTS = 5
+# hnswlib's error when a filtered search finds fewer neighbours than requested
+_SPARSE_RESULTS_ERROR = "contiguous 2D array"
+
+# Run one query-shaped encode at startup so the first buyer message doesn't pay
+# for allocator growth and kernel selection; EMBEDDING_WARMUP=0 disables this
+EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "1") != "0"
+_WARMUP_QUERY = "Can you offer a volume discount if we commit to faster delivery?"
+
+# Query embeddings kept for repeated buyer questions; 0 disables the cache
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+
+# Patterns for the regex fallback when AI profile extraction fails
+_PRICE_PATTERNS = [
+    re.compile(p, re.IGNORECASE)
+    for p in (r'\$(\d+\.?\d*)', r'(\d+\.?\d*)\s*(?:USD|dollars?)', r'price[:\s]*(\d+\.?\d*)')
+]
+_DELIVERY_PATTERNS = [
+    re.compile(p, re.IGNORECASE)
+    for p in (r'(\d+)\s*days?', r'delivery[:\s]*(\d+)', r'lead\s*time[:\s]*(\d+)')
+]
+_COMPANY_PATTERNS = [
+    re.compile(p, re.MULTILINE | re.IGNORECASE)
+    for p in (r'Company[:\s]*([A-Za-z\s&]+)', r'Supplier[:\s]*([A-Za-z\s&]+)', r'^([A-Z][A-Za-z\s&]{2,30})')
+]
+
+# How long a query embed waits for concurrent ones to share its forward pass
+EMBEDDING_BATCH_WINDOW = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5")) / 1000
+
+class EmbeddingBatcher:
+    """Coalesce concurrent single-text embeds into one encode call off the event loop"""
+    
+    def __init__(self, encode: Callable[[List[str]], np.ndarray], max_batch: int, window: float):
+        self._encode = encode
+        self.max_batch = max_batch
+        self.window = window
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # The loop only keeps weak references to tasks
+        self._running: Set[asyncio.Task] = set()
+    
+    async def embed(self, text: str) -> np.ndarray:
+        """Embed one text, sharing the forward pass with any concurrent callers"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+        
+        return await future
+    
+    def _flush(self):
+        """Send everything queued so far as one batch"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+    
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]):
+        """Encode a batch in a worker thread and resolve its futures"""
+        try:
+            embeddings = await asyncio.to_thread(self._encode, [text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
 class VectorSupplierDB:
     """Vector database for intelligent supplier document processing"""
     
@@ -34,21 +142,64 @@ class VectorSupplierDB:
         self.client = chromadb.PersistentClient(path=str(self.db_path))
         
         # Initialize embedding model
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        if EMBEDDING_THREADS > 0:
+            torch.set_num_threads(EMBEDDING_THREADS)
+        self.embedding_model = self._load_embedding_model()
+        
+        # Half precision roughly doubles GPU throughput for MiniLM at no retrieval cost
+        if self.embedding_backend == "torch" and self.embedding_model.device.type == "cuda":
+            self.embedding_model.half()
+        
+        self._query_batcher = EmbeddingBatcher(self._encode_batch, EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_WINDOW)
+        self._query_embedding_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        
+        if EMBEDDING_WARMUP:
+            self._warm_up()
         
         # Create collections
-        self.supplier_collection = self.client.get_or_create_collection(
-            name="supplier_data",
-            metadata={"description": "Supplier documents and data"}
+        self.supplier_collection = self._get_or_create_collection(
+            "supplier_data",
+            "Supplier documents and data"
         )
         
-        self.conversation_collection = self.client.get_or_create_collection(
-            name="conversations",
-            metadata={"description": "Negotiation conversations for learning"}
+        self.conversation_collection = self._get_or_create_collection(
+            "conversations",
+            "Negotiation conversations for learning"
         )
         
         logger.info("Vector database initialized")
     
+    def _warm_up(self):
+        """Embed a representative query once, through the same path queries take"""
+        try:
+            self._encode_batch([_WARMUP_QUERY])
+        except Exception as e:
+            logger.warning(f"Embedding warmup failed: {str(e)}")
+    
+    def _get_or_create_collection(self, name: str, description: str):
+        """Open a collection, creating it with the tuned HNSW index if it doesn't exist"""
+        # An existing index keeps the space and graph parameters it was built with
+        try:
+            return self.client.get_collection(name=name)
+        except Exception:
+            return self.client.create_collection(
+                name=name,
+                metadata={"description": description, **HNSW_SETTINGS}
+            )
+    
+    def _load_embedding_model(self) -> SentenceTransformer:
+        """Load MiniLM on the configured backend, falling back to torch"""
+        self.embedding_backend = EMBEDDING_BACKEND
+        if self.embedding_backend != "torch":
+            model_kwargs = {"file_name": EMBEDDING_ONNX_FILE} if EMBEDDING_ONNX_FILE else None
+            try:
+                return SentenceTransformer('all-MiniLM-L6-v2', backend=self.embedding_backend, model_kwargs=model_kwargs)
+            except Exception as e:
+                logger.warning(f"Could not load the {self.embedding_backend} embedding backend, using torch: {str(e)}")
+                self.embedding_backend = "torch"
+        
+        return SentenceTransformer('all-MiniLM-L6-v2')
+    
     async def process_and_store_document(self, file_path: str) -> Dict[str, Any]:
         """
         Automatically process and store a supplier document in vector DB
@@ -66,16 +217,12 @@ class VectorSupplierDB:
                 logger.info(f"Document already processed: {file_path.name}")
                 return existing
             
-            # Extract text based on file type
-            if file_path.suffix.lower() == '.pdf':
-                text_content = self._extract_pdf_text(file_path)
-            elif file_path.suffix.lower() == '.csv':
-                text_content = self._extract_csv_text(file_path)
-            else:
-                text_content = file_path.read_text(encoding='utf-8')
+            # Extraction, chunking and embedding run in worker threads so the
+            # event loop keeps serving chats while a document is ingested
+            text_content = await asyncio.to_thread(self._extract_text, file_path)
             
             # Chunk the document for better retrieval
-            chunks = self._chunk_document(text_content)
+            chunks = await asyncio.to_thread(self._chunk_document, text_content)
             
             # Extract supplier profile using AI
             supplier_profile = await self._extract_supplier_profile(text_content, chunks)
@@ -90,23 +237,56 @@ class VectorSupplierDB:
             logger.error(f"Error processing document {file_path}: {str(e)}")
             raise
     
-    async def get_contextual_supplier_info(self, query: str, supplier_id: str = None) -> Dict[str, Any]:
+    async def aencode_query(self, query: str) -> np.ndarray:
+        """Embed a single query string, batched with concurrent queries"""
+        embedding = self._query_embedding_cache.get(query)
+        if embedding is not None:
+            self._query_embedding_cache.move_to_end(query)
+            return embedding
+        
+        embedding = await self._query_batcher.embed(query)
+        
+        # Cached arrays are shared between callers
+        embedding.setflags(write=False)
+        self._query_embedding_cache[query] = embedding
+        while len(self._query_embedding_cache) > QUERY_EMBEDDING_CACHE_SIZE:
+            self._query_embedding_cache.popitem(last=False)
+        
+        return embedding
+    
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        """Embed a list of texts into a 2-D array"""
+        return self.embedding_model.encode(
+            texts,
+            batch_size=EMBEDDING_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+    
+    async def get_contextual_supplier_info(
+        self,
+        query: str,
+        supplier_id: str = None,
+        query_embedding: Optional[np.ndarray] = None
+    ) -> Dict[str, Any]:
         """
         Retrieve contextual supplier information based on query
         Used for generating intelligent responses during negotiation
+        
+        Pass query_embedding when the caller has already embedded the query
         """
         try:
             # Create query embedding
-            query_embedding = self.embedding_model.encode([query]).tolist()[0]
+            if query_embedding is None:
+                query_embedding = await self.aencode_query(query)
+            # Chroma takes float32 arrays as they are; Python lists are converted back
+            query_embedding = np.asarray(query_embedding, dtype=np.float32)
             
             # Search for relevant information
             where_filter = {"supplier_id": supplier_id} if supplier_id else None
             
-            results = self.supplier_collection.query(
-                query_embeddings=[query_embedding],
-                n_results=5,
-                where=where_filter
-            )
+            results = self._query_supplier_chunks(query_embedding, where_filter)
             
             # Compile relevant context
             context = {
@@ -116,23 +296,28 @@ class VectorSupplierDB:
             }
             
             if results['documents'] and results['documents'][0]:
-                for i, doc in enumerate(results['documents'][0]):
-                    distance = results['distances'][0][i] if results['distances'] else 0
-                    confidence = max(0, 1 - distance)  # Convert distance to confidence
-                    
-                    context["relevant_info"].append({
+                docs = results['documents'][0]
+                distances = results['distances'][0] if results['distances'] else [0] * len(docs)
+                metadatas = results['metadatas'][0] if results['metadatas'] else [{} for _ in docs]
+                
+                context["relevant_info"] = [
+                    {
                         "content": doc,
-                        "confidence": confidence,
-                        "metadata": results['metadatas'][0][i] if results['metadatas'] else {}
-                    })
+                        "confidence": max(0, 1 - distance),  # Convert distance to confidence
+                        "metadata": metadata
+                    }
+                    for doc, distance, metadata in zip(docs, distances, metadatas)
+                ]
                 
                 # Extract supplier profile if available
-                metadata = results['metadatas'][0][0] if results['metadatas'] and results['metadatas'][0] else {}
-                if 'supplier_profile' in metadata:
-                    try:
+                metadata = metadatas[0] or {}
+                try:
+                    if 'supplier_profile' in metadata:
                         context["supplier_data"] = json.loads(metadata['supplier_profile'])
-                    except:
-                        pass
+                    elif 'document_id' in metadata:
+                        context["supplier_data"] = self._load_supplier_profile(metadata['document_id']) or {}
+                except:
+                    pass
                 
                 # Calculate overall confidence
                 confidences = [item["confidence"] for item in context["relevant_info"]]
@@ -144,17 +329,35 @@ class VectorSupplierDB:
             logger.error(f"Error retrieving contextual info: {str(e)}")
             return {"relevant_info": [], "supplier_data": {}, "confidence": 0.0}
     
+    def _query_supplier_chunks(self, query_embedding: np.ndarray, where_filter: Optional[Dict[str, Any]]):
+        """Query supplier chunks, asking for fewer results when a filtered search comes up short"""
+        n_results = CONTEXT_RESULTS
+        while True:
+            try:
+                return self.supplier_collection.query(
+                    query_embeddings=[query_embedding],
+                    n_results=n_results,
+                    where=where_filter
+                )
+            except Exception as e:
+                # A supplier filter can leave the HNSW walk with fewer matches than n_results
+                if n_results == 1 or _SPARSE_RESULTS_ERROR not in str(e):
+                    raise
+                n_results //= 2
+                logger.warning(f"Filtered search came up short, retrying with n_results={n_results}")
+    
     async def store_conversation(self, conversation_data: Dict[str, Any]):
         """Store negotiation conversation for learning and improvement"""
         try:
-            conv_id = f"conv_{hashlib.md5(str(conversation_data).encode()).hexdigest()[:8]}"
+            conv_id = f"conv_{self._conversation_hash(conversation_data)}"
             
             # Create conversation summary for embedding
             messages = conversation_data.get("messages", [])
             summary = self._create_conversation_summary(messages)
             
             # Store conversation
-            embedding = self.embedding_model.encode([summary]).tolist()[0]
+            # Summaries are unique, so they skip the query embedding cache
+            embedding = np.asarray(await self._query_batcher.embed(summary), dtype=np.float32)
             
             self.conversation_collection.add(
                 documents=[summary],
@@ -164,8 +367,8 @@ class VectorSupplierDB:
                     "supplier_id": conversation_data.get("supplier_id", "unknown"),
                     "timestamp": conversation_data.get("timestamp", ""),
                     "outcome": conversation_data.get("outcome", ""),
-                    "strategies_used": json.dumps(conversation_data.get("strategies", [])),
-                    "full_conversation": json.dumps(messages)
+                    "strategies_used": json_codec.dumps(conversation_data.get("strategies", [])),
+                    "full_conversation": json_codec.dumps(messages)
                 }],
                 ids=[conv_id]
             )
@@ -175,6 +378,11 @@ class VectorSupplierDB:
         except Exception as e:
             logger.error(f"Error storing conversation: {str(e)}")
     
+    def _conversation_hash(self, conversation_data: Dict[str, Any]) -> str:
+        """Stable 8-character content hash of a conversation"""
+        canonical = json.dumps(conversation_data, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.blake2b(canonical.encode("utf-8"), digest_size=4).hexdigest()
+    
     def _generate_doc_id(self, file_path: Path) -> str:
         """Generate unique document ID based on file path and modification time"""
         stat = file_path.stat()
@@ -184,29 +392,41 @@ class VectorSupplierDB:
     def _get_existing_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
         """Check if document is already processed"""
         try:
-            results = self.supplier_collection.get(
-                where={"document_id": doc_id},
-                limit=1
-            )
-            
-            if results['metadatas'] and results['metadatas'][0]:
-                metadata = results['metadatas'][0]
-                if 'supplier_profile' in metadata:
-                    return json.loads(metadata['supplier_profile'])
-            
+            return self._load_supplier_profile(doc_id)
         except Exception:
             pass
         
         return None
     
+    def _load_supplier_profile(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a document's supplier profile, which is stored on its first chunk"""
+        results = self.supplier_collection.get(
+            ids=[f"{doc_id}_chunk_0"],
+            include=["metadatas"]
+        )
+        
+        if results['metadatas'] and results['metadatas'][0]:
+            metadata = results['metadatas'][0]
+            if 'supplier_profile' in metadata:
+                return json.loads(metadata['supplier_profile'])
+        
+        return None
+    
+    def _extract_text(self, file_path: Path) -> str:
+        """Extract text based on file type"""
+        if file_path.suffix.lower() == '.pdf':
+            return self._extract_pdf_text(file_path)
+        elif file_path.suffix.lower() == '.csv':
+            return self._extract_csv_text(file_path)
+        
+        # One read and one decode, without the text layer's newline translation
+        return file_path.read_bytes().decode('utf-8')
+    
     def _extract_pdf_text(self, file_path: Path) -> str:
         """Extract text from PDF file"""
-        doc = fitz.open(file_path)
-        text = ""
-        for page in doc:
-            text += page.get_text()
-        doc.close()
-        return text
+        # Collect the pages and join once instead of growing one string
+        with fitz.open(file_path, filetype="pdf") as doc:
+            return "".join([page.get_text("text") for page in doc])
     
     def _extract_csv_text(self, file_path: Path) -> str:
         """Convert CSV data to structured text"""
@@ -219,22 +439,23 @@ class VectorSupplierDB:
             # Add column information
             text_parts.append(f"Columns: {', '.join(df.columns.tolist())}")
             
-            # Add sample data
+            # Add sample data; itertuples yields plain tuples instead of a Series per row
             text_parts.append("\nSample Data:")
-            for idx, row in df.head(10).iterrows():
-                row_text = " | ".join([f"{col}: {val}" for col, val in row.items()])
+            columns = df.columns.tolist()
+            for idx, *values in df.head(10).itertuples(index=True, name=None):
+                row_text = " | ".join([f"{col}: {val}" for col, val in zip(columns, values)])
                 text_parts.append(f"Row {idx + 1}: {row_text}")
             
             # Add summary statistics
             text_parts.append(f"\nTotal Records: {len(df)}")
             
-            # Add numeric summaries
-            numeric_cols = df.select_dtypes(include=[np.number]).columns
-            if len(numeric_cols) > 0:
+            # Add numeric summaries; one agg pass skips describe()'s quantile sorts
+            numeric = df.select_dtypes(include=[np.number])
+            if len(numeric.columns) > 0:
                 text_parts.append("\nNumeric Summaries:")
-                for col in numeric_cols:
-                    stats = df[col].describe()
-                    text_parts.append(f"{col}: min={stats['min']:.2f}, max={stats['max']:.2f}, avg={stats['mean']:.2f}")
+                stats = numeric.agg(["min", "max", "mean"])
+                for col in numeric.columns:
+                    text_parts.append(f"{col}: min={stats.at['min', col]:.2f}, max={stats.at['max', col]:.2f}, avg={stats.at['mean', col]:.2f}")
             
             return "\n".join(text_parts)
             
@@ -245,18 +466,15 @@ class VectorSupplierDB:
     def _chunk_document(self, text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
         """Split document into overlapping chunks for better retrieval"""
         words = text.split()
-        chunks = []
         
-        for i in range(0, len(words), chunk_size - overlap):
-            chunk = " ".join(words[i:i + chunk_size])
-            if len(chunk.strip()) > 0:
-                chunks.append(chunk)
+        # split() never yields empty words, so every window is a non-empty chunk
+        chunks = [" ".join(words[i:i + chunk_size]) for i in range(0, len(words), chunk_size - overlap)]
         
         return chunks if chunks else [text]
     
     async def _extract_supplier_profile(self, full_text: str, chunks: List[str]) -> Dict[str, Any]:
         """Extract structured supplier profile using AI"""
-        from .llm_service import llm_service
+        from .llm_service import get_llm_service
         
         try:
             # Create extraction prompt
@@ -289,7 +507,7 @@ class VectorSupplierDB:
             Return ONLY the JSON object, no other text.
             """
             
-            response = await llm_service._call_llm(prompt)
+            response = await get_llm_service()._call_llm(prompt)
             
             # Try to parse JSON response
             try:
@@ -344,8 +562,6 @@ class VectorSupplierDB:
     
     def _fallback_extraction(self, text: str) -> Dict[str, Any]:
         """Fallback extraction using simple text analysis"""
-        import re
-        
         profile = {
             "supplier_name": "Unknown Supplier",
             "products": [],
@@ -366,21 +582,18 @@ class VectorSupplierDB:
         }
         
         # Extract prices using regex
-        price_patterns = [r'\$(\d+\.?\d*)', r'(\d+\.?\d*)\s*(?:USD|dollars?)', r'price[:\s]*(\d+\.?\d*)']
-        for pattern in price_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern in _PRICE_PATTERNS:
+            matches = pattern.findall(text)
             profile["prices"].extend([float(m) for m in matches if m.replace('.', '').isdigit()])
         
         # Extract delivery times
-        delivery_patterns = [r'(\d+)\s*days?', r'delivery[:\s]*(\d+)', r'lead\s*time[:\s]*(\d+)']
-        for pattern in delivery_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern in _DELIVERY_PATTERNS:
+            matches = pattern.findall(text)
             profile["delivery_times"].extend([int(m) for m in matches if m.isdigit()])
         
         # Try to find company name
-        company_patterns = [r'Company[:\s]*([A-Za-z\s&]+)', r'Supplier[:\s]*([A-Za-z\s&]+)', r'^([A-Z][A-Za-z\s&]{2,30})']
-        for pattern in company_patterns:
-            match = re.search(pattern, text, re.MULTILINE | re.IGNORECASE)
+        for pattern in _COMPANY_PATTERNS:
+            match = pattern.search(text)
             if match:
                 profile["supplier_name"] = match.group(1).strip()
                 break
@@ -388,44 +601,75 @@ class VectorSupplierDB:
         return profile
     
     async def _store_document_chunks(self, doc_id: str, filename: str, chunks: List[str], supplier_profile: Dict[str, Any]):
-        """Store document chunks with embeddings"""
-        embeddings = self.embedding_model.encode(chunks).tolist()
-        
-        # Prepare metadata for each chunk
-        metadatas = []
-        ids = []
-        
-        for i, chunk in enumerate(chunks):
-            chunk_id = f"{doc_id}_chunk_{i}"
-            metadata = {
-                "document_id": doc_id,
-                "filename": filename,
-                "chunk_index": i,
-                "supplier_id": supplier_profile.get("supplier_name", "unknown"),
-                "supplier_profile": json.dumps(supplier_profile)
-            }
-            
-            metadatas.append(metadata)
-            ids.append(chunk_id)
+        """Store document chunks with embeddings, one embedding batch at a time"""
+        supplier_id = supplier_profile.get("supplier_name", "unknown")
         
-        # Add to collection
-        self.supplier_collection.add(
-            documents=chunks,
-            embeddings=embeddings,
-            metadatas=metadatas,
-            ids=ids
-        )
+        # Each batch is embedded while the previous one is written, so only two
+        # batches of embeddings are alive at once
+        pending = None
+        encoding = None
+        try:
+            for start in range(0, len(chunks), EMBEDDING_BATCH_SIZE):
+                batch = chunks[start:start + EMBEDDING_BATCH_SIZE]
+                
+                # encode() already length-sorts each batch to minimize padding
+                encoding = asyncio.create_task(asyncio.to_thread(self._encode_batch, batch))
+                
+                if pending is not None:
+                    await asyncio.to_thread(self.supplier_collection.add, **pending)
+                
+                # Prepare metadata for each chunk
+                metadatas = [
+                    {
+                        "document_id": doc_id,
+                        "filename": filename,
+                        "chunk_index": i,
+                        "supplier_id": supplier_id
+                    }
+                    for i in range(start, start + len(batch))
+                ]
+                
+                # The profile is stored once, on the first chunk, and looked up by document_id
+                if start == 0:
+                    metadatas[0]["supplier_profile"] = json.dumps(supplier_profile)
+                
+                pending = {
+                    "documents": batch,
+                    "embeddings": np.asarray(await encoding, dtype=np.float32),
+                    "metadatas": metadatas,
+                    "ids": [f"{doc_id}_chunk_{i}" for i in range(start, start + len(batch))]
+                }
+            
+            # Add to collection
+            if pending is not None:
+                await asyncio.to_thread(self.supplier_collection.add, **pending)
+            
+        except Exception:
+            if encoding is not None:
+                encoding.cancel()
+            
+            # Don't leave a partial document behind that would look already processed
+            try:
+                self.supplier_collection.delete(where={"document_id": doc_id})
+            except Exception as e:
+                logger.warning(f"Could not remove partial document {doc_id}: {str(e)}")
+            raise
     
     def _create_conversation_summary(self, messages: List[Dict[str, str]]) -> str:
         """Create a summary of conversation for embedding"""
-        summary_parts = []
-        
-        for msg in messages:
-            role = msg.get("role", "unknown")
-            content = msg.get("message", "")[:200]  # Truncate long messages
-            summary_parts.append(f"{role}: {content}")
-        
-        return " | ".join(summary_parts)
+        # Long messages are truncated to 200 characters
+        return " | ".join([
+            f"{msg.get('role', 'unknown')}: {msg.get('message', '')[:200]}"
+            for msg in messages
+        ])
+
+@functools.lru_cache(maxsize=1)
+def get_vector_db() -> VectorSupplierDB:
+    """Return the process-wide vector database, creating it on first use"""
+    return VectorSupplierDB()
 
-# Global vector database instance
-vector_db = VectorSupplierDB()
\ No newline at end of file
+def __getattr__(name: str) -> Any:
+    # Keeps `from .vector_db import vector_db` working without loading the model at import
+    if name == "vector_db":
+        return get_vector_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -18,6 +18,7 @@ from mcp_host.tools.analyze_supplier import analyze_supplier_tool
 from mcp_host.tools.simulate_supplier_response import simulate_supplier_response_tool
 from mcp_host.tools.summarize_negotiation_transcript import summarize_negotiation_transcript_tool
 from mcp_host.tools.generate_feedback import generate_feedback_tool
+from console import ainput
 
 async def main():
     """Simple chat interface"""
@@ -59,8 +60,8 @@ async def main():
     
     while True:
         try:
-            # Get user input
-            user_input = input("👤 You: ").strip()
+            # Get user input without blocking the event loop
+            user_input = (await ainput("👤 You: ")).strip()
             
             if user_input.lower() in ['quit', 'exit', 'q']:
                 print("Goodbye! Keep practicing your negotiation skills!")
@@ -130,7 +131,10 @@ async def main():
             break
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
 
 
 
@@ -11,6 +11,7 @@ import sys
 import os
 from pathlib import Path
 import json
+import numpy as np
 
 # Add the project root to the Python path
 project_root = Path(__file__).parent
@@ -18,6 +19,33 @@ sys.path.insert(0, str(project_root))
 
 from mcp_host.tools.analyze_supplier import analyze_supplier_tool
 from mcp_host.tools.simulate_supplier_response import simulate_supplier_response_tool
+from console import OutputBuffer
+
+QUIT_COMMANDS = frozenset({'quit', 'exit', 'q'})
+
+# File types picked up from the examples folder
+DATA_FILE_SUFFIXES = frozenset({'.csv', '.pdf', '.txt'})
+
+# (mtime, files) from the last examples folder scan
+_examples_cache: tuple[float, list[Path]] | None = None
+
+def _find_example_files(examples_dir: Path) -> list[Path]:
+    """List supplier data files, re-scanning only when the folder changes"""
+    global _examples_cache
+    
+    try:
+        mtime = examples_dir.stat().st_mtime
+    except OSError:
+        return []
+    
+    if _examples_cache is None or _examples_cache[0] != mtime:
+        files = [
+            file_path for file_path in examples_dir.glob("*")
+            if file_path.suffix.lower() in DATA_FILE_SUFFIXES
+        ]
+        _examples_cache = (mtime, files)
+    
+    return _examples_cache[1]
 
 class SmartSupplierChat:
     """Smart supplier chat that automatically uses data and responds naturally"""
@@ -33,11 +61,7 @@ class SmartSupplierChat:
         examples_dir = project_root / "examples"
         
         # Look for data files in examples folder
-        data_files = []
-        if examples_dir.exists():
-            for file_path in examples_dir.glob("*"):
-                if file_path.suffix.lower() in ['.csv', '.pdf', '.txt']:
-                    data_files.append(file_path)
+        data_files = _find_example_files(examples_dir)
         
         if data_files:
             # Use the first data file found
@@ -53,7 +77,8 @@ class SmartSupplierChat:
                 if result.get('products'):
                     print(f"   Products: {len(result.get('products', []))} items")
                 if result.get('prices'):
-                    print(f"   Price range: ${min(result.get('prices', [0])):.2f} - ${max(result.get('prices', [0])):.2f}")
+                    prices = np.asarray(result['prices'], dtype=np.float64)
+                    print(f"   Price range: ${prices.min():.2f} - ${prices.max():.2f}")
                 print()
                 
                 return True
@@ -80,8 +105,8 @@ class SmartSupplierChat:
             if result.get('products'):
                 print(f"   Products: {len(result.get('products', []))} items")
             if result.get('prices'):
-                prices = result.get('prices', [0])
-                print(f"   Price range: ${min(prices):.2f} - ${max(prices):.2f}")
+                prices = np.asarray(result['prices'], dtype=np.float64)
+                print(f"   Price range: ${prices.min():.2f} - ${prices.max():.2f}")
             print()
             
             return True
@@ -109,11 +134,13 @@ class SmartSupplierChat:
             strategy = result.get("strategy", "unknown")
             confidence = result.get("confidence", 0)
             
-            print(f"🏭 {self.supplier_name}: {response}")
+            out = OutputBuffer()
+            out(f"🏭 {self.supplier_name}: {response}")
             
             # Only show technical info if confidence is low (debugging)
             if confidence < 0.6:
-                print(f"   [Strategy: {strategy} | Confidence: {confidence:.1%}]")
+                out(f"   [Strategy: {strategy} | Confidence: {confidence:.1%}]")
+            out.flush()
             
         except Exception as e:
             print(f"🏭 {self.supplier_name}: I'm having some technical difficulties right now. Could you repeat that?")
@@ -134,7 +161,7 @@ class SmartSupplierChat:
             while not self.supplier_loaded:
                 file_path = input("📁 Enter path to supplier data file (or 'quit'): ").strip()
                 
-                if file_path.lower() in ['quit', 'exit', 'q']:
+                if file_path.lower() in QUIT_COMMANDS:
                     print("Goodbye!")
                     return
                 
@@ -155,8 +182,9 @@ class SmartSupplierChat:
             try:
                 # Get user input
                 user_input = input("💬 ").strip()
+                command = user_input.lower()
                 
-                if user_input.lower() in ['quit', 'exit', 'q']:
+                if command in QUIT_COMMANDS:
                     print(f"👋 {self.supplier_name}: Thanks for your time! We look forward to working together.")
                     break
                 
@@ -164,12 +192,12 @@ class SmartSupplierChat:
                     continue
                 
                 # Handle special commands (hidden)
-                elif user_input.lower().startswith('load '):
+                elif command.startswith('load '):
                     file_path = user_input[5:].strip()
                     await self.load_custom_file(file_path)
                     continue
                 
-                elif user_input.lower() == 'info':
+                elif command == 'info':
                     self.show_supplier_info()
                     continue
                 
@@ -203,15 +231,15 @@ class SmartSupplierChat:
                 print(f"   (and {len(supplier_data['products']) - 5} more)")
         
         if supplier_data.get('prices'):
-            prices = supplier_data['prices']
-            print(f"Price range: ${min(prices):.2f} - ${max(prices):.2f}")
+            prices = np.asarray(supplier_data['prices'], dtype=np.float64)
+            print(f"Price range: ${prices.min():.2f} - ${prices.max():.2f}")
         
         if supplier_data.get('quality_metrics'):
-            avg_quality = sum(supplier_data['quality_metrics']) / len(supplier_data['quality_metrics'])
+            avg_quality = np.mean(supplier_data['quality_metrics'], dtype=np.float64)
             print(f"Average quality rating: {avg_quality:.1f}/10")
         
         if supplier_data.get('delivery_times'):
-            avg_delivery = sum(supplier_data['delivery_times']) / len(supplier_data['delivery_times'])
+            avg_delivery = np.mean(supplier_data['delivery_times'], dtype=np.float64)
             print(f"Average delivery time: {avg_delivery:.0f} days")
         
         print()
@@ -18,35 +18,36 @@ from mcp_host.tools.analyze_supplier import analyze_supplier_tool
 from mcp_host.tools.simulate_supplier_response import simulate_supplier_response_tool
 from mcp_host.tools.summarize_negotiation_transcript import summarize_negotiation_transcript_tool
 from mcp_host.tools.generate_feedback import generate_feedback_tool
+from console import OutputBuffer
 
-async def test_analyze_supplier():
+async def test_analyze_supplier(out=print):
     """Test the analyze_supplier tool"""
-    print("🧪 Testing analyze_supplier tool...")
+    out("🧪 Testing analyze_supplier tool...")
     
     # Test with CSV file
     csv_file = project_root / "examples" / "supplier_data.csv"
     if csv_file.exists():
         session_context = {}
         result = await analyze_supplier_tool(str(csv_file), session_context)
-        print(f"✅ CSV analysis successful: {len(result.get('products', []))} products found")
-        print(f"   Supplier: {result.get('supplier_name', 'Unknown')}")
-        print(f"   Prices: {len(result.get('prices', []))} price points")
+        out(f"✅ CSV analysis successful: {len(result.get('products', []))} products found")
+        out(f"   Supplier: {result.get('supplier_name', 'Unknown')}")
+        out(f"   Prices: {len(result.get('prices', []))} price points")
     else:
-        print("❌ CSV test file not found")
+        out("❌ CSV test file not found")
     
     # Test with TXT file (simulating PDF)
     txt_file = project_root / "examples" / "supplier_contract.txt"
     if txt_file.exists():
         session_context = {}
         result = await analyze_supplier_tool(str(txt_file), session_context)
-        print(f"✅ TXT analysis successful: {result.get('text_length', 0)} characters processed")
-        print(f"   Supplier: {result.get('supplier_name', 'Unknown')}")
+        out(f"✅ TXT analysis successful: {result.get('text_length', 0)} characters processed")
+        out(f"   Supplier: {result.get('supplier_name', 'Unknown')}")
     else:
-        print("❌ TXT test file not found")
+        out("❌ TXT test file not found")
 
-async def test_simulate_response():
+async def test_simulate_response(out=print):
     """Test the simulate_supplier_response tool"""
-    print("\n🧪 Testing simulate_supplier_response tool...")
+    out("\n🧪 Testing simulate_supplier_response tool...")
     
     # Create mock session context
     session_context = {
@@ -68,19 +69,24 @@ async def test_simulate_response():
         "We're considering other suppliers"
     ]
     
-    for message in test_messages:
-        result = await simulate_supplier_response_tool(
+    # The messages share an unchanging transcript, so their LLM calls can run concurrently
+    results = await asyncio.gather(*(
+        simulate_supplier_response_tool(
             message, 
             session_context, 
             negotiation_transcript
         )
-        print(f"✅ Response generated for: '{message[:30]}...'")
-        print(f"   Strategy: {result.get('strategy', 'unknown')}")
-        print(f"   Confidence: {result.get('confidence', 0):.1%}")
+        for message in test_messages
+    ))
+    
+    for message, result in zip(test_messages, results):
+        out(f"✅ Response generated for: '{message[:30]}...'")
+        out(f"   Strategy: {result.get('strategy', 'unknown')}")
+        out(f"   Confidence: {result.get('confidence', 0):.1%}")
 
-async def test_summarize_transcript():
+async def test_summarize_transcript(out=print):
     """Test the summarize_negotiation_transcript tool"""
-    print("\n🧪 Testing summarize_negotiation_transcript tool...")
+    out("\n🧪 Testing summarize_negotiation_transcript tool...")
     
     # Create mock transcript
     mock_transcript = [
@@ -93,14 +99,14 @@ async def test_summarize_transcript():
     ]
     
     result = await summarize_negotiation_transcript_tool("", mock_transcript)
-    print(f"✅ Transcript analysis successful")
-    print(f"   Total messages: {result.get('summary', {}).get('total_messages', 0)}")
-    print(f"   Buyer sentiment: {result.get('sentiment_analysis', {}).get('buyer_sentiment', {}).get('label', 'unknown')}")
-    print(f"   Strategies used: {len(result.get('strategy_analysis', {}).get('buyer_strategies', []))}")
+    out(f"✅ Transcript analysis successful")
+    out(f"   Total messages: {result.get('summary', {}).get('total_messages', 0)}")
+    out(f"   Buyer sentiment: {result.get('sentiment_analysis', {}).get('buyer_sentiment', {}).get('label', 'unknown')}")
+    out(f"   Strategies used: {len(result.get('strategy_analysis', {}).get('buyer_strategies', []))}")
 
-async def test_generate_feedback():
+async def test_generate_feedback(out=print):
     """Test the generate_feedback tool"""
-    print("\n🧪 Testing generate_feedback tool...")
+    out("\n🧪 Testing generate_feedback tool...")
     
     # Create mock report data
     mock_report = {
@@ -136,30 +142,38 @@ async def test_generate_feedback():
     }
     
     result = await generate_feedback_tool(mock_report)
-    print(f"✅ Feedback generation successful")
-    print(f"   Feedback length: {len(result)} characters")
-    print(f"   Contains executive summary: {'Executive Summary' in result}")
-    print(f"   Contains recommendations: {'Recommendations' in result}")
+    out(f"✅ Feedback generation successful")
+    out(f"   Feedback length: {len(result)} characters")
+    out(f"   Contains executive summary: {'Executive Summary' in result}")
+    out(f"   Contains recommendations: {'Recommendations' in result}")
 
 async def main():
     """Run all tests"""
     print("🎯 TactoLearn Negotiation Intelligence Agent - Test Suite")
     print("=" * 60)
     
-    try:
-        await test_analyze_supplier()
-        await test_simulate_response()
-        await test_summarize_transcript()
-        await test_generate_feedback()
-        
-        print("\n🎉 All tests completed successfully!")
-        print("The TactoLearn Negotiation Intelligence Agent is ready to use.")
-        
-    except Exception as e:
-        print(f"\n❌ Test failed with error: {str(e)}")
+    # The tools are independent, so the tests run concurrently; each one buffers
+    # its output so the report still reads in order
+    tests = [test_analyze_supplier, test_simulate_response, test_summarize_transcript, test_generate_feedback]
+    outputs = [OutputBuffer() for _ in tests]
+    results = await asyncio.gather(
+        *(test(out) for test, out in zip(tests, outputs)),
+        return_exceptions=True
+    )
+    
+    for out in outputs:
+        out.flush()
+    
+    failures = [result for result in results if isinstance(result, BaseException)]
+    if failures:
         import traceback
-        traceback.print_exc()
+        for e in failures:
+            print(f"\n❌ Test failed with error: {str(e)}")
+            traceback.print_exception(e)
         sys.exit(1)
+    
+    print("\n🎉 All tests completed successfully!")
+    print("The TactoLearn Negotiation Intelligence Agent is ready to use.")
 
 if __name__ == "__main__":
     asyncio.run(main())
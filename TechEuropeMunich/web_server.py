@@ -10,14 +10,15 @@ import os
 import sys
 from pathlib import Path
 from datetime import datetime
-import json
-import shutil
-from typing import Dict, Any, List
+import hashlib
+from collections import ChainMap, deque
+from typing import Dict, Any, List, Mapping
 
+import numpy as np
 from fastapi import FastAPI, File, UploadFile, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 import uvicorn
 from pydantic import BaseModel
 
@@ -25,10 +26,57 @@ from pydantic import BaseModel
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
-from mcp_host.tools.vector_db import vector_db
-from mcp_host.tools.simulate_supplier_response import simulate_supplier_response_tool
+from mcp_host.tools.vector_db import get_vector_db
+from mcp_host.tools.semantic_cache import SimilarityCache
+from mcp_host.tools.profile_cache import ProfileCache
+from mcp_host.tools.llm_service import get_llm_service
+from mcp_host.tools import json_codec
+from mcp_host.tools.simulate_supplier_response import (
+    simulate_supplier_response_tool,
+    simulate_supplier_response_stream,
+)
 
-app = FastAPI(title="TactoLearn Web Interface")
+class CodecJSONResponse(JSONResponse):
+    """JSON response rendered through json_codec, so orjson is used when installed"""
+    
+    def render(self, content: Any) -> bytes:
+        return json_codec.dumps(content).encode("utf-8")
+
+app = FastAPI(title="TactoLearn Web Interface", default_response_class=CodecJSONResponse)
+
+# Copy buffer for saving uploads
+UPLOAD_COPY_BUFFER = 1024 * 1024
+
+# Oldest messages are dropped once a session grows past this
+MAX_TRANSCRIPT_MESSAGES = 2000
+
+# Auto-reload on code changes is for development; WEB_RELOAD=1 turns it on
+WEB_RELOAD = os.getenv("WEB_RELOAD", "0") == "1"
+# Per-request access logging is off unless WEB_ACCESS_LOG=1
+WEB_ACCESS_LOG = os.getenv("WEB_ACCESS_LOG", "0") == "1"
+
+# Conversation writes still in flight, held so they aren't collected early
+_pending_stores: set = set()
+
+@app.on_event("startup")
+async def warm_up():
+    """Load the embedding model and open LLM connections before the first request needs them"""
+    # get_vector_db() loads the model and runs a warmup encode as part of construction
+    await asyncio.gather(asyncio.to_thread(get_vector_db), _warm_llm())
+
+async def _warm_llm():
+    """Build the LLM service and pre-open its connections"""
+    try:
+        service = await asyncio.to_thread(get_llm_service)
+        await service.warmup()
+    except Exception as e:
+        print(f"⚠️ LLM warmup failed: {str(e)}")
+
+@app.on_event("shutdown")
+async def close_llm():
+    """Close the LLM service's shared connection pool if it was ever built"""
+    if get_llm_service.cache_info().currsize:
+        await get_llm_service().aclose()
 
 # Create directories
 web_dir = project_root / "web"
@@ -36,6 +84,9 @@ web_dir.mkdir(exist_ok=True)
 uploads_dir = project_root / "uploads"
 uploads_dir.mkdir(exist_ok=True)
 
+# Profiles of already-ingested files, keyed by content hash
+profile_cache = ProfileCache(uploads_dir / ".hash_cache")
+
 # Templates and static files
 templates = Jinja2Templates(directory=str(web_dir))
 
@@ -44,8 +95,14 @@ class SessionState:
     def __init__(self):
         self.current_supplier = None
         self.current_supplier_data = {}
-        self.negotiation_transcript = []
+        self.negotiation_transcript = deque(maxlen=MAX_TRANSCRIPT_MESSAGES)
         self.session_context = {}
+        
+        # Messages exchanged this session, including ones dropped from the transcript
+        self.message_count = 0
+        
+        # Cache of vector-DB context for repeated / near-duplicate buyer messages
+        self.context_cache = SimilarityCache()
 
 session = SessionState()
 
@@ -71,28 +128,37 @@ async def upload_file(file: UploadFile = File(...)):
         if not file.filename.lower().endswith(('.pdf', '.csv', '.txt')):
             raise HTTPException(status_code=400, detail="Only PDF, CSV, and TXT files are supported")
         
-        # Save uploaded file
+        # Save uploaded file in a worker thread so other requests keep being served
         file_path = uploads_dir / file.filename
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        content_hash = await asyncio.to_thread(_save_upload, file.file, file_path)
         
-        # Process with vector database
-        supplier_profile = await vector_db.process_and_store_document(str(file_path))
+        # Skip the embedding pipeline for byte-identical re-uploads
+        supplier_profile = profile_cache.get(content_hash)
+        if supplier_profile is None:
+            # Process with vector database
+            supplier_profile = await get_vector_db().process_and_store_document(str(file_path))
+            await asyncio.to_thread(profile_cache.put, content_hash, supplier_profile)
         
         # Update session state
         session.current_supplier = supplier_profile.get("supplier_name", file.filename.split('.')[0].title())
         session.current_supplier_data = supplier_profile
         session.session_context['supplier_data'] = supplier_profile
-        session.negotiation_transcript = []  # Reset conversation
+        session.negotiation_transcript.clear()  # Reset conversation
+        session.message_count = 0
+        session.context_cache.clear()
         
-        return JSONResponse({
+        # float64 keeps the cents exact for large prices
+        prices = supplier_profile.get("prices")
+        price_array = np.asarray(prices, dtype=np.float64) if prices else None
+        
+        return CodecJSONResponse({
             "success": True,
             "supplier_name": session.current_supplier,
             "supplier_data": {
                 "products": supplier_profile.get("products", [])[:5],  # First 5 products
                 "price_range": {
-                    "min": min(supplier_profile.get("prices", [0])) if supplier_profile.get("prices") else None,
-                    "max": max(supplier_profile.get("prices", [0])) if supplier_profile.get("prices") else None
+                    "min": float(price_array.min()) if price_array is not None else None,
+                    "max": float(price_array.max()) if price_array is not None else None
                 },
                 "negotiation_style": supplier_profile.get("negotiation_style", "collaborative"),
                 "volume_discounts": supplier_profile.get("volume_discounts", False)
@@ -100,11 +166,94 @@ async def upload_file(file: UploadFile = File(...)):
         })
         
     except Exception as e:
-        return JSONResponse({
+        return CodecJSONResponse({
             "success": False,
             "error": str(e)
         }, status_code=500)
 
+def _save_upload(source, file_path: Path) -> str:
+    """Copy an uploaded file to disk and return its content hash"""
+    # Same digest as profile_cache.hash_file, computed during the copy instead of a second read
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(file_path, "wb") as buffer:
+        while chunk := source.read(UPLOAD_COPY_BUFFER):
+            hasher.update(chunk)
+            buffer.write(chunk)
+    return hasher.hexdigest()
+
+async def _lookup_context(user_message: str) -> Dict[str, Any]:
+    """Look up vector-DB context, reusing results for repeated or similar messages"""
+    cache_key = (session.current_supplier, session.context_cache.normalize(user_message))
+    
+    context = session.context_cache.get(cache_key)
+    if context is not None:
+        return context
+    
+    # Embed once and reuse the embedding for both the similarity check and the search
+    vector_db = get_vector_db()
+    query_embedding = await vector_db.aencode_query(user_message)
+    context = session.context_cache.get_similar(query_embedding)
+    if context is not None:
+        return context
+    
+    context = await vector_db.get_contextual_supplier_info(
+        user_message, 
+        session.current_supplier,
+        query_embedding=query_embedding
+    )
+    
+    # Don't cache empty results from a failed lookup
+    if context.get("relevant_info"):
+        session.context_cache.put(cache_key, query_embedding, context)
+    
+    return context
+
+async def _build_chat_context(user_message: str) -> Mapping[str, Any]:
+    """Session context enriched with vector search results for a buyer message"""
+    # Get contextual information from vector database
+    context = await _lookup_context(user_message)
+    
+    # Layer this turn's vector search results over the session context
+    # without mutating the shared supplier_data dict
+    supplier_data = session.session_context.get('supplier_data', {})
+    if context.get("supplier_data"):
+        supplier_data = {**supplier_data, **context["supplier_data"]}
+    turn_context = {'supplier_data': supplier_data}
+    
+    # Add relevant document chunks as context
+    if context.get("relevant_info"):
+        turn_context['contextual_info'] = context["relevant_info"]
+    
+    return ChainMap(turn_context, session.session_context)
+
+async def _record_turn(user_message: str, response_text: str, strategy: str):
+    """Append a buyer/supplier exchange to the transcript"""
+    session.negotiation_transcript.extend([
+        {"role": "buyer", "message": user_message},
+        {"role": "supplier", "message": response_text}
+    ])
+    session.message_count += 2
+    
+    # Store conversation in vector database periodically, without holding up the reply
+    if session.message_count % 8 == 0:
+        conversation_data = {
+            "messages": list(session.negotiation_transcript),
+            "supplier_id": session.current_supplier,
+            "timestamp": datetime.now().isoformat(),
+            "strategies": [strategy],
+            "outcome": "ongoing"
+        }
+        task = asyncio.create_task(_store_conversation(conversation_data))
+        _pending_stores.add(task)
+        task.add_done_callback(_pending_stores.discard)
+
+async def _store_conversation(conversation_data: Dict[str, Any]):
+    """Write a conversation snapshot to the vector database"""
+    try:
+        await get_vector_db().store_conversation(conversation_data)
+    except Exception:
+        pass  # Don't break chat for storage errors
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat_with_supplier(message: ChatMessage):
     """Handle chat messages and generate supplier responses"""
@@ -112,20 +261,7 @@ async def chat_with_supplier(message: ChatMessage):
         if not session.current_supplier:
             raise HTTPException(status_code=400, detail="No supplier loaded. Please upload a file first.")
         
-        # Get contextual information from vector database
-        context = await vector_db.get_contextual_supplier_info(
-            message.message, 
-            session.current_supplier
-        )
-        
-        # Enhance session context with vector search results
-        enhanced_context = session.session_context.copy()
-        if context.get("supplier_data"):
-            enhanced_context['supplier_data'].update(context["supplier_data"])
-        
-        # Add relevant document chunks as context
-        if context.get("relevant_info"):
-            enhanced_context['contextual_info'] = context["relevant_info"]
+        enhanced_context = await _build_chat_context(message.message)
         
         # Generate response using enhanced context
         result = await simulate_supplier_response_tool(
@@ -137,25 +273,7 @@ async def chat_with_supplier(message: ChatMessage):
         response_text = result.get("response", "I'm not sure how to respond to that.")
         strategy = result.get("strategy", "unknown")
         
-        # Add to transcript
-        session.negotiation_transcript.extend([
-            {"role": "buyer", "message": message.message},
-            {"role": "supplier", "message": response_text}
-        ])
-        
-        # Store conversation in vector database periodically
-        if len(session.negotiation_transcript) % 8 == 0:
-            try:
-                conversation_data = {
-                    "messages": session.negotiation_transcript.copy(),
-                    "supplier_id": session.current_supplier,
-                    "timestamp": datetime.now().isoformat(),
-                    "strategies": [strategy],
-                    "outcome": "ongoing"
-                }
-                await vector_db.store_conversation(conversation_data)
-            except:
-                pass  # Don't break chat for storage errors
+        await _record_turn(message.message, response_text, strategy)
         
         return ChatResponse(
             supplier_name=session.current_supplier,
@@ -166,13 +284,47 @@ async def chat_with_supplier(message: ChatMessage):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/stream")
+async def chat_with_supplier_stream(message: ChatMessage):
+    """Stream the supplier response as Server-Sent Events while it is generated"""
+    if not session.current_supplier:
+        raise HTTPException(status_code=400, detail="No supplier loaded. Please upload a file first.")
+    
+    try:
+        enhanced_context = await _build_chat_context(message.message)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def events():
+        parts = []
+        strategy = "unknown"
+        try:
+            async for event in simulate_supplier_response_stream(
+                message.message,
+                enhanced_context,
+                session.negotiation_transcript
+            ):
+                if event["type"] == "start":
+                    strategy = event["strategy"]
+                    event = {**event, "supplier_name": session.current_supplier}
+                else:
+                    parts.append(event["text"])
+                yield f"data: {json_codec.dumps(event)}\n\n"
+            
+            await _record_turn(message.message, "".join(parts).strip(), strategy)
+            yield f"data: {json_codec.dumps({'type': 'done'})}\n\n"
+        except Exception as e:
+            yield f"data: {json_codec.dumps({'type': 'error', 'error': str(e)})}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 @app.get("/status")
 async def get_status():
     """Get current session status"""
-    return JSONResponse({
+    return CodecJSONResponse({
         "supplier_loaded": session.current_supplier is not None,
         "supplier_name": session.current_supplier,
-        "conversation_length": len(session.negotiation_transcript),
+        "conversation_length": session.message_count,
         "supplier_summary": {
             "products": session.current_supplier_data.get("products", [])[:3],
             "negotiation_style": session.current_supplier_data.get("negotiation_style", "unknown"),
@@ -185,19 +337,24 @@ async def reset_session():
     """Reset the current session"""
     session.current_supplier = None
     session.current_supplier_data = {}
-    session.negotiation_transcript = []
+    session.negotiation_transcript.clear()
+    session.message_count = 0
     session.session_context = {}
+    session.context_cache.clear()
     
-    return JSONResponse({"success": True, "message": "Session reset successfully"})
+    return CodecJSONResponse({"success": True, "message": "Session reset successfully"})
 
 if __name__ == "__main__":
     print("🚀 Starting TactoLearn Web Interface...")
     print("📁 Upload files and chat at: http://localhost:8000")
     
+    # A single worker: the session lives in this process, so requests
+    # spread over several workers would each see a different session
     uvicorn.run(
         "web_server:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        reload=WEB_RELOAD,
+        access_log=WEB_ACCESS_LOG,
         log_level="info"
     )
\ No newline at end of file